@@ -7,10 +7,41 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from config.settings import ASGI_CONCURRENCY_LIMIT, DEBUG  # noqa: E402
+from habit.telegram import webhook_application  # noqa: E402
+
+if DEBUG:
+    # Статика Swagger, ReDoc и админки при разработке, как у runserver
+    django_application = ASGIStaticFilesHandler(django_application)
+
+TELEGRAM_WEBHOOK_PATH = reverse("habit:telegram_webhook")
+
+# Запрос в Django держит поток и соединение с базой; остальные ждут своей
+# очереди в цикле событий, не занимая ни того, ни другого
+django_requests = asyncio.Semaphore(ASGI_CONCURRENCY_LIMIT)
+
+
+async def application(scope, receive, send):
+    """Обновления телеграма обрабатываются напрямую, остальное - Django"""
+    if (
+        scope["type"] == "http"
+        and scope["method"] == "POST"
+        and scope["path"] == TELEGRAM_WEBHOOK_PATH
+    ):
+        return await webhook_application(scope, receive, send)
+    if scope["type"] != "http":
+        return await django_application(scope, receive, send)
+    async with django_requests:
+        await django_application(scope, receive, send)
@@ -0,0 +1,444 @@
+import atexit
+import json
+import os
+import socket
+import threading
+from collections import defaultdict
+
+import redis
+from celery.signals import task_postrun
+
+from config.settings import (
+    CELERY_BROKER_URL,
+    METRICS_FLUSH_INTERVAL,
+    METRICS_GAUGE_TTL,
+)
+
+METRICS_KEY = "metrics:{name}"
+GAUGE_KEY = "metrics:{name}:process:{process}"
+# Ожидание Redis: метрики не должны надолго задерживать запросы и задачи
+REDIS_TIMEOUT = 1
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def get_process_id():
+    """Имя процесса для значений gauge; после fork у потомка своё"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def sum_values(items):
+    total = defaultdict(float)
+    for values in items:
+        for field, value in values.items():
+            total[field] += value
+    return dict(total)
+
+
+class LocalBackend:
+    """Хранилище метрик в памяти процесса, если Redis не настроен"""
+
+    def __init__(self):
+        self.values = defaultdict(lambda: defaultdict(float))
+        self.gauges = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def add(self, increments):
+        with self.lock:
+            for (name, field), value in increments.items():
+                self.values[name][field] += value
+
+    def read(self, names):
+        with self.lock:
+            return {name: dict(self.values.get(name, {})) for name in names}
+
+    def publish(self, process, gauges, ttl):
+        with self.lock:
+            for name, values in gauges.items():
+                self.gauges[name][process] = dict(values)
+
+    def read_gauges(self, names):
+        with self.lock:
+            return {
+                name: sum_values(self.gauges.get(name, {}).values()) for name in names
+            }
+
+    def remove(self, process, names):
+        with self.lock:
+            for name in names:
+                self.gauges[name].pop(process, None)
+
+
+class RedisBackend:
+    """
+    Хранилище метрик в Redis: по хешу на метрику, поле - набор меток и
+    суффикс. Все процессы Django и Celery увеличивают общие значения,
+    поэтому /metrics любого процесса отдаёт сумму по всем. Gauge каждый
+    процесс записывает в свой хеш с TTL, /metrics складывает живые.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, increments):
+        pipeline = self.client.pipeline(transaction=False)
+        for (name, field), value in increments.items():
+            pipeline.hincrbyfloat(METRICS_KEY.format(name=name), field, value)
+        pipeline.execute()
+
+    def read(self, names):
+        pipeline = self.client.pipeline(transaction=False)
+        for name in names:
+            pipeline.hgetall(METRICS_KEY.format(name=name))
+        return {
+            name: {field.decode(): float(value) for field, value in values.items()}
+            for name, values in zip(names, pipeline.execute())
+        }
+
+    def publish(self, process, gauges, ttl):
+        pipeline = self.client.pipeline(transaction=True)
+        for name, values in gauges.items():
+            key = GAUGE_KEY.format(name=name, process=process)
+            pipeline.delete(key)
+            if values:
+                pipeline.hset(key, mapping=values)
+                pipeline.expire(key, max(int(ttl), 1))
+        pipeline.execute()
+
+    def read_gauges(self, names):
+        keys = {
+            name: list(
+                self.client.scan_iter(
+                    match=GAUGE_KEY.format(name=name, process="*"), count=1000
+                )
+            )
+            for name in names
+        }
+        pipeline = self.client.pipeline(transaction=False)
+        for name in names:
+            for key in keys[name]:
+                pipeline.hgetall(key)
+        results = iter(pipeline.execute())
+        return {
+            name: sum_values(
+                {field.decode(): float(value) for field, value in next(results).items()}
+                for _ in keys[name]
+            )
+            for name in names
+        }
+
+    def remove(self, process, names):
+        self.client.delete(
+            *(GAUGE_KEY.format(name=name, process=process) for name in names)
+        )
+
+
+class Registry:
+    """
+    Реестр метрик. Значения копятся в буфере процесса, а в хранилище их
+    сбрасывает фоновый поток раз в METRICS_FLUSH_INTERVAL секунд, поэтому
+    запросы и цикл событий ASGI не ждут Redis; при выгрузке /metrics буфер
+    сбрасывается сразу. Значения gauge процесса тот же поток переписывает
+    в хранилище не реже трети gauge_ttl.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        flush_interval=METRICS_FLUSH_INTERVAL,
+        gauge_ttl=METRICS_GAUGE_TTL,
+        process=None,
+    ):
+        self.backend = backend
+        self.process = process
+        self.flush_interval = flush_interval
+        self.gauge_ttl = gauge_ttl
+        self.metrics = {}
+        self.buffer = defaultdict(float)
+        self.lock = threading.Lock()
+        # Процесс, в котором запущен поток сброса, и его остановка
+        self.flusher_pid = None
+        self.flusher_stop = threading.Event()
+
+    def get_backend(self):
+        if self.backend is None:
+            if CELERY_BROKER_URL and CELERY_BROKER_URL.startswith(
+                ("redis://", "rediss://", "unix://")
+            ):
+                self.backend = RedisBackend(
+                    redis.Redis.from_url(
+                        CELERY_BROKER_URL,
+                        socket_timeout=REDIS_TIMEOUT,
+                        socket_connect_timeout=REDIS_TIMEOUT,
+                    )
+                )
+            else:
+                self.backend = LocalBackend()
+        return self.backend
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def get_process(self):
+        return self.process or get_process_id()
+
+    def get_gauges(self):
+        return [metric for metric in self.metrics.values() if metric.type == "gauge"]
+
+    def add(self, name, field, value):
+        with self.lock:
+            self.buffer[(name, field)] += value
+        self.start_flusher()
+
+    def start_flusher(self):
+        """Запуск потока сброса в процессе (после fork - заново)"""
+        pid = os.getpid()
+        if self.flusher_pid != pid:
+            with self.lock:
+                if self.flusher_pid != pid:
+                    self.flusher_pid = pid
+                    self.flusher_stop = threading.Event()
+                    threading.Thread(
+                        target=self.run_flusher,
+                        args=(self.flusher_stop,),
+                        name="metrics",
+                        daemon=True,
+                    ).start()
+
+    def run_flusher(self, stop):
+        while not stop.wait(min(self.flush_interval, self.gauge_ttl / 3)):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            increments, self.buffer = self.buffer, defaultdict(float)
+        gauges = {metric.name: metric.collect() for metric in self.get_gauges()}
+        gauges = {name: values for name, values in gauges.items() if values}
+        try:
+            if increments:
+                self.get_backend().add(increments)
+            if gauges:
+                self.get_backend().publish(self.get_process(), gauges, self.gauge_ttl)
+        except redis.RedisError:
+            # Метрики не должны ломать запросы и задачи
+            pass
+
+    def close(self):
+        """Сброс буфера и удаление gauge процесса при его завершении"""
+        if self.flusher_pid == os.getpid():
+            self.flusher_stop.set()
+            self.flusher_pid = None
+        self.flush()
+        names = [metric.name for metric in self.get_gauges()]
+        if names:
+            try:
+                self.get_backend().remove(self.get_process(), names)
+            except redis.RedisError:
+                pass
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        self.flush()
+        gauges = [metric.name for metric in self.get_gauges()]
+        backend = self.get_backend()
+        values = backend.read([name for name in self.metrics if name not in gauges])
+        values.update(backend.read_gauges(gauges))
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(values[name]))
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    """Метки в формате {name="value",...}"""
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+class Metric:
+    """Базовый класс метрики с именованными метками"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def get_field(self, labels, suffix):
+        return json.dumps([*(str(labels[name]) for name in self.labelnames), suffix])
+
+    def parse(self, values):
+        """Значения хранилища по наборам меток: {метки: {суффикс: значение}}"""
+        series = defaultdict(dict)
+        for field, value in values.items():
+            *labels, suffix = json.loads(field)
+            series[tuple(zip(self.labelnames, labels))][suffix] = value
+        return sorted(series.items())
+
+
+class Counter(Metric):
+    """Счётчик"""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, self.get_field(labels, "total"), amount)
+
+    def render(self, values):
+        for labels, series in self.parse(values):
+            yield f"{self.name}_total{format_labels(labels)} {format_value(series['total'])}"
+
+
+class Gauge(Metric):
+    """
+    Значение, которое растёт и убывает. Процесс хранит у себя текущие
+    значения и публикует их целиком, а не приращения: значения упавшего
+    или перезапущенного процесса исчезают вместе с его ключом по TTL.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        with self.lock:
+            self.values[self.get_field(labels, "value")] += amount
+        self.registry.start_flusher()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.get_field(labels, "value")] = value
+        self.registry.start_flusher()
+
+    def collect(self):
+        """Текущие значения процесса: {поле: значение}"""
+        with self.lock:
+            return dict(self.values)
+
+    def render(self, values):
+        for labels, series in self.parse(values):
+            yield f"{self.name}{format_labels(labels)} {format_value(series['value'])}"
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        # В хранилище корзины не накопительные: увеличивается только одна
+        bucket = next((str(le) for le in self.buckets if value <= le), "+Inf")
+        self.registry.add(self.name, self.get_field(labels, bucket), 1)
+        self.registry.add(self.name, self.get_field(labels, "sum"), value)
+
+    def render(self, values):
+        for labels, series in self.parse(values):
+            cumulative = 0
+            for le in (*(str(le) for le in self.buckets), "+Inf"):
+                cumulative += series.get(le, 0)
+                bucket_labels = format_labels((*labels, ("le", le)))
+                yield f"{self.name}_bucket{bucket_labels} {format_value(cumulative)}"
+            yield f"{self.name}_sum{format_labels(labels)} {format_value(series.get('sum', 0))}"
+            yield f"{self.name}_count{format_labels(labels)} {format_value(cumulative)}"
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.close)
+
+
+@task_postrun.connect
+def flush_task_metrics(**kwargs):
+    """Сброс метрик после каждой задачи Celery"""
+    REGISTRY.flush()
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ("view", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов за HTTP-запрос",
+    ("view",),
+    buckets=COUNT_BUCKETS,
+)
+REMINDER_DURATION = Histogram(
+    "reminder_shard_duration_seconds",
+    "Время обработки шарда тика напоминаний",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REMINDER_HABITS = Counter(
+    "reminder_habits",
+    "Привычки тика напоминаний по результату: scanned, sent, skipped, failed",
+    ("result",),
+)
+TELEGRAM_DURATION = Histogram(
+    "telegram_send_duration_seconds",
+    "Время отправки сообщения в телеграм с учётом повторов",
+    ("status",),
+)
+TELEGRAM_MESSAGES = Counter(
+    "telegram_messages",
+    "Сообщения в телеграм по коду ответа",
+    ("status",),
+)
+TELEGRAM_UPDATES = Counter(
+    "telegram_updates",
+    "Обновления вебхука телеграма по результату обработки",
+    ("result",),
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts",
+    "Выдачи соединений пулом PostgreSQL по результату: reused, new, timeout",
+    ("result",),
+)
+DB_POOL_WAIT_DURATION = Histogram(
+    "db_pool_wait_seconds",
+    "Время ожидания соединения из пула PostgreSQL",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_WAITERS = Gauge(
+    "db_pool_waiters",
+    "Ожидающие свободного соединения из пула PostgreSQL",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Открытые соединения пула PostgreSQL: idle - свободные, used - выданные",
+    ("state",),
+)
+DB_POOL_DISCARDED = Counter(
+    "db_pool_discarded",
+    "Закрытые пулом соединения по причине: broken, unhealthy, expired, "
+    "idle, lost, closed",
+    ("reason",),
+)
@@ -0,0 +1,122 @@
+import time
+from contextvars import ContextVar
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from config.metrics import REQUEST_DURATION, REQUEST_QUERIES
+from config.settings import COMPRESSION_BROTLI_QUALITY, COMPRESSION_MIN_SIZE
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие ответов от COMPRESSION_MIN_SIZE байт: brotli, если клиент его
+    принимает, иначе gzip. Потоковые ответы сжимаются только gzip.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < COMPRESSION_MIN_SIZE:
+            return response
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not re_accepts_brotli.search(ae)
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed_content = brotli.compress(
+            response.content, quality=COMPRESSION_BROTLI_QUALITY
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+# Счётчик SQL-запросов текущего HTTP-запроса. Переменная контекста видна и
+# в потоках sync_to_async, где асинхронный ORM выполняет запросы
+request_queries = ContextVar("request_queries", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Счётчик запросов на каждом новом соединении, в любом потоке"""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+class MetricsMiddleware:
+    """
+    Метрики HTTP-запросов: время обработки и число SQL-запросов
+    с меткой имени URL (namespace:name). Работает и синхронно, и
+    асинхронно, чтобы под ASGI не переводить запрос в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = [0]
+        token = request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            # Соединение потока могло открыться до подключения сигнала
+            if count_queries in connection.execute_wrappers:
+                response = self.get_response(request)
+            else:
+                with connection.execute_wrapper(count_queries):
+                    response = self.get_response(request)
+        finally:
+            request_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - started, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        queries = [0]
+        token = request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - started, queries[0])
+        return response
+
+    def observe(self, request, response, duration, queries):
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        REQUEST_DURATION.observe(
+            duration, view=view, method=request.method, status=response.status_code
+        )
+        REQUEST_QUERIES.observe(queries, view=view)
@@ -0,0 +1,71 @@
+import threading
+
+from django.db.backends.postgresql import base, creation
+
+from config.postgresql_pool.pool import ConnectionPool, install_wait_callback
+
+# Пулы процесса по алиасу базы и параметрам подключения
+pools = {}
+pools_lock = threading.Lock()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Тестовую базу нельзя удалить или скопировать, пока пул держит соединения"""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self.connection.close_pool()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close_pool()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений: connection.close() в конце запроса или
+    задачи Celery возвращает соединение в пул процесса, а не закрывает его.
+    Параметры пула - OPTIONS["pool"] (см. ConnectionPool).
+    """
+
+    creation_class = DatabaseCreation
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        key = (self.alias, tuple(sorted((k, repr(v)) for k, v in conn_params.items())))
+        with pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                install_wait_callback()
+                pool = pools[key] = ConnectionPool(
+                    **self.settings_dict["OPTIONS"].get("pool", {})
+                )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        self.pool_params = conn_params
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Закрытие внутри atomic: Django ещё держит ссылку на соединение
+        # до выхода из блока, поэтому выдавать его другим нельзя
+        with self.wrap_database_errors:
+            self.get_pool(self.pool_params).putconn(
+                self.connection, discard=self.in_atomic_block
+            )
+
+    def close_pool(self):
+        """Закрытие свободных соединений всех пулов этой базы"""
+        with pools_lock:
+            alias_pools = [pool for key, pool in pools.items() if key[0] == self.alias]
+        for pool in alias_pools:
+            pool.close()
@@ -0,0 +1,280 @@
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from config.metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_POOL_CONNECTIONS,
+    DB_POOL_DISCARDED,
+    DB_POOL_WAIT_DURATION,
+    DB_POOL_WAITERS,
+)
+
+# Как часто ожидающий проверяет соединения, потерянные без возврата в пул
+LOST_CHECK_INTERVAL = 1
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 одного процесса. Выдаёт последнее возвращённое
+    свободное соединение или открывает новое, пока открыто меньше max_size;
+    иначе ждёт возврата не дольше timeout секунд. Соединение, простоявшее
+    свободным дольше check_interval, перед выдачей проверяется запросом
+    SELECT 1. Соединения старше max_lifetime закрываются при возврате,
+    свободные дольше max_idle - при обращении к пулу, пока открыто больше
+    min_size.
+
+    Блокировки - threading, которые eventlet подменяет зелёными, поэтому
+    ожидание соединения в Celery с -P eventlet не блокирует другие гринлеты.
+    """
+
+    def __init__(
+        self,
+        min_size=0,
+        max_size=20,
+        timeout=10,
+        max_idle=300,
+        max_lifetime=3600,
+        check_interval=5,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.condition = threading.Condition(threading.Lock())
+        # (соединение, время открытия, время возврата), последнее - справа
+        self.idle = deque()
+        self.size = 0
+        # id(соединения) -> (финализатор, время открытия, поколение)
+        self.leases = {}
+        # Соединения, удалённые сборщиком мусора без возврата в пул
+        self.lost = deque()
+        self.generation = 0
+
+    def getconn(self, connect):
+        """Соединение из пула; connect() открывает новое"""
+        started = time.monotonic()
+        while True:
+            connection, created_at, returned_at = self.acquire(started)
+            if connection is None:
+                connection, created_at = self.open(connect), time.monotonic()
+                result = "new"
+                break
+            reason = self.check(connection, created_at, returned_at)
+            if reason is None:
+                result = "reused"
+                break
+            self.discard(connection, reason)
+
+        finalizer = weakref.finalize(connection, self.lost.append, id(connection))
+        self.leases[id(connection)] = (finalizer, created_at, self.generation)
+        DB_POOL_CHECKOUTS.inc(result=result)
+        DB_POOL_WAIT_DURATION.observe(time.monotonic() - started)
+        DB_POOL_CONNECTIONS.inc(state="used")
+        return connection
+
+    def acquire(self, started):
+        """
+        Свободное соединение (соединение, время открытия, время возврата)
+        или тройка None, если можно открыть новое. Метрики обновляются вне
+        блокировки: сброс в Redis не должен задерживать другие потоки.
+        """
+        deadline = started + self.timeout
+        expired = []
+        lost = 0
+        waiting = False
+        result = None
+        try:
+            while True:
+                with self.condition:
+                    lost += self.collect_lost()
+                    expired.extend(self.pop_expired())
+                    remaining = deadline - time.monotonic()
+                    if self.idle:
+                        result = self.idle.pop()
+                        break
+                    if self.size < self.max_size:
+                        self.size += 1
+                        result = (None, None, None)
+                        break
+                    if remaining <= 0:
+                        break
+                    if waiting:
+                        self.condition.wait(min(remaining, LOST_CHECK_INTERVAL))
+                        continue
+                # Состояние проверяется снова под блокировкой перед ожиданием
+                waiting = True
+                DB_POOL_WAITERS.inc()
+        finally:
+            if waiting:
+                DB_POOL_WAITERS.dec()
+            if lost:
+                DB_POOL_CONNECTIONS.dec(lost, state="used")
+                DB_POOL_DISCARDED.inc(lost, reason="lost")
+            for connection in expired:
+                DB_POOL_CONNECTIONS.dec(state="idle")
+                self.close_connection(connection, "idle")
+
+        if result is None:
+            DB_POOL_CHECKOUTS.inc(result="timeout")
+            raise psycopg2.OperationalError(
+                f"Нет свободного соединения в пуле за {self.timeout} с "
+                f"(max_size={self.max_size})"
+            )
+        if result[0] is not None:
+            DB_POOL_CONNECTIONS.dec(state="idle")
+        return result
+
+    def open(self, connect):
+        try:
+            return connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def check(self, connection, created_at, returned_at):
+        """Причина не выдавать свободное соединение или None"""
+        now = time.monotonic()
+        if connection.closed:
+            return "broken"
+        if now - created_at >= self.max_lifetime:
+            return "expired"
+        if now - returned_at >= self.check_interval:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                if not connection.autocommit:
+                    connection.rollback()
+            except psycopg2.Error:
+                return "unhealthy"
+        return None
+
+    def putconn(self, connection, discard=False):
+        """Возврат соединения; discard=True закрывает его"""
+        lease = self.leases.pop(id(connection), None)
+        if lease is None:
+            connection.close()
+            return
+        finalizer, created_at, generation = lease
+        finalizer.detach()
+        DB_POOL_CONNECTIONS.dec(state="used")
+
+        reason = "closed" if discard or generation != self.generation else None
+        if reason is None:
+            reason = self.reset(connection, created_at)
+        if reason is not None:
+            self.discard(connection, reason)
+            return
+        with self.condition:
+            self.idle.append((connection, created_at, time.monotonic()))
+            self.condition.notify()
+        DB_POOL_CONNECTIONS.inc(state="idle")
+
+    def reset(self, connection, created_at):
+        """Откат незавершённой транзакции; причина закрыть соединение или None"""
+        if connection.closed:
+            return "broken"
+        if time.monotonic() - created_at >= self.max_lifetime:
+            return "expired"
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return None
+        if status in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_INERROR,
+        ):
+            try:
+                connection.rollback()
+                return None
+            except psycopg2.Error:
+                pass
+        return "broken"
+
+    def discard(self, connection, reason):
+        """Закрытие выданного или взятого из свободных соединения"""
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+        self.close_connection(connection, reason)
+
+    def close_connection(self, connection, reason):
+        DB_POOL_DISCARDED.inc(reason=reason)
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def pop_expired(self):
+        """Свободные дольше max_idle соединения сверх min_size (под блокировкой)"""
+        now = time.monotonic()
+        expired = []
+        while (
+            self.idle
+            and self.size > self.min_size
+            and now - self.idle[0][2] >= self.max_idle
+        ):
+            expired.append(self.idle.popleft()[0])
+            self.size -= 1
+        return expired
+
+    def collect_lost(self):
+        """
+        Освобождение мест соединений, потерянных без возврата (под
+        блокировкой). Возвращает их число.
+        """
+        lost = 0
+        while self.lost:
+            self.leases.pop(self.lost.popleft(), None)
+            self.size -= 1
+            lost += 1
+        return lost
+
+    def close(self):
+        """
+        Закрытие свободных соединений; выданные закроются при возврате.
+        Пул остаётся рабочим и откроет новые соединения.
+        """
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+            self.size -= len(idle)
+            self.generation += 1
+            self.condition.notify_all()
+        for connection, _, _ in idle:
+            DB_POOL_CONNECTIONS.dec(state="idle")
+            self.close_connection(connection, "closed")
+
+
+def eventlet_wait_callback(connection, timeout=None):
+    """Ожидание ответа PostgreSQL с переключением на другие гринлеты"""
+    from eventlet.hubs import trampoline
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            break
+        if state == extensions.POLL_READ:
+            trampoline(connection.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(connection.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Неизвестное состояние poll(): {state}")
+
+
+def install_wait_callback():
+    """
+    Под eventlet (Celery с -P eventlet) запросы psycopg2 блокировали бы весь
+    процесс: модуль на C не использует подменённые сокеты. Обратный вызов
+    ожидания отдаёт управление другим гринлетам, пока база отвечает.
+    """
+    eventlet = sys.modules.get("eventlet")
+    if eventlet is not None and eventlet.patcher.is_monkey_patched("socket"):
+        extensions.set_wait_callback(eventlet_wait_callback)
@@ -0,0 +1,42 @@
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonRenderer(renderers.JSONRenderer):
+    """
+    JSON-рендерер на orjson. Типы, которые orjson не знает (Decimal, lazy-строки,
+    timedelta), приводятся тем же кодировщиком, что и в JSONRenderer DRF.
+    Ответы с отступами (Accept: application/json; indent=4) строит JSONRenderer.
+    """
+
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder.default, option=ORJSON_OPTIONS)
+        # Как и JSONRenderer, экранируем U+2028 и U+2029 для вставки в <script>
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Рендерер MessagePack для клиентов с Accept: application/msgpack"""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self.encoder.default, use_bin_type=True)
@@ -50,7 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "config.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -94,6 +96,72 @@ DATABASES = {
     }
 }
 
+# Пул соединений с PostgreSQL в каждом процессе Django и Celery;
+# DB_POOL_MAX_SIZE=0 отключает пул. Размер - не меньше ASGI_CONCURRENCY_LIMIT
+# и потоков вебхука телеграма TELEGRAM_WEBHOOK_WORKERS
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 40))
+if DB_POOL_MAX_SIZE:
+    DATABASES["default"]["ENGINE"] = "config.postgresql_pool"
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": DB_POOL_MAX_SIZE,
+            # Ожидание свободного соединения, секунд
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+            # Проверка SELECT 1 соединения, свободного дольше этого времени
+            "check_interval": float(os.getenv("DB_POOL_CHECK_INTERVAL", 5)),
+        }
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Без CACHE_URL общим кэшем служит Redis брокера Celery, как для ограничителя
+# отправки и метрик
+CACHE_URL = os.getenv("CACHE_URL")
+if not CACHE_URL and os.getenv("CELERY_BROKER_URL", "").startswith(
+    ("redis://", "rediss://", "unix://")
+):
+    CACHE_URL = os.getenv("CELERY_BROKER_URL")
+
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Кэш списка публичных привычек и статистики только с общим кэшем: сброс
+# версии в кэше процесса (LocMemCache) не увидели бы другие процессы
+HABIT_CACHE = bool(CACHE_URL)
+HABIT_LIST_CACHE_TIMEOUT = int(os.getenv("HABIT_LIST_CACHE_TIMEOUT", 300))
+HABIT_BULK_MAX_SIZE = int(os.getenv("HABIT_BULK_MAX_SIZE", 100))
+# Статистика выполнения привычек пользователя: кэш до следующей отметки
+HABIT_STATS_CACHE_TIMEOUT = int(os.getenv("HABIT_STATS_CACHE_TIMEOUT", 3600))
+HABIT_STATS_MAX_DAYS = int(os.getenv("HABIT_STATS_MAX_DAYS", 3660))
+# Асинхронные представления списков и просмотра привычек для ASGI-сервера;
+# под WSGI-сервером выгоднее синхронные (False)
+HABIT_ASYNC_VIEWS = os.getenv("HABIT_ASYNC_VIEWS", "True") == "True"
+# Одновременно обрабатываемые запросы Django в процессе ASGI-сервера
+ASGI_CONCURRENCY_LIMIT = int(os.getenv("ASGI_CONCURRENCY_LIMIT", 32))
+# Кэш пользователей для JWT-аутентификации: Redis и LRU в памяти процесса.
+# Только с общим кэшем (CACHE_URL или Redis брокера): сброс версии в кэше процесса (LocMemCache)
+# не увидели бы другие процессы, и деактивированный пользователь или старый
+# пароль действовали бы в них до AUTH_USER_CACHE_TIMEOUT
+AUTH_USER_CACHE = bool(CACHE_URL)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 300))
+AUTH_USER_LRU_SIZE = int(os.getenv("AUTH_USER_LRU_SIZE", 1024))
+AUTH_USER_LRU_TTL = int(os.getenv("AUTH_USER_LRU_TTL", 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -141,14 +209,32 @@ AUTH_USER_MODEL = "users.User"
 NULLABLE = {"null": True, "blank": True}
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.renderers.OrjsonRenderer",
+        "config.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "config.parsers.OrjsonParser",
+        "config.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "TEST_REQUEST_RENDERER_CLASSES": (
+        "rest_framework.renderers.MultiPartRenderer",
+        "rest_framework.renderers.JSONRenderer",
+        "config.renderers.MessagePackRenderer",
+    ),
 }
 
+# Ответы меньше этого размера (байт) не сжимаются
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -160,15 +246,55 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+REMINDER_SHARDS = int(os.getenv("REMINDER_SHARDS", 4))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", 500))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 8))
+# Задержка перед первой повторной попыткой, далее удваивается (секунды)
+NOTIFICATION_RETRY_DELAY = int(os.getenv("NOTIFICATION_RETRY_DELAY", 30))
+# Время, на которое воркер захватывает уведомление для отправки (секунды)
+NOTIFICATION_LEASE = int(os.getenv("NOTIFICATION_LEASE", 300))
+
+# Интервал сброса метрик процесса в Redis (секунды)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+# Время жизни значений gauge процесса в Redis: значения упавшего процесса
+# пропадают из /metrics не позже чем через это время (секунды)
+METRICS_GAUGE_TTL = float(os.getenv("METRICS_GAUGE_TTL", 30))
+# Доступ к /metrics: адреса клиентов через запятую или токен в заголовке
+# Authorization: Bearer <METRICS_TOKEN>
+METRICS_ALLOWED_IPS = [
+    ip.strip()
+    for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if ip.strip()
+]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 CELERY_BEAT_SCHEDULE = {
     "reminder": {
         "task": "habit.tasks.reminder",
         "schedule": timedelta(minutes=1),
     },
+    "deliver_notifications": {
+        "task": "habit.tasks.deliver_pending_notifications",
+        "schedule": timedelta(minutes=1),
+    },
 }
 
 TELEGRAM_URL = "https://api.telegram.org/bot"
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", 5))
+TELEGRAM_MAX_WORKERS = int(os.getenv("TELEGRAM_MAX_WORKERS", 32))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", 3))
+# Лимиты Bot API: около 30 сообщений в секунду на бота и 1 в секунду на чат
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+TELEGRAM_ACQUIRE_TIMEOUT = float(os.getenv("TELEGRAM_ACQUIRE_TIMEOUT", 60))
+# Вебхук бота: секрет из заголовка X-Telegram-Bot-Api-Secret-Token,
+# время на обработку обновления до ответа телеграму (секунды),
+# число потоков обработки со своими соединениями с базой
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_WEBHOOK_TIMEOUT = float(os.getenv("TELEGRAM_WEBHOOK_TIMEOUT", 5))
+TELEGRAM_WEBHOOK_WORKERS = int(os.getenv("TELEGRAM_WEBHOOK_WORKERS", 8))
+TELEGRAM_SNOOZE_MINUTES = int(os.getenv("TELEGRAM_SNOOZE_MINUTES", 15))
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
@@ -0,0 +1,49 @@
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudget(ContextDecorator):
+    """
+    Бюджет SQL-запросов для блока кода или теста: не больше max_queries
+    запросов и, если задано, не больше max_time секунд суммарного времени SQL.
+    При превышении падает с AssertionError и списком выполненных запросов.
+
+        with QueryBudget(3, max_time=0.2, name="habit:list_person"):
+            self.client.get(url)
+    """
+
+    def __init__(self, max_queries, max_time=None, name="", using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.max_time = max_time
+        self.name = name
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        queries = self.context.captured_queries
+        total_time = sum(float(query["time"]) for query in queries)
+        errors = []
+        if len(queries) > self.max_queries:
+            errors.append(f"{len(queries)} запросов при бюджете {self.max_queries}")
+        if self.max_time is not None and total_time > self.max_time:
+            errors.append(
+                f"{total_time * 1000:.1f} мс SQL при бюджете {self.max_time * 1000:.1f} мс"
+            )
+        if errors:
+            executed = "\n".join(
+                f"{i}. [{query['time']}] {query['sql']}"
+                for i, query in enumerate(queries, start=1)
+            )
+            raise AssertionError(
+                f"Превышен бюджет запросов {self.name}: {', '.join(errors)}\n{executed}"
+            )
+        return False
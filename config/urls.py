@@ -21,6 +21,8 @@ from rest_framework.permissions import AllowAny
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from config.views import metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Snippets API",
@@ -43,5 +45,6 @@ urlpatterns = [
         schema_view.with_ui("swagger", cache_timeout=0),
         name="schema-swagger-ui",
     ),
+    path("metrics", metrics, name="metrics"),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
 ]
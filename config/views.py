@@ -0,0 +1,24 @@
+import hmac
+
+from django.http import HttpResponse, HttpResponseForbidden
+
+from config.metrics import CONTENT_TYPE, REGISTRY
+from config.settings import METRICS_ALLOWED_IPS, METRICS_TOKEN
+
+
+def is_metrics_allowed(request):
+    """Доступ к метрикам: по токену METRICS_TOKEN или адресу из METRICS_ALLOWED_IPS"""
+    if METRICS_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if hmac.compare_digest(
+            authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+        ):
+            return True
+    return request.META.get("REMOTE_ADDR") in METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики всех процессов в текстовом формате Prometheus"""
+    if not is_metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
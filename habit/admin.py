@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from habit.models import Habit
+from habit.models import (
+    Habit,
+    HabitCompletion,
+    HabitStats,
+    Notification,
+    ReminderLateness,
+)
 
 
 @admin.register(Habit)
@@ -16,4 +22,41 @@ class HabitAdmin(admin.ModelAdmin):
         "periodicity",
         "complete_time",
         "is_published",
+        "next_due_at",
+    )
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "habit",
+        "due_at",
+        "chat_id",
+        "status",
+        "attempts",
+        "next_retry_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+
+
+@admin.register(ReminderLateness)
+class ReminderLatenessAdmin(admin.ModelAdmin):
+    list_display = ("period", "bucket", "count")
+
+
+@admin.register(HabitCompletion)
+class HabitCompletionAdmin(admin.ModelAdmin):
+    list_display = ("id", "habit", "occurred_on", "completed_at")
+
+
+@admin.register(HabitStats)
+class HabitStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "habit",
+        "completions",
+        "current_streak",
+        "longest_streak",
+        "last_occurred_on",
     )
@@ -0,0 +1,65 @@
+import asyncio
+import math
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка"""
+    if not values:
+        return None
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+class AsyncHTTPClient:
+    """
+    Минимальный клиент HTTP/1.1 с keep-alive поверх asyncio: одно соединение
+    с сервером, запросы отправляются последовательно. Тысячи таких клиентов
+    умещаются в одном потоке, в отличие от requests.
+    """
+
+    def __init__(self, host, port, headers=None):
+        self.host = host
+        self.port = port
+        self.headers = headers or {}
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def request(self, method, path, body=b"", headers=None):
+        """Запрос к серверу, возвращает пару (код ответа, тело)"""
+        if self.writer is None:
+            await self.connect()
+        headers = {
+            "Host": f"{self.host}:{self.port}",
+            **self.headers,
+            **(headers or {}),
+        }
+        if body:
+            headers["Content-Length"] = str(len(body))
+        head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        self.writer.write(f"{method} {path} HTTP/1.1\r\n{head}\r\n".encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        content = await self.reader.readexactly(
+            int(response_headers.get("content-length", 0))
+        )
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, content
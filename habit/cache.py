@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+from django.core.cache import cache
+
+from config.settings import (
+    HABIT_CACHE,
+    HABIT_LIST_CACHE_TIMEOUT,
+    HABIT_STATS_CACHE_TIMEOUT,
+)
+
+PUBLIC_LIST_KEY = "habit:public_list"
+PUBLIC_LIST_VERSION_KEY = f"{PUBLIC_LIST_KEY}:version"
+USER_STATS_KEY = "habit:user_stats:{owner_id}"
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT = 2
+REBUILD_POLL_INTERVAL = 0.05
+
+
+def get_public_list_version():
+    """Текущая версия кэша списка публичных привычек"""
+    version = cache.get(PUBLIC_LIST_VERSION_KEY)
+    if version is None:
+        cache.add(PUBLIC_LIST_VERSION_KEY, 1, None)
+        version = cache.get(PUBLIC_LIST_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_public_list():
+    """Инвалидация всех закэшированных страниц списка публичных привычек"""
+    try:
+        cache.incr(PUBLIC_LIST_VERSION_KEY)
+    except ValueError:
+        cache.add(PUBLIC_LIST_VERSION_KEY, 1, None)
+
+
+def get_public_list_key(request):
+    """Ключ кэша страницы списка публичных привычек"""
+    page = request.query_params.get("page", "1")
+    page_size = request.query_params.get("page_size", "")
+    cursor = request.query_params.get("cursor")
+    if cursor is not None:
+        page = f"cursor={cursor}"
+    fields = request.query_params.get("fields", "")
+    exclude = request.query_params.get("exclude", "")
+    return (
+        f"{PUBLIC_LIST_KEY}:{request.get_host()}:{page}:{page_size}"
+        f":{fields}:{exclude}"
+    )
+
+
+def get_or_build(key, build):
+    """
+    Возвращает данные из кэша или строит их функцией build.
+    Перестраивает страницу только один запрос (блокировка через cache.add),
+    остальные в это время получают устаревшую версию, а если её нет -
+    ждут результата построения не дольше REBUILD_WAIT секунд.
+    Без общего кэша (HABIT_CACHE=False) данные всегда строятся заново.
+    """
+    if not HABIT_CACHE:
+        return build()
+    version = get_public_list_version()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        try:
+            data = build()
+            cache.set(key, (version, data), HABIT_LIST_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return build()
+
+
+async def aget_or_build(key, build):
+    """
+    Асинхронный вариант get_or_build: build - корутинная функция.
+    Версия и страница читаются из кэша одним запросом.
+    """
+    if not HABIT_CACHE:
+        return await build()
+    values = await cache.aget_many([PUBLIC_LIST_VERSION_KEY, key])
+    version = values.get(PUBLIC_LIST_VERSION_KEY)
+    if version is None:
+        await cache.aadd(PUBLIC_LIST_VERSION_KEY, 1, None)
+        version = await cache.aget(PUBLIC_LIST_VERSION_KEY, 1)
+    entry = values.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f"{key}:lock"
+    if await cache.aadd(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        try:
+            data = await build()
+            await cache.aset(key, (version, data), HABIT_LIST_CACHE_TIMEOUT)
+        finally:
+            await cache.adelete(lock_key)
+        return data
+
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(REBUILD_POLL_INTERVAL)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return entry[1]
+    return await build()
+
+
+def get_user_stats_key(owner_id, *parts):
+    """Ключ кэша статистики пользователя с текущей версией его данных"""
+    key = USER_STATS_KEY.format(owner_id=owner_id)
+    version = cache.get(f"{key}:version", 0)
+    return ":".join(str(part) for part in (key, version, *parts))
+
+
+def invalidate_user_stats(owner_id):
+    """Инвалидация статистики пользователя после изменения привычек или отметок"""
+    key = f"{USER_STATS_KEY.format(owner_id=owner_id)}:version"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_or_build_user_stats(owner_id, parts, build):
+    """Статистика пользователя из кэша или построенная функцией build"""
+    if not HABIT_CACHE:
+        return build()
+    key = get_user_stats_key(owner_id, *parts)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, HABIT_STATS_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,74 @@
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """ETag из значений, от которых зависит ответ"""
+    value = ":".join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(value.encode(), usedforsecurity=False).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (If-None-Match / If-Modified-Since).
+    Валидаторы ответа считаются дешёвым запросом в get_validators(); если
+    у клиента актуальная версия, возвращается 304 без выборки и сериализации
+    строк. Вызывается после аутентификации и проверки прав DRF.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        """Пара (etag, last_modified) или None, если проверка невозможна"""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        response = self.get_conditional_response(request, *validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.patch_validators(response, *validators)
+
+    def get_conditional_response(self, request, etag, last_modified):
+        """Ответ 304 или 412, если у клиента актуальная версия, иначе None"""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def patch_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(
+                    int(last_modified.timestamp())
+                )
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+
+class AsyncConditionalGetMixin(ConditionalGetMixin):
+    """
+    Условные GET-запросы для асинхронных представлений: в MRO должен
+    стоять перед асинхронным get() и синхронным ConditionalGetMixin.
+    """
+
+    async def aget_validators(self, request, *args, **kwargs):
+        """Асинхронный вариант get_validators()"""
+        return None
+
+    async def get(self, request, *args, **kwargs):
+        validators = await self.aget_validators(request, *args, **kwargs)
+        if validators is None:
+            return await super().get(request, *args, **kwargs)
+
+        response = self.get_conditional_response(request, *validators)
+        if response is None:
+            response = await super().get(request, *args, **kwargs)
+        return self.patch_validators(response, *validators)
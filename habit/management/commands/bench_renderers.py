@@ -0,0 +1,52 @@
+import gzip
+import timeit
+
+import brotli
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import MessagePackRenderer, OrjsonRenderer
+from config.settings import COMPRESSION_BROTLI_QUALITY
+from habit.management.commands.bench_serializers import get_sample_rows
+from habit.serializers import HabitReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Микробенчмарк рендеринга страницы списка привычек: время и размер ответа "
+        "для JSONRenderer DRF, orjson и MessagePack, без сжатия, с gzip и brotli"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        repeat = options["repeat"]
+        data = {
+            "count": page_size,
+            "next": None,
+            "previous": None,
+            "results": HabitReadSerializer(get_sample_rows(page_size), many=True).data,
+        }
+
+        if JSONRenderer().render(data) != OrjsonRenderer().render(data):
+            self.stderr.write("Вывод orjson отличается от JSONRenderer")
+            return
+
+        results = {}
+        for renderer in (JSONRenderer(), OrjsonRenderer(), MessagePackRenderer()):
+            name = type(renderer).__name__
+            content = renderer.render(data)
+            elapsed = timeit.timeit(lambda: renderer.render(data), number=repeat)
+            results[name] = elapsed
+            self.stdout.write(
+                f"{name}: {elapsed / repeat * 1e6:.1f} мкс, "
+                f"{len(content)} байт, "
+                f"gzip {len(gzip.compress(content))} байт, "
+                f"brotli {len(brotli.compress(content, quality=COMPRESSION_BROTLI_QUALITY))} байт"
+            )
+        self.stdout.write(
+            f"Ускорение orjson: {results['JSONRenderer'] / results['OrjsonRenderer']:.1f}x"
+        )
@@ -0,0 +1,79 @@
+import timeit
+from datetime import date, time
+
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from habit.models import Habit
+from habit.serializers import HabitSerializer, HabitReadSerializer
+
+
+def get_sample_rows(page_size):
+    """Строки .values() для страницы списка привычек"""
+    return [
+        {
+            "id": pk,
+            "place": "Дома",
+            "time": time(7, 30),
+            "date": date(2024, 1, 1),
+            "action": f"Сделать зарядку {pk}",
+            "is_pleasant": False,
+            "periodicity": 1,
+            "award": None,
+            "complete_time": time(0, 1, 30),
+            "is_published": True,
+            "owner": 1,
+            "related_habit": None,
+        }
+        for pk in range(1, page_size + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Микробенчмарк сериализации страницы списка привычек: "
+        "HabitSerializer по моделям против HabitReadSerializer по строкам .values()"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        repeat = options["repeat"]
+        rows = get_sample_rows(page_size)
+        habits = [
+            Habit(
+                **{
+                    key: value
+                    for key, value in row.items()
+                    if key not in ("owner", "related_habit")
+                },
+                owner_id=row["owner"],
+                related_habit_id=row["related_habit"],
+            )
+            for row in rows
+        ]
+
+        renderer = JSONRenderer()
+        model_output = renderer.render(HabitSerializer(habits, many=True).data)
+        values_output = renderer.render(HabitReadSerializer(rows, many=True).data)
+        if model_output != values_output:
+            self.stderr.write("Вывод сериализаторов отличается")
+            return
+
+        model_time = timeit.timeit(
+            lambda: HabitSerializer(habits, many=True).data, number=repeat
+        )
+        values_time = timeit.timeit(
+            lambda: HabitReadSerializer(rows, many=True).data, number=repeat
+        )
+        for name, elapsed in (
+            ("HabitSerializer", model_time),
+            ("HabitReadSerializer", values_time),
+        ):
+            self.stdout.write(
+                f"{name}: {elapsed / repeat * 1e6:.1f} мкс на страницу из {page_size}"
+            )
+        self.stdout.write(f"Ускорение: {model_time / values_time:.1f}x")
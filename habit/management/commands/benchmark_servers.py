@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habit.benchmarking import AsyncHTTPClient, percentile
+from habit.models import Habit
+from users.models import User
+
+# Сценарии чтения и их доли в нагрузке
+SCENARIOS = {
+    "list_public": 40,
+    "list_person": 40,
+    "retrieve": 20,
+}
+PAGE_SIZE = 10
+REQUEST_TIMEOUT = 30
+START_TIMEOUT = 30
+
+# Текущий путь WSGI (runserver из docker-compose) с синхронными представлениями
+# и ASGI-сервер с асинхронными
+SERVERS = {
+    "wsgi": {
+        "command": ["manage.py", "runserver", "--noreload", "--skip-checks"],
+        "env": {"HABIT_ASYNC_VIEWS": "False"},
+    },
+    "asgi": {
+        "command": [
+            "-m",
+            "uvicorn",
+            "config.asgi:application",
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        "env": {"HABIT_ASYNC_VIEWS": "True"},
+    },
+}
+
+
+def get_server_command(name, host, port):
+    command = [sys.executable, *SERVERS[name]["command"]]
+    if name == "wsgi":
+        return [*command, f"{host}:{port}"]
+    return [*command, "--host", host, "--port", str(port)]
+
+
+def read_process_status(pid):
+    """Резидентная память (байт) и число потоков процесса из /proc"""
+    values = {}
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            values[name] = value.split()
+    return int(values["VmRSS"][0]) * 1024, int(values["Threads"][0])
+
+
+class ProcessMonitor:
+    """Пиковые память и число потоков процесса сервера во время теста"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.idle_rss, self.idle_threads = read_process_status(pid)
+        self.peak_rss, self.peak_threads = self.idle_rss, self.idle_threads
+
+    async def run(self):
+        while True:
+            try:
+                rss, threads = read_process_status(self.pid)
+            except (OSError, KeyError):
+                return
+            self.peak_rss = max(self.peak_rss, rss)
+            self.peak_threads = max(self.peak_threads, threads)
+            await asyncio.sleep(self.interval)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение WSGI (runserver, синхронные представления) и ASGI (uvicorn, "
+        "асинхронные представления) на чтении привычек при тысяче одновременных "
+        "клиентов: RPS, задержки, ошибки, пиковая память и потоки сервера. "
+        "Серверы запускаются командой по очереди; пользователи берутся из "
+        "seed_habits, сервер должен принимать Host 127.0.0.1 (DEBUG=True)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--servers", nargs="+", choices=SERVERS, default=["wsgi", "asgi"]
+        )
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8100)
+        parser.add_argument("--duration", type=float, default=20)
+        parser.add_argument("--concurrency", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark_servers.json")
+
+    def handle(self, *args, **options):
+        clients = self.get_clients(options)
+        report = {
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+            "servers": {},
+        }
+        for name in options["servers"]:
+            self.stdout.write(f"{name}: {options['concurrency']} клиентов...")
+            report["servers"][name] = self.run_server(name, clients, options)
+            self.write_summary(name, report["servers"][name])
+
+        with open(options["output"], "w") as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(f"Отчёт сохранён в {options['output']}")
+
+    def get_clients(self, options):
+        """Токен и привычки пользователя для каждого клиента"""
+        users = list(
+            User.objects.filter(
+                email__startswith=f"seed{options['seed']}.user"
+            ).order_by("pk")[: options["users"]]
+        )
+        if not users:
+            raise CommandError(
+                "Нет пользователей: создайте их командой seed_habits с тем же --seed"
+            )
+        habit_ids = defaultdict(list)
+        for owner_id, habit_id in Habit.objects.filter(owner__in=users).values_list(
+            "owner_id", "id"
+        ):
+            habit_ids[owner_id].append(habit_id)
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in users}
+        return [
+            (tokens[user.pk], habit_ids[user.pk])
+            for user in (users[i % len(users)] for i in range(options["concurrency"]))
+        ]
+
+    def run_server(self, name, clients, options):
+        env = {**os.environ, **SERVERS[name]["env"]}
+        process = subprocess.Popen(
+            get_server_command(name, options["host"], options["port"]),
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_server(process, options["host"], options["port"])
+            return asyncio.run(self.load(process.pid, clients, options))
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def wait_for_server(self, process, host, port):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Сервер завершился с кодом {process.returncode}")
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Сервер не запустился за {START_TIMEOUT} с")
+
+    async def load(self, pid, clients, options):
+        """Нагрузка клиентами до конца теста с замером памяти сервера"""
+        monitor = ProcessMonitor(pid)
+        monitor_task = asyncio.create_task(monitor.run())
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        errors = Counter()
+        served = set()
+        deadline = time.monotonic() + options["duration"]
+        paths = {
+            "list_public": reverse("habit:list_public"),
+            "list_person": f"{reverse('habit:list_person')}?page_size={PAGE_SIZE}",
+        }
+
+        async def worker(number, token, habit_ids):
+            rng = random.Random(options["seed"] * 100000 + number)
+            client = AsyncHTTPClient(
+                options["host"],
+                options["port"],
+                {"Authorization": f"Bearer {token}", "Accept": "application/json"},
+            )
+            scenarios = [name for name in SCENARIOS if name != "retrieve" or habit_ids]
+            weights = [SCENARIOS[name] for name in scenarios]
+            try:
+                while time.monotonic() < deadline:
+                    scenario = rng.choices(scenarios, weights)[0]
+                    if scenario == "retrieve":
+                        path = reverse(
+                            "habit:habit_retrieve", args=(rng.choice(habit_ids),)
+                        )
+                    else:
+                        path = paths[scenario]
+                    started = time.perf_counter()
+                    try:
+                        status, _ = await asyncio.wait_for(
+                            client.request("GET", path), REQUEST_TIMEOUT
+                        )
+                    except (
+                        OSError,
+                        ValueError,
+                        IndexError,
+                        asyncio.IncompleteReadError,
+                        asyncio.TimeoutError,
+                    ) as exc:
+                        errors[type(exc).__name__] += 1
+                        await client.close()
+                        await asyncio.sleep(0.1)
+                        continue
+                    latencies[scenario].append(time.perf_counter() - started)
+                    statuses[scenario][status] += 1
+                    served.add(number)
+            finally:
+                await client.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(number, token, habit_ids)
+                for number, (token, habit_ids) in enumerate(clients)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        monitor_task.cancel()
+
+        endpoints = {}
+        for scenario in SCENARIOS:
+            values = sorted(latencies[scenario])
+            endpoints[scenario] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 2),
+                **{
+                    f"p{percent}_ms": (
+                        round(percentile(values, percent) * 1000, 2) if values else None
+                    )
+                    for percent in (50, 95, 99)
+                },
+                "statuses": {
+                    str(code): count for code, count in statuses[scenario].items()
+                },
+            }
+        values = sorted(value for items in latencies.values() for value in items)
+        ok = sum(counts[200] for counts in statuses.values())
+        return {
+            "requests": len(values),
+            "ok": ok,
+            "rps": round(ok / elapsed, 2),
+            **{
+                f"p{percent}_ms": (
+                    round(percentile(values, percent) * 1000, 2) if values else None
+                )
+                for percent in (50, 95, 99)
+            },
+            "errors": dict(errors),
+            "served_clients": len(served),
+            "idle_rss_mb": round(monitor.idle_rss / 2**20, 1),
+            "peak_rss_mb": round(monitor.peak_rss / 2**20, 1),
+            "idle_threads": monitor.idle_threads,
+            "peak_threads": monitor.peak_threads,
+            "endpoints": endpoints,
+        }
+
+    def write_summary(self, name, result):
+        self.stdout.write(
+            f"{name}: {result['ok']} ответов 200 из {result['requests']}, "
+            f"{result['rps']:.0f} в секунду, p50 {result['p50_ms']} мс "
+            f"p95 {result['p95_ms']} мс p99 {result['p99_ms']} мс, "
+            f"обслужено клиентов {result['served_clients']}, ошибок {result['errors']}"
+        )
+        self.stdout.write(
+            f"{name}: память {result['idle_rss_mb']} -> {result['peak_rss_mb']} МБ, "
+            f"потоков {result['idle_threads']} -> {result['peak_threads']}"
+        )
@@ -0,0 +1,141 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import orjson
+from django.core.management import BaseCommand, CommandError
+from django.urls import reverse
+
+from config.settings import TELEGRAM_WEBHOOK_SECRET
+from habit.benchmarking import AsyncHTTPClient, percentile
+from users.models import User
+
+# Тексты сообщений и их доли в нагрузке
+MESSAGES = {
+    "/done": 50,
+    "/snooze 30": 20,
+    "готово": 10,
+    "позже": 5,
+    "Привет!": 15,
+}
+
+
+class WebhookClient(AsyncHTTPClient):
+    """Клиент вебхука: POST обновлений с секретом в заголовке"""
+
+    def __init__(self, host, port, path, secret):
+        super().__init__(
+            host,
+            port,
+            {
+                "Content-Type": "application/json",
+                "X-Telegram-Bot-Api-Secret-Token": secret,
+            },
+        )
+        self.path = path
+
+    async def post(self, body):
+        """POST обновления, возвращает код ответа"""
+        status, _ = await self.request("POST", self.path, body)
+        return status
+
+
+class Command(BaseCommand):
+    help = (
+        "Генератор поддельных обновлений телеграма для нагрузочного теста "
+        "вебхука. Чаты берутся у пользователей из seed_habits"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--count", type=int, default=10000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--secret", default=TELEGRAM_WEBHOOK_SECRET)
+
+    def handle(self, *args, **options):
+        if not options["secret"]:
+            raise CommandError("Не задан секрет вебхука TELEGRAM_WEBHOOK_SECRET")
+        chat_ids = [
+            chat_id
+            for chat_id in User.objects.filter(chat_id__isnull=False).values_list(
+                "chat_id", flat=True
+            )
+            if chat_id.lstrip("-").isdigit()
+        ]
+        if not chat_ids:
+            raise CommandError(
+                "Нет пользователей с чатом: создайте их командой seed_habits"
+            )
+        rng = random.Random(options["seed"])
+        texts = rng.choices(list(MESSAGES), list(MESSAGES.values()), k=options["count"])
+        # update_id уникален в запуске, чтобы вебхук не отбросил повторы
+        first_id = int(time.time() * 1000) * 1000
+        updates = [
+            orjson.dumps(
+                {
+                    "update_id": first_id + i,
+                    "message": {
+                        "message_id": i,
+                        "date": int(time.time()),
+                        "chat": {"id": int(chat_id), "type": "private"},
+                        "text": text,
+                    },
+                }
+            )
+            for i, (chat_id, text) in enumerate(
+                zip(rng.choices(chat_ids, k=options["count"]), texts)
+            )
+        ]
+        latencies, statuses, elapsed = asyncio.run(self.send(updates, options))
+
+        latencies.sort()
+        ok = statuses.get(200, 0)
+        self.stdout.write(
+            f"Обновлений: {len(updates)} за {elapsed:.2f} с, "
+            f"{len(updates) / elapsed:.0f} в секунду, коды ответа {dict(statuses)}"
+        )
+        self.stdout.write(
+            " ".join(
+                f"p{percent} {percentile(latencies, percent) * 1000:.1f} мс"
+                for percent in (50, 95, 99)
+            )
+        )
+        if ok != len(updates):
+            raise CommandError(f"Неуспешных ответов: {len(updates) - ok}")
+
+    async def send(self, updates, options):
+        """Отправка обновлений options["concurrency"] соединениями"""
+        url = urlsplit(options["url"])
+        path = reverse("habit:telegram_webhook")
+        queue = iter(updates)
+        latencies = []
+        statuses = Counter()
+
+        async def worker():
+            client = WebhookClient(
+                url.hostname, url.port or 80, path, options["secret"]
+            )
+            try:
+                for body in queue:
+                    started = time.perf_counter()
+                    try:
+                        status = await client.post(body)
+                    except (
+                        OSError,
+                        ValueError,
+                        IndexError,
+                        asyncio.IncompleteReadError,
+                    ):
+                        await client.close()
+                        status = None
+                    latencies.append(time.perf_counter() - started)
+                    statuses[status] += 1
+            finally:
+                await client.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+        return latencies, statuses, time.perf_counter() - started
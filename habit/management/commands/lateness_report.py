@@ -0,0 +1,83 @@
+import json
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from habit.models import LATENESS_BUCKETS, ReminderLateness
+
+PERCENTILES = (50, 90, 99)
+
+
+def get_bucket_percentile(counts, percent):
+    """
+    Перцентиль опоздания по гистограмме: верхняя граница корзины в секундах
+    или None, если перцентиль попал в корзину больше последней границы.
+    """
+    rank = sum(counts) * percent / 100
+    cumulative = 0
+    for bucket, count in enumerate(counts):
+        cumulative += count
+        if cumulative >= rank and count:
+            return LATENESS_BUCKETS[bucket] if bucket < len(LATENESS_BUCKETS) else None
+    return None
+
+
+def format_seconds(value):
+    if value is None:
+        return f">{LATENESS_BUCKETS[-1]} с"
+    return f"≤{value} с"
+
+
+class Command(BaseCommand):
+    help = (
+        "Отчёт об опоздании напоминаний: перцентили задержки отправки "
+        "относительно времени привычки по часам суток"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        rows = (
+            ReminderLateness.objects.filter(period__gte=since)
+            .annotate(
+                hour=ExtractHour("period", tzinfo=timezone.get_current_timezone())
+            )
+            .values("hour", "bucket")
+            .annotate(total=Sum("count"))
+        )
+        hours = {}
+        for row in rows:
+            counts = hours.setdefault(row["hour"], [0] * (len(LATENESS_BUCKETS) + 1))
+            counts[row["bucket"]] += row["total"]
+
+        report = {
+            hour: {
+                "count": sum(counts),
+                **{
+                    f"p{percent}": get_bucket_percentile(counts, percent)
+                    for percent in PERCENTILES
+                },
+            }
+            for hour, counts in sorted(hours.items())
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if not report:
+            self.stdout.write("Нет отправленных напоминаний за период")
+            return
+        self.stdout.write(
+            f"{'Час':>4} {'Отправлено':>11} {'p50':>9} {'p90':>9} {'p99':>9}"
+        )
+        for hour, stats in report.items():
+            percentiles = " ".join(
+                f"{format_seconds(stats[f'p{percent}']):>9}" for percent in PERCENTILES
+            )
+            self.stdout.write(f"{hour:>4} {stats['count']:>11} {percentiles}")
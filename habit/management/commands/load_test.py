@@ -0,0 +1,332 @@
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from django.urls import reverse
+
+from habit.benchmarking import percentile
+
+# Сценарии и их доли в нагрузке
+SCENARIOS = {
+    "list_public": 25,
+    "list_person": 20,
+    "list_person_deep": 10,
+    "list_person_cursor": 5,
+    "retrieve": 10,
+    "create": 10,
+    "update": 10,
+    "delete": 5,
+    "token_refresh": 3,
+    "token_obtain": 2,
+}
+PAGE_SIZE = 10
+
+
+class LoadWorker:
+    """
+    Виртуальный пользователь: входит под своей учётной записью и выполняет
+    случайные сценарии до окончания теста, сохраняя время ответов.
+    """
+
+    def __init__(self, base_url, email, password, seed):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.access = None
+        self.refresh = None
+        self.habit_ids = []
+        self.person_pages = 1
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def request(self, name, method, path, expected, **kwargs):
+        """Запрос к API с замером времени ответа"""
+        headers = kwargs.pop("headers", {})
+        if self.access:
+            headers["Authorization"] = f"Bearer {self.access}"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers, timeout=30, **kwargs
+            )
+        except requests.RequestException:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][response.status_code] += 1
+        if response.status_code != expected:
+            self.errors[name] += 1
+            return None
+        return response
+
+    def token_obtain(self):
+        self.access = None
+        response = self.request(
+            "token_obtain",
+            "post",
+            reverse("users:login"),
+            200,
+            json={"email": self.email, "password": self.password},
+        )
+        if response is not None:
+            self.access = response.json()["access"]
+            self.refresh = response.json()["refresh"]
+
+    def token_refresh(self):
+        response = self.request(
+            "token_refresh",
+            "post",
+            reverse("users:token-refresh"),
+            200,
+            json={"refresh": self.refresh},
+        )
+        if response is not None:
+            self.access = response.json()["access"]
+
+    def list_public(self):
+        self.request("list_public", "get", reverse("habit:list_public"), 200)
+
+    def list_person(self):
+        response = self.request(
+            "list_person",
+            "get",
+            reverse("habit:list_person"),
+            200,
+            params={"page_size": PAGE_SIZE},
+        )
+        if response is not None:
+            self.person_pages = max(math.ceil(response.json()["count"] / PAGE_SIZE), 1)
+
+    def list_person_deep(self):
+        """Страница из последней четверти списка привычек пользователя"""
+        page = self.rng.randint(math.ceil(self.person_pages * 0.75), self.person_pages)
+        self.request(
+            "list_person_deep",
+            "get",
+            reverse("habit:list_person"),
+            200,
+            params={"page": max(page, 1), "page_size": PAGE_SIZE},
+        )
+
+    def list_person_cursor(self):
+        """Первые страницы списка привычек пользователя курсорной пагинацией"""
+        url = reverse("habit:list_person")
+        params = {"cursor": "", "page_size": PAGE_SIZE}
+        for _ in range(3):
+            response = self.request(
+                "list_person_cursor", "get", url, 200, params=params
+            )
+            if response is None or not response.json()["next"]:
+                break
+            url, params = response.json()["next"].removeprefix(self.base_url), None
+
+    def retrieve(self):
+        if not self.habit_ids:
+            return self.create()
+        habit_id = self.rng.choice(self.habit_ids)
+        self.request(
+            "retrieve", "get", reverse("habit:habit_retrieve", args=(habit_id,)), 200
+        )
+
+    def create(self):
+        response = self.request(
+            "create",
+            "post",
+            reverse("habit:habit_create"),
+            201,
+            json={
+                "action": f"Нагрузочный тест {self.rng.randrange(10**6)}",
+                "time": f"{self.rng.randrange(24):02}:{self.rng.randrange(0, 60, 5):02}",
+                "place": "Дом",
+                "periodicity": self.rng.randint(1, 7),
+                "award": "Чашка какао",
+            },
+        )
+        if response is not None:
+            self.habit_ids.append(response.json()["id"])
+
+    def update(self):
+        if not self.habit_ids:
+            return self.create()
+        habit_id = self.rng.choice(self.habit_ids)
+        self.request(
+            "update",
+            "patch",
+            reverse("habit:habit_update", args=(habit_id,)),
+            200,
+            json={"place": "Парк", "periodicity": self.rng.randint(1, 7)},
+        )
+
+    def delete(self):
+        if not self.habit_ids:
+            return self.create()
+        habit_id = self.habit_ids.pop(self.rng.randrange(len(self.habit_ids)))
+        self.request(
+            "delete", "delete", reverse("habit:habit_delete", args=(habit_id,)), 204
+        )
+
+    def run(self, deadline):
+        self.token_obtain()
+        if self.access is None:
+            return
+        scenarios = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(scenarios, weights)[0])()
+
+    def cleanup(self):
+        """Удаление привычек, созданных во время теста"""
+        for habit_id in self.habit_ids:
+            self.session.delete(
+                self.base_url + reverse("habit:habit_delete", args=(habit_id,)),
+                headers={"Authorization": f"Bearer {self.access}"},
+                timeout=30,
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест API привычек и пользователей против запущенного сервера. "
+        "Пользователи берутся из seed_habits. Отчёт с RPS и p50/p95/p99 "
+        "по каждому сценарию сохраняется в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--duration", type=float, default=30)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--users", type=int, default=16)
+        parser.add_argument("--password", default="12345678")
+        parser.add_argument("--output", default="load_test.json")
+        parser.add_argument(
+            "--baseline", help="Отчёт предыдущего запуска для сравнения p95"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20,
+            help="Рост p95 в процентах, считающийся регрессией",
+        )
+
+    def handle(self, *args, **options):
+        workers = [
+            LoadWorker(
+                options["url"],
+                f"seed{options['seed']}.user{i % options['users']}@example.com",
+                options["password"],
+                seed=options["seed"] * 1000 + i,
+            )
+            for i in range(options["concurrency"])
+        ]
+        started_at = datetime.now(timezone.utc)
+        started = time.monotonic()
+        deadline = started + options["duration"]
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            list(executor.map(lambda worker: worker.run(deadline), workers))
+        elapsed = time.monotonic() - started
+        for worker in workers:
+            worker.cleanup()
+
+        if not any(worker.access for worker in workers):
+            raise CommandError(
+                "Не удалось получить токен: создайте пользователей командой seed_habits"
+            )
+
+        report = self.get_report(workers, elapsed)
+        report.update(
+            {
+                "url": options["url"],
+                "started_at": started_at.isoformat(),
+                "duration": round(elapsed, 3),
+                "concurrency": options["concurrency"],
+            }
+        )
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            report["regressions"] = self.get_regressions(
+                report, baseline, options["threshold"]
+            )
+        with open(options["output"], "w") as file:
+            json.dump(report, file, indent=2)
+
+        for name, stats in report["endpoints"].items():
+            self.stdout.write(
+                f"{name:20} {stats['requests']:7} запросов {stats['rps']:8.1f} rps "
+                f"p50 {stats['p50_ms']} мс p95 {stats['p95_ms']} мс "
+                f"p99 {stats['p99_ms']} мс ошибок {stats['errors']}"
+            )
+        self.stdout.write(f"Отчёт сохранён в {options['output']}")
+        if report.get("regressions"):
+            raise CommandError(
+                "Регрессия p95: "
+                + ", ".join(
+                    f"{item['endpoint']} {item['baseline_ms']} -> {item['p95_ms']} мс"
+                    for item in report["regressions"]
+                )
+            )
+
+    def get_report(self, workers, elapsed):
+        """Сводка по сценариям: число запросов, RPS, перцентили и коды ответа"""
+        latencies = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        errors = defaultdict(int)
+        for worker in workers:
+            for name, values in worker.latencies.items():
+                latencies[name].extend(values)
+            for name, codes in worker.statuses.items():
+                for code, count in codes.items():
+                    statuses[name][str(code)] += count
+            for name, count in worker.errors.items():
+                errors[name] += count
+
+        endpoints = {}
+        for name in sorted(latencies.keys() | errors.keys()):
+            values = sorted(latencies[name])
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": errors[name],
+                "rps": round(len(values) / elapsed, 2),
+                **{
+                    f"p{percent}_ms": (
+                        round(percentile(values, percent) * 1000, 2) if values else None
+                    )
+                    for percent in (50, 95, 99)
+                },
+                "max_ms": round(values[-1] * 1000, 2) if values else None,
+                "statuses": dict(statuses[name]),
+            }
+        total = sum(stats["requests"] for stats in endpoints.values())
+        return {
+            "total": {
+                "requests": total,
+                "errors": sum(errors.values()),
+                "rps": round(total / elapsed, 2),
+            },
+            "endpoints": endpoints,
+        }
+
+    def get_regressions(self, report, baseline, threshold):
+        """Сценарии, у которых p95 вырос больше чем на threshold процентов"""
+        regressions = []
+        for name, stats in report["endpoints"].items():
+            previous = baseline.get("endpoints", {}).get(name, {}).get("p95_ms")
+            if previous and (stats["p95_ms"] or 0) > previous * (1 + threshold / 100):
+                regressions.append(
+                    {
+                        "endpoint": name,
+                        "baseline_ms": previous,
+                        "p95_ms": stats["p95_ms"],
+                    }
+                )
+        return regressions
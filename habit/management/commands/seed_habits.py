@@ -0,0 +1,233 @@
+import io
+import random
+import time as timer
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from habit.cache import invalidate_public_list
+from habit.models import Habit, get_next_occurrence
+from users.models import User
+
+PLEASANT_ACTIONS = (
+    ("Выпить чашку кофе", "Кухня"),
+    ("Послушать любимый альбом", "Дом"),
+    ("Принять ванну с пеной", "Ванная"),
+    ("Посмотреть серию сериала", "Дом"),
+    ("Съесть кусочек шоколада", "Кухня"),
+    ("Погулять в парке", "Парк"),
+    ("Поиграть с котом", "Дом"),
+    ("Почитать комикс", "Диван"),
+)
+USEFUL_ACTIONS = (
+    ("Сделать зарядку", "Дом"),
+    ("Выпить стакан воды", "Кухня"),
+    ("Пройти 10000 шагов", "Улица"),
+    ("Прочитать 20 страниц", "Диван"),
+    ("Сделать дыхательную гимнастику", "Дом"),
+    ("Разобрать почту", "Офис"),
+    ("Повторить английские слова", "Транспорт"),
+    ("Сделать растяжку", "Спортзал"),
+    ("Полить цветы", "Балкон"),
+    ("Помедитировать", "Дом"),
+    ("Заправить кровать", "Спальня"),
+    ("Выучить стихотворение", "Дом"),
+)
+AWARDS = (
+    "Кусочек торта",
+    "Час любимой игры",
+    "Новая книга",
+    "Поход в кино",
+    "Чашка какао",
+)
+# Часы напоминаний: пики утром и вечером, в остальные часы вес 2.
+# Веса накопленные, для random.choices(cum_weights=...)
+HOURS = tuple(range(24))
+PEAK_HOUR_WEIGHTS = {6: 8, 7: 14, 8: 12, 9: 6, 19: 9, 20: 12, 21: 10, 22: 6}
+HOUR_WEIGHTS = tuple(accumulate(PEAK_HOUR_WEIGHTS.get(hour, 2) for hour in HOURS))
+PERIODICITIES = (1, 2, 3, 4, 5, 6, 7)
+PERIODICITY_WEIGHTS = tuple(accumulate((60, 10, 8, 3, 2, 2, 15)))
+
+# Порядок столбцов строки привычки для COPY и bulk_create
+HABIT_FIELDS = (
+    "id",
+    "owner_id",
+    "place",
+    "time",
+    "date",
+    "action",
+    "is_pleasant",
+    "related_habit_id",
+    "periodicity",
+    "award",
+    "complete_time",
+    "is_published",
+    "next_due_at",
+    "updated_at",
+)
+
+
+def to_copy_value(value):
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, time)):
+        return value.isoformat()
+    return str(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерация пользователей и привычек для нагрузочного тестирования. "
+        "Данные детерминированы параметром --seed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--habits", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--method", choices=("copy", "bulk"), default="copy")
+        parser.add_argument("--password", default="12345678")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("Нужен хотя бы один пользователь")
+        rng = random.Random(options["seed"])
+        started = timer.monotonic()
+
+        user_ids = self.create_users(rng, options)
+        self.stdout.write(f"Создано пользователей: {len(user_ids)}")
+
+        now = timezone.now().replace(second=0, microsecond=0)
+        today = timezone.localdate()
+        # Последняя приятная привычка каждого пользователя для связанных привычек
+        pleasant_ids = {}
+        insert = self.copy_habits if options["method"] == "copy" else self.bulk_habits
+        created = 0
+        while created < options["habits"]:
+            count = min(options["batch_size"], options["habits"] - created)
+            first_id = self.reserve_habit_ids(count)
+            rows = [
+                self.get_habit_row(
+                    rng, first_id + i, user_ids, pleasant_ids, now, today
+                )
+                for i in range(count)
+            ]
+            with transaction.atomic():
+                insert(rows)
+            created += count
+            self.stdout.write(f"Создано привычек: {created}")
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Habit._meta.db_table}")
+        invalidate_public_list()
+        self.stdout.write(f"Готово за {timer.monotonic() - started:.1f} с")
+
+    def create_users(self, rng, options):
+        """Создание пользователей; у части пользователей нет чата Telegram"""
+        emails = [
+            f"seed{options['seed']}.user{i}@example.com"
+            for i in range(options["users"])
+        ]
+        if User.objects.filter(email=emails[0]).exists():
+            raise CommandError(
+                f"Пользователи с seed {options['seed']} уже созданы, укажите другой --seed"
+            )
+        password = make_password(options["password"])
+        users = [
+            User(
+                email=email,
+                password=password,
+                chat_id=(
+                    str(rng.randrange(10**8, 10**10)) if rng.random() < 0.8 else None
+                ),
+            )
+            for email in emails
+        ]
+        User.objects.bulk_create(users, batch_size=options["batch_size"])
+        return [user.pk for user in users]
+
+    def reserve_habit_ids(self, count):
+        """Резервирование count идентификаторов привычек в последовательности"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                "nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+                [Habit._meta.db_table, Habit._meta.db_table, count],
+            )
+            return cursor.fetchone()[0] - count + 1
+
+    def get_habit_row(self, rng, habit_id, user_ids, pleasant_ids, now, today):
+        """
+        Строка привычки. Владелец выбирается со смещением к первым пользователям,
+        чтобы у немногих было много привычек. Полезная привычка связана
+        с приятной привычкой того же владельца или имеет вознаграждение.
+        """
+        owner = int(len(user_ids) * rng.random() ** 2)
+        is_pleasant = rng.random() < 0.3
+        action, place = rng.choice(PLEASANT_ACTIONS if is_pleasant else USEFUL_ACTIONS)
+        related_habit_id = None
+        award = None
+        if is_pleasant:
+            pleasant_ids[owner] = habit_id
+        else:
+            choice = rng.random()
+            if choice < 0.4 and owner in pleasant_ids:
+                related_habit_id = pleasant_ids[owner]
+            elif choice < 0.8:
+                award = rng.choice(AWARDS)
+
+        habit_time = time(
+            rng.choices(HOURS, cum_weights=HOUR_WEIGHTS)[0], rng.randrange(0, 60, 5)
+        )
+        habit_date = today - timedelta(days=rng.randrange(365))
+        periodicity = rng.choices(PERIODICITIES, cum_weights=PERIODICITY_WEIGHTS)[0]
+        complete_seconds = rng.randint(10, 120)
+        first_due_at = datetime.combine(
+            habit_date + timedelta(days=periodicity),
+            habit_time,
+            tzinfo=timezone.get_current_timezone(),
+        )
+        return (
+            habit_id,
+            user_ids[owner],
+            place,
+            habit_time,
+            habit_date,
+            action,
+            is_pleasant,
+            related_habit_id,
+            periodicity,
+            award,
+            time(0, complete_seconds // 60, complete_seconds % 60),
+            rng.random() < 0.15,
+            get_next_occurrence(first_due_at, periodicity, now),
+            now,
+        )
+
+    def copy_habits(self, rows):
+        """Загрузка привычек через COPY FROM STDIN"""
+        columns = ", ".join(
+            Habit._meta.get_field(field.removesuffix("_id")).column
+            for field in HABIT_FIELDS
+        )
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(to_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Habit._meta.db_table} ({columns}) FROM STDIN", buffer
+            )
+
+    def bulk_habits(self, rows):
+        """Загрузка привычек через bulk_create"""
+        Habit.objects.bulk_create(Habit(**dict(zip(HABIT_FIELDS, row))) for row in rows)
@@ -0,0 +1,39 @@
+from django.core.management import BaseCommand, CommandError
+
+from config.settings import BOT_TOKEN, TELEGRAM_URL, TELEGRAM_WEBHOOK_SECRET
+from habit.services import get_session
+
+
+class Command(BaseCommand):
+    help = (
+        "Регистрация вебхука бота в телеграме: обновления с сообщениями "
+        "будут приходить на --url с секретом TELEGRAM_WEBHOOK_SECRET"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Адрес вебхука; без него вебхук удаляется")
+        parser.add_argument("--max-connections", type=int, default=40)
+
+    def handle(self, *args, **options):
+        if not BOT_TOKEN:
+            raise CommandError("Не задан BOT_TOKEN")
+        if options["url"]:
+            if not TELEGRAM_WEBHOOK_SECRET:
+                raise CommandError("Не задан TELEGRAM_WEBHOOK_SECRET")
+            method = "setWebhook"
+            params = {
+                "url": options["url"],
+                "secret_token": TELEGRAM_WEBHOOK_SECRET,
+                "max_connections": options["max_connections"],
+                "allowed_updates": '["message", "edited_message"]',
+            }
+        else:
+            method, params = "deleteWebhook", {}
+        response = get_session().post(
+            f"{TELEGRAM_URL}{BOT_TOKEN}/{method}", data=params, timeout=10
+        )
+        if not response.ok:
+            raise CommandError(
+                f"Телеграм ответил {response.status_code}: {response.text}"
+            )
+        self.stdout.write(response.json().get("description", "OK"))
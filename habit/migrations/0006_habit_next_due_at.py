@@ -0,0 +1,61 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:59
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def get_next_occurrence(due_at, periodicity, after):
+    """
+    Ближайшее наступление привычки не раньше момента after. Копия функции
+    из habit.models на момент миграции: её изменения не должны менять
+    эту миграцию.
+    """
+    period = timedelta(days=periodicity)
+    if due_at >= after:
+        return due_at
+    periods = -((due_at - after) // period)
+    return due_at + periods * period
+
+
+def fill_next_due_at(apps, schema_editor):
+    """Заполнение времени следующего напоминания для существующих привычек"""
+    Habit = apps.get_model("habit", "Habit")
+    now = timezone.now().replace(second=0, microsecond=0)
+    tz = timezone.get_current_timezone()
+    batch = []
+    habits = Habit.objects.filter(periodicity__gte=1).only(
+        "date", "time", "periodicity"
+    )
+    for habit in habits.iterator():
+        first_due_at = datetime.combine(
+            habit.date + timedelta(days=habit.periodicity), habit.time, tzinfo=tz
+        )
+        habit.next_due_at = get_next_occurrence(first_due_at, habit.periodicity, now)
+        batch.append(habit)
+        if len(batch) >= 1000:
+            Habit.objects.bulk_update(batch, ["next_due_at"])
+            batch = []
+    Habit.objects.bulk_update(batch, ["next_due_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0005_alter_habit_periodicity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="next_due_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                null=True,
+                verbose_name="Время следующего напоминания",
+            ),
+        ),
+        migrations.RunPython(fill_next_due_at, migrations.RunPython.noop),
+    ]
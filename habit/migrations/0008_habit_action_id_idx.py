@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс строится без блокировки записи в таблицу привычек;
+    # CREATE INDEX CONCURRENTLY не выполняется внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("habit", "0007_notification"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(fields=["action", "id"], name="habit_action_id_idx"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:06
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY не выполняются внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("habit", "0008_habit_action_id_idx"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["action", "id"],
+                name="habit_published_action_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                fields=["owner", "action", "id"], name="habit_owner_action_idx"
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="habit",
+            name="habit_action_id_idx",
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("habit", "0009_habit_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время изменения"),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                fields=["owner", "updated_at"], name="habit_owner_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0010_habit_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReminderLateness",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.DateTimeField(verbose_name="Час наступления привычки"),
+                ),
+                (
+                    "bucket",
+                    models.PositiveSmallIntegerField(verbose_name="Корзина опоздания"),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Количество"),
+                ),
+            ],
+            options={
+                "verbose_name": "Опоздание напоминаний",
+                "verbose_name_plural": "Опоздание напоминаний",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="reminderlateness",
+            constraint=models.UniqueConstraint(
+                fields=("period", "bucket"), name="unique_lateness_bucket"
+            ),
+        ),
+    ]
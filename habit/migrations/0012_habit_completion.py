@@ -0,0 +1,105 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0011_reminder_lateness"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitStats",
+            fields=[
+                (
+                    "habit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="habit.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+                (
+                    "completions",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество выполнений"
+                    ),
+                ),
+                (
+                    "current_streak",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Текущая серия"
+                    ),
+                ),
+                (
+                    "longest_streak",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Самая длинная серия"
+                    ),
+                ),
+                (
+                    "first_occurred_on",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="День первого выполнения"
+                    ),
+                ),
+                (
+                    "last_occurred_on",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="День последнего выполнения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика привычки",
+                "verbose_name_plural": "Статистика привычек",
+            },
+        ),
+        migrations.CreateModel(
+            name="HabitCompletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("occurred_on", models.DateField(verbose_name="День выполнения")),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Время отметки"
+                    ),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="habit.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выполнение привычки",
+                "verbose_name_plural": "Выполнения привычек",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="habitcompletion",
+            constraint=models.UniqueConstraint(
+                fields=("habit", "occurred_on"), name="unique_habit_completion"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.2 on 2026-10-18 21:23
+
+from django.db import migrations, models
+
+
+def fix_zero_periodicity(apps, schema_editor):
+    """Нулевая периодичность, сохранённая в обход валидатора, - ежедневно"""
+    Habit = apps.get_model("habit", "Habit")
+    Habit.objects.filter(periodicity=0).update(periodicity=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0012_habit_completion"),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_zero_periodicity, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="habit",
+            constraint=models.CheckConstraint(
+                check=models.Q(("periodicity__gte", 1)),
+                name="habit_periodicity_positive",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 21:27
+
+from django.db import migrations, models
+import habit.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0013_habit_periodicity_positive"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habit",
+            name="related_habit",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=habit.models.set_null_and_touch,
+                to="habit.habit",
+                verbose_name="Связанная привычка",
+            ),
+        ),
+    ]
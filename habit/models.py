@@ -1,7 +1,42 @@
+from datetime import datetime, timedelta
+
 from django.db import models
+from django.utils import timezone
+
 from config.settings import NULLABLE, AUTH_USER_MODEL
 
 
+# Верхние границы корзин опоздания напоминаний в секундах; опоздание больше
+# последней границы попадает в корзину len(LATENESS_BUCKETS)
+LATENESS_BUCKETS = (0, 5, 10, 15, 30, 45, 60, 90, 120, 180, 300, 600, 900, 1800, 3600)
+
+
+def get_next_occurrence(due_at, periodicity, after):
+    """Ближайшее наступление привычки не раньше момента after"""
+    period = timedelta(days=periodicity)
+    if due_at >= after:
+        return due_at
+    periods = -((due_at - after) // period)
+    return due_at + periods * period
+
+
+def set_null_and_touch(collector, field, sub_objs, using):
+    """
+    SET_NULL с обновлением updated_at: иначе ETag и Last-Modified привычек,
+    ссылавшихся на удалённую, остались бы прежними при изменённом ответе.
+    """
+    # Обновления выполняются по порядку добавления, а sub_objs - ленивый
+    # QuerySet по значению поля: updated_at нужно обновить до обнуления ссылки
+    collector.add_field_update(
+        field.model._meta.get_field("updated_at"), timezone.now(), sub_objs
+    )
+    collector.add_field_update(field, None, sub_objs)
+
+
+# Как у SET_NULL: связанные привычки не выбираются перед обновлением
+set_null_and_touch.lazy_sub_objs = True
+
+
 class Habit(models.Model):
     """Модель привычки"""
 
@@ -19,7 +54,10 @@ class Habit(models.Model):
         default=False, verbose_name="Признак приятной привычки"
     )
     related_habit = models.ForeignKey(
-        "self", on_delete=models.SET_NULL, **NULLABLE, verbose_name="Связанная привычка"
+        "self",
+        on_delete=set_null_and_touch,
+        **NULLABLE,
+        verbose_name="Связанная привычка",
     )
     periodicity = models.PositiveSmallIntegerField(
         default=1, verbose_name="Периодичность привычки в днях"
@@ -29,11 +67,253 @@ class Habit(models.Model):
     is_published = models.BooleanField(
         default=False, verbose_name="Признак публичности"
     )
+    next_due_at = models.DateTimeField(
+        **NULLABLE, db_index=True, verbose_name="Время следующего напоминания"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время изменения")
 
     def __str__(self):
         return f"{self.action}"
 
+    def get_next_due_at(self, after=None):
+        """
+        Вычисляет время следующего напоминания: первое наступление
+        date + periodicity * k (k >= 1) в time, не раньше текущей минуты.
+        Без периодичности напоминаний нет: сохранение нулевой периодичности
+        отклонит ограничение habit_periodicity_positive.
+        """
+        if self.periodicity < 1:
+            return None
+        if after is None:
+            after = timezone.now().replace(second=0, microsecond=0)
+        date = self._meta.get_field("date").to_python(self.date)
+        time = self._meta.get_field("time").to_python(self.time)
+        first_due_at = datetime.combine(
+            date + timedelta(days=self.periodicity),
+            time,
+            tzinfo=timezone.get_current_timezone(),
+        )
+        return get_next_occurrence(first_due_at, self.periodicity, after)
+
+    def save(self, *args, **kwargs):
+        self.next_due_at = self.get_next_due_at()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "next_due_at"}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Привычка"
         verbose_name_plural = "Привычки"
         ordering = ["action"]
+        indexes = [
+            # Список публичных привычек: WHERE is_published ORDER BY action, id
+            models.Index(
+                fields=["action", "id"],
+                condition=models.Q(is_published=True),
+                name="habit_published_action_idx",
+            ),
+            # Список привычек пользователя: WHERE owner_id ORDER BY action, id
+            models.Index(
+                fields=["owner", "action", "id"], name="habit_owner_action_idx"
+            ),
+            # Проверка условных запросов: max(updated_at) и count по владельцу
+            models.Index(
+                fields=["owner", "updated_at"], name="habit_owner_updated_idx"
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(periodicity__gte=1), name="habit_periodicity_positive"
+            ),
+        ]
+
+
+class Notification(models.Model):
+    """Модель уведомления о наступлении привычки (outbox напоминаний)"""
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Ожидает отправки"),
+        (STATUS_SENT, "Отправлено"),
+        (STATUS_FAILED, "Не доставлено"),
+    )
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        verbose_name="Привычка",
+    )
+    due_at = models.DateTimeField(verbose_name="Время наступления привычки")
+    chat_id = models.CharField(verbose_name="ID чата Telegram")
+    text = models.TextField(verbose_name="Текст уведомления")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Количество попыток"
+    )
+    next_retry_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Время следующей попытки"
+    )
+    sent_at = models.DateTimeField(**NULLABLE, verbose_name="Время отправки")
+    last_error = models.TextField(**NULLABLE, verbose_name="Последняя ошибка")
+
+    def __str__(self):
+        return f"{self.habit_id} {self.due_at}"
+
+    class Meta:
+        verbose_name = "Уведомление"
+        verbose_name_plural = "Уведомления"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "due_at"], name="unique_habit_notification"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_retry_at"],
+                condition=models.Q(status="pending"),
+                name="notification_pending_idx",
+            ),
+        ]
+
+
+class ReminderLateness(models.Model):
+    """
+    Гистограмма опоздания напоминаний: число отправленных уведомлений
+    по часу наступления привычки и корзине задержки отправки.
+    """
+
+    period = models.DateTimeField(verbose_name="Час наступления привычки")
+    bucket = models.PositiveSmallIntegerField(verbose_name="Корзина опоздания")
+    count = models.PositiveIntegerField(default=0, verbose_name="Количество")
+
+    def __str__(self):
+        return f"{self.period} {self.bucket}: {self.count}"
+
+    class Meta:
+        verbose_name = "Опоздание напоминаний"
+        verbose_name_plural = "Опоздание напоминаний"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket"], name="unique_lateness_bucket"
+            ),
+        ]
+
+
+class HabitCompletion(models.Model):
+    """Модель отметки о выполнении привычки в день наступления"""
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="completions",
+        verbose_name="Привычка",
+    )
+    occurred_on = models.DateField(verbose_name="День выполнения")
+    completed_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Время отметки"
+    )
+
+    def __str__(self):
+        return f"{self.habit_id} {self.occurred_on}"
+
+    class Meta:
+        verbose_name = "Выполнение привычки"
+        verbose_name_plural = "Выполнения привычек"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "occurred_on"], name="unique_habit_completion"
+            ),
+        ]
+
+
+class HabitStats(models.Model):
+    """
+    Агрегаты выполнения привычки. Обновляются в транзакции отметки
+    о выполнении, поэтому чтение статистики не зависит от длины истории.
+    """
+
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Привычка",
+    )
+    completions = models.PositiveIntegerField(
+        default=0, verbose_name="Количество выполнений"
+    )
+    current_streak = models.PositiveIntegerField(
+        default=0, verbose_name="Текущая серия"
+    )
+    longest_streak = models.PositiveIntegerField(
+        default=0, verbose_name="Самая длинная серия"
+    )
+    first_occurred_on = models.DateField(
+        **NULLABLE, verbose_name="День первого выполнения"
+    )
+    last_occurred_on = models.DateField(
+        **NULLABLE, verbose_name="День последнего выполнения"
+    )
+
+    def __str__(self):
+        return f"{self.habit_id}: {self.current_streak}/{self.longest_streak}"
+
+    def add_completion(self, occurred_on, periodicity):
+        """
+        Учёт выполнения после последнего отмеченного: серия продолжается,
+        если с прошлого выполнения прошло не больше periodicity дней.
+        Возвращает False для выполнения задним числом - тогда агрегаты
+        пересчитываются по истории методом rebuild.
+        """
+        last = self.last_occurred_on
+        if last is not None and occurred_on <= last:
+            return False
+        if last is not None and (occurred_on - last).days <= periodicity:
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+        self.completions += 1
+        self.first_occurred_on = self.first_occurred_on or occurred_on
+        self.last_occurred_on = occurred_on
+        return True
+
+    def rebuild(self, dates, periodicity):
+        """Пересчёт агрегатов по всем дням выполнения в порядке возрастания"""
+        self.completions = self.current_streak = self.longest_streak = 0
+        self.first_occurred_on = self.last_occurred_on = None
+        for occurred_on in dates:
+            self.add_completion(occurred_on, periodicity)
+
+    def get_current_streak(self, periodicity, today=None):
+        """Текущая серия: обнуляется, если очередное выполнение пропущено"""
+        if today is None:
+            today = timezone.localdate()
+        if (
+            self.last_occurred_on is None
+            or (today - self.last_occurred_on).days > periodicity
+        ):
+            return 0
+        return self.current_streak
+
+    def get_completion_rate(self, periodicity, today=None):
+        """Доля выполненных наступлений привычки с первого выполнения"""
+        if today is None:
+            today = timezone.localdate()
+        if self.first_occurred_on is None:
+            return 0.0
+        expected = (today - self.first_occurred_on).days // periodicity + 1
+        return round(min(self.completions / expected, 1.0), 4)
+
+    class Meta:
+        verbose_name = "Статистика привычки"
+        verbose_name_plural = "Статистика привычек"
@@ -1,7 +1,157 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
 
 
 class HabitPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 10
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант paginate_queryset: COUNT(*) и строки страницы
+        читаются асинхронным ORM, страница собирается без запросов.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Заранее посчитанное значение cached_property count
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class HabitCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация по паре (action, id).
+    Позиция курсора - последняя пара на странице, следующая страница
+    выбирается условием по индексу (action, id) без COUNT(*) и OFFSET,
+    поэтому любая страница стоит столько же, сколько первая.
+    """
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 10
+    ordering = ("action", "id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([row async for row in page_queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """Запрос строк страницы и ещё одной строки - признака следующей"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            action, pk = self.decode_position(current_position)
+            if reverse:
+                condition = Q(action__lte=action) & (
+                    Q(action__lt=action) | Q(id__lt=pk)
+                )
+            else:
+                condition = Q(action__gte=action) & (
+                    Q(action__gt=action) | Q(id__gt=pk)
+                )
+            queryset = queryset.filter(condition)
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        """Страница и позиции соседних страниц по строкам get_page_queryset"""
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = None if self.cursor is None else self.cursor.position
+        self.page = results[: self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def decode_position(self, position):
+        """Пара (action, id) из позиции курсора"""
+        try:
+            action, pk = json.loads(position)
+            return str(action), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            position = [instance["action"], instance["id"]]
+        else:
+            position = [instance.action, instance.id]
+        return json.dumps(position, ensure_ascii=False)
+
+
+class HabitPaginationMixin:
+    """
+    Выбор пагинации для списков привычек: курсорная, если в запросе есть
+    параметр cursor (для первой страницы - пустой), иначе постраничная.
+    """
+
+    pagination_class = HabitPagination
+    cursor_pagination_class = HabitCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            cursor_query_param = self.cursor_pagination_class.cursor_query_param
+            if request is not None and cursor_query_param in request.query_params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
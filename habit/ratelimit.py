@@ -0,0 +1,115 @@
+import time
+
+import redis
+
+from config.settings import (
+    CELERY_BROKER_URL,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_ACQUIRE_TIMEOUT,
+)
+
+# KEYS: общий бакет бота, бакет чата, ключ паузы после ответа 429.
+# ARGV: скорость и ёмкость общего бакета, скорость и ёмкость бакета чата.
+# Возвращает 0, если токены взяты из обоих бакетов, иначе сколько
+# миллисекунд нужно подождать перед следующей попыткой.
+TOKEN_BUCKET_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[3])
+if pause > 0 then
+    return pause
+end
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local function refill(key, rate, capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    if tokens == nil then
+        return capacity
+    end
+    local elapsed = math.max(0, now - tonumber(bucket[2]))
+    return math.min(capacity, tokens + elapsed * rate / 1000)
+end
+
+local function store(key, tokens, rate, capacity)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity * 1000 / rate) + 1000)
+end
+
+local global_rate, global_capacity = tonumber(ARGV[1]), tonumber(ARGV[2])
+local chat_rate, chat_capacity = tonumber(ARGV[3]), tonumber(ARGV[4])
+local global_tokens = refill(KEYS[1], global_rate, global_capacity)
+local chat_tokens = refill(KEYS[2], chat_rate, chat_capacity)
+
+if global_tokens >= 1 and chat_tokens >= 1 then
+    store(KEYS[1], global_tokens - 1, global_rate, global_capacity)
+    store(KEYS[2], chat_tokens - 1, chat_rate, chat_capacity)
+    return 0
+end
+
+local wait = 0
+if global_tokens < 1 then
+    wait = math.max(wait, math.ceil((1 - global_tokens) * 1000 / global_rate))
+end
+if chat_tokens < 1 then
+    wait = math.max(wait, math.ceil((1 - chat_tokens) * 1000 / chat_rate))
+end
+return wait
+"""
+
+
+class TelegramRateLimiter:
+    """
+    Распределённый token bucket для отправки сообщений в телеграм.
+    Состояние хранится в Redis, поэтому лимиты общие для всех воркеров:
+    не больше global_rate сообщений в секунду на бота и chat_rate на чат.
+    """
+
+    def __init__(
+        self,
+        client,
+        global_rate=TELEGRAM_GLOBAL_RATE,
+        chat_rate=TELEGRAM_CHAT_RATE,
+        prefix="telegram:ratelimit",
+    ):
+        self.client = client
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.prefix = prefix
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def get_wait(self, chat_id):
+        """Пытается взять токены, возвращает время ожидания в секундах"""
+        keys = (
+            f"{self.prefix}:global",
+            f"{self.prefix}:chat:{chat_id}",
+            f"{self.prefix}:pause",
+        )
+        args = (self.global_rate, self.global_rate, self.chat_rate, 1)
+        return self.script(keys=keys, args=args) / 1000
+
+    def acquire(self, chat_id, timeout=TELEGRAM_ACQUIRE_TIMEOUT):
+        """Ждёт разрешения на отправку сообщения в чат, не дольше timeout"""
+        deadline = time.monotonic() + timeout
+        while wait := self.get_wait(chat_id):
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+        return True
+
+    def pause(self, retry_after):
+        """Останавливает отправку всеми воркерами на retry_after секунд"""
+        self.client.set(f"{self.prefix}:pause", 1, px=max(1, int(retry_after * 1000)))
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """Лимитер на Redis брокера Celery или None, если Redis не настроен"""
+    global _rate_limiter
+    if _rate_limiter is None and CELERY_BROKER_URL:
+        if CELERY_BROKER_URL.startswith(("redis://", "rediss://", "unix://")):
+            _rate_limiter = TelegramRateLimiter(redis.Redis.from_url(CELERY_BROKER_URL))
+    return _rate_limiter
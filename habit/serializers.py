@@ -1,5 +1,6 @@
+from django.utils import timezone
 from rest_framework import serializers
-from habit.models import Habit
+from habit.models import Habit, HabitCompletion, HabitStats
 from habit.validators import (
     TimeValidator,
     PeriodicityValidator,
@@ -11,9 +12,16 @@ from habit.validators import (
 class HabitSerializer(serializers.ModelSerializer):
     """Сериализатор модели привычки"""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Habit
-        fields = "__all__"
+        exclude = ("next_due_at", "updated_at")
 
         validators = [
             HabitAwardValidator(field="award"),
@@ -21,3 +29,119 @@ class HabitSerializer(serializers.ModelSerializer):
             PeriodicityValidator(periodicity="periodicity"),
             TimeValidator(complete_time="complete_time"),
         ]
+
+
+class PrefetchedRelatedHabitField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле связанной привычки, которое ищет привычку среди загруженных заранее
+    в context["related_habits"], а не отдельным запросом на каждый объект.
+    """
+
+    def to_internal_value(self, data):
+        related_habits = self.context.get("related_habits")
+        if related_habits is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return related_habits[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class HabitBulkSerializer(HabitSerializer):
+    """Сериализатор привычки для пакетных операций"""
+
+    related_habit = PrefetchedRelatedHabitField(
+        queryset=Habit.objects.all(), allow_null=True, required=False
+    )
+
+    class Meta(HabitSerializer.Meta):
+        read_only_fields = ("owner",)
+
+
+def to_isoformat(value):
+    return value.isoformat()
+
+
+class HabitReadSerializer(serializers.BaseSerializer):
+    """
+    Сериализатор привычки только для чтения списков. Строит ответ из строк
+    queryset.values(*fields) без создания моделей и полей DRF; вывод совпадает
+    с выводом HabitSerializer. Набор полей можно сузить через context["fields"].
+    """
+
+    fields = (
+        "id",
+        "place",
+        "time",
+        "date",
+        "action",
+        "is_pleasant",
+        "periodicity",
+        "award",
+        "complete_time",
+        "is_published",
+        "owner",
+        "related_habit",
+    )
+    formatters = {
+        "time": to_isoformat,
+        "date": to_isoformat,
+        "complete_time": to_isoformat,
+    }
+
+    def to_representation(self, row):
+        data = {}
+        for field in self.context.get("fields", self.fields):
+            value = row[field]
+            if value is not None and field in self.formatters:
+                value = self.formatters[field](value)
+            data[field] = value
+        return data
+
+
+class HabitCompletionSerializer(serializers.ModelSerializer):
+    """Сериализатор отметки о выполнении привычки"""
+
+    occurred_on = serializers.DateField(required=False)
+
+    class Meta:
+        model = HabitCompletion
+        fields = ("habit", "occurred_on", "completed_at")
+        read_only_fields = ("habit", "completed_at")
+
+    def validate_occurred_on(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError("Нельзя отметить выполнение в будущем")
+        return value
+
+
+class HabitStatsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор статистики привычки. Текущая серия и доля выполнений
+    считаются по агрегатам на сегодняшний день.
+    """
+
+    current_streak = serializers.SerializerMethodField()
+    completion_rate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = HabitStats
+        fields = (
+            "habit",
+            "completions",
+            "current_streak",
+            "longest_streak",
+            "completion_rate",
+            "first_occurred_on",
+            "last_occurred_on",
+        )
+
+    def get_current_streak(self, obj):
+        return obj.get_current_streak(obj.habit.periodicity)
+
+    def get_completion_rate(self, obj):
+        return obj.get_completion_rate(obj.habit.periodicity)
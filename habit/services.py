@@ -1,11 +1,276 @@
+import time
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import requests
-from config.settings import BOT_TOKEN, TELEGRAM_URL
+from django.db import connection, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
+from config.metrics import TELEGRAM_DURATION, TELEGRAM_MESSAGES
+from config.settings import (
+    BOT_TOKEN,
+    TELEGRAM_URL,
+    TELEGRAM_TIMEOUT,
+    TELEGRAM_MAX_WORKERS,
+    TELEGRAM_MAX_RETRIES,
+    NOTIFICATION_BATCH_SIZE,
+    NOTIFICATION_MAX_ATTEMPTS,
+    NOTIFICATION_RETRY_DELAY,
+    NOTIFICATION_LEASE,
+)
+from habit.cache import invalidate_user_stats
+from habit.models import (
+    LATENESS_BUCKETS,
+    HabitCompletion,
+    HabitStats,
+    Notification,
+    ReminderLateness,
+)
+from habit.ratelimit import get_rate_limiter
 
-def send_tg_message(text, chat_id):
-    """Функция отправки сообщения в телеграм"""
+DeliveryResult = namedtuple(
+    "DeliveryResult", ("chat_id", "ok", "status_code", "latency", "error", "sent_at")
+)
+DeliveryResult.__doc__ = (
+    "Результат отправки одного сообщения в телеграм; sent_at - время ответа "
+    "или ошибки, с учётом ожидания потока и лимитера"
+)
+
+RATE_LIMITED = "rate limited"
+
+_session = None
+
+
+def get_session():
+    """Общая сессия с пулом keep-alive соединений к API телеграма"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_MAX_WORKERS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def get_retry_after(response):
+    """Время ожидания в секундах из ответа 429 телеграма"""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return float(response.headers.get("Retry-After", 1))
+
+
+def request_tg_message(text, chat_id):
+    """
+    Отправка сообщения в телеграм.
+    Перед каждой попыткой берёт разрешение у общего лимитера, при ответе 429
+    выдерживает retry_after и повторяет отправку.
+    """
     params = {
         "text": text,
         "chat_id": chat_id,
     }
-    requests.get(f"{TELEGRAM_URL}{BOT_TOKEN}/sendMessage", params=params)
+    rate_limiter = get_rate_limiter()
+    started = time.perf_counter()
+    for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+        if rate_limiter and not rate_limiter.acquire(chat_id):
+            return DeliveryResult(
+                chat_id,
+                False,
+                None,
+                time.perf_counter() - started,
+                RATE_LIMITED,
+                timezone.now(),
+            )
+        try:
+            response = get_session().get(
+                f"{TELEGRAM_URL}{BOT_TOKEN}/sendMessage",
+                params=params,
+                timeout=TELEGRAM_TIMEOUT,
+            )
+        except requests.RequestException as error:
+            return DeliveryResult(
+                chat_id,
+                False,
+                None,
+                time.perf_counter() - started,
+                str(error),
+                timezone.now(),
+            )
+        if response.status_code != 429 or attempt == TELEGRAM_MAX_RETRIES:
+            break
+        retry_after = get_retry_after(response)
+        if rate_limiter:
+            rate_limiter.pause(retry_after)
+        else:
+            time.sleep(retry_after)
+    latency = time.perf_counter() - started
+    error = None if response.ok else response.text
+    return DeliveryResult(
+        chat_id, response.ok, response.status_code, latency, error, timezone.now()
+    )
+
+
+def send_tg_message(text, chat_id):
+    """Функция отправки сообщения в телеграм с записью метрик отправки"""
+    result = request_tg_message(text, chat_id)
+    if result.status_code:
+        status = result.status_code
+    else:
+        status = "rate_limited" if result.error == RATE_LIMITED else "error"
+    TELEGRAM_DURATION.observe(result.latency, status=status)
+    TELEGRAM_MESSAGES.inc(status=status)
+    return result
+
+
+def send_tg_messages(messages, max_workers=TELEGRAM_MAX_WORKERS):
+    """
+    Параллельная отправка пачки сообщений в телеграм.
+    Принимает пары (chat_id, text), возвращает результаты в том же порядке.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    workers = min(max_workers, len(messages))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                lambda message: send_tg_message(message[1], message[0]), messages
+            )
+        )
+
+
+def is_retryable(result):
+    """Можно ли повторить отправку: сетевые ошибки, 429 и ошибки сервера"""
+    return (
+        result.status_code is None
+        or result.status_code == 429
+        or (result.status_code >= 500)
+    )
+
+
+def claim_notifications(queryset, limit=NOTIFICATION_BATCH_SIZE):
+    """
+    Захватывает пачку ожидающих уведомлений, срок попытки которых наступил.
+    Строки, заблокированные другими воркерами, пропускаются; захваченным
+    увеличивается число попыток и сдвигается next_retry_at на время аренды,
+    чтобы после падения воркера уведомление было отправлено повторно.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        notifications = list(
+            queryset.filter(status=Notification.STATUS_PENDING, next_retry_at__lte=now)
+            .select_for_update(skip_locked=True)
+            .only("id", "due_at", "chat_id", "text", "attempts")
+            .order_by()[:limit]
+        )
+        for notification in notifications:
+            notification.attempts += 1
+            notification.next_retry_at = now + timedelta(seconds=NOTIFICATION_LEASE)
+        Notification.objects.bulk_update(notifications, ["attempts", "next_retry_at"])
+    return notifications
+
+
+def deliver_notifications(queryset, limit=NOTIFICATION_BATCH_SIZE):
+    """
+    Отправка одной пачки уведомлений из outbox.
+    Неудачные попытки повторяются с экспоненциальной задержкой, пока не
+    исчерпан NOTIFICATION_MAX_ATTEMPTS или ошибка не окажется постоянной.
+    """
+    notifications = claim_notifications(queryset, limit)
+    if not notifications:
+        return {"sent": 0, "failed": 0, "claimed": 0}
+    results = send_tg_messages(
+        [(notification.chat_id, notification.text) for notification in notifications]
+    )
+    now = timezone.now()
+    counts = {"sent": 0, "failed": 0, "claimed": len(notifications)}
+    for notification, result in zip(notifications, results):
+        notification.last_error = result.error
+        if result.ok:
+            notification.status = Notification.STATUS_SENT
+            # Пачка отправляется десятки секунд: время каждого сообщения
+            notification.sent_at = result.sent_at
+            counts["sent"] += 1
+            continue
+        counts["failed"] += 1
+        if is_retryable(result) and notification.attempts < NOTIFICATION_MAX_ATTEMPTS:
+            delay = NOTIFICATION_RETRY_DELAY * 2 ** (notification.attempts - 1)
+            notification.next_retry_at = now + timedelta(seconds=delay)
+        else:
+            notification.status = Notification.STATUS_FAILED
+    Notification.objects.bulk_update(
+        notifications, ["status", "sent_at", "next_retry_at", "last_error"]
+    )
+    record_lateness(
+        (notification.due_at, notification.sent_at)
+        for notification in notifications
+        if notification.status == Notification.STATUS_SENT
+    )
+    return counts
+
+
+def record_lateness(sends):
+    """
+    Добавляет опоздания отправки к гистограмме ReminderLateness одним
+    запросом INSERT ... ON CONFLICT. Принимает пары (due_at, sent_at).
+    """
+    counts = Counter()
+    for due_at, sent_at in sends:
+        period = due_at.replace(minute=0, second=0, microsecond=0)
+        bucket = bisect_left(LATENESS_BUCKETS, (sent_at - due_at).total_seconds())
+        counts[(period, bucket)] += 1
+    if not counts:
+        return
+    table = ReminderLateness._meta.db_table
+    values = ", ".join(["(%s, %s, %s)"] * len(counts))
+    # Строки блокируются в порядке VALUES: единый порядок у всех воркеров
+    # исключает взаимную блокировку
+    params = [
+        value
+        for (period, bucket), count in sorted(counts.items())
+        for value in (period, bucket, count)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (period, bucket, count) VALUES {values} "
+            f"ON CONFLICT (period, bucket) DO UPDATE SET count = {table}.count + EXCLUDED.count",
+            params,
+        )
+
+
+def complete_habit(habit, occurred_on=None):
+    """
+    Отметка о выполнении привычки с обновлением её агрегатов в той же
+    транзакции. Строка агрегатов блокируется, поэтому параллельные отметки
+    одной привычки применяются по очереди. Повторная отметка дня ничего
+    не меняет. Возвращает (выполнение, агрегаты, создано ли выполнение).
+    """
+    if occurred_on is None:
+        occurred_on = timezone.localdate()
+    with transaction.atomic():
+        stats, _ = HabitStats.objects.select_for_update().get_or_create(habit=habit)
+        stats.habit = habit
+        # Отметки привычки уже упорядочены блокировкой агрегатов
+        completion = HabitCompletion.objects.filter(
+            habit=habit, occurred_on=occurred_on
+        ).first()
+        created = completion is None
+        if created:
+            completion = HabitCompletion.objects.create(
+                habit=habit, occurred_on=occurred_on
+            )
+            if not stats.add_completion(occurred_on, habit.periodicity):
+                stats.rebuild(
+                    habit.completions.order_by("occurred_on").values_list(
+                        "occurred_on", flat=True
+                    ),
+                    habit.periodicity,
+                )
+            stats.save()
+            transaction.on_commit(lambda: invalidate_user_stats(habit.owner_id))
+    return completion, stats, created
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from habit.cache import invalidate_public_list, invalidate_user_stats
+from habit.models import Habit
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def habit_changed(sender, instance, **kwargs):
+    """Сброс кэша списка публичных привычек и статистики владельца"""
+    invalidate_public_list()
+    if instance.owner_id is not None:
+        invalidate_user_stats(instance.owner_id)
@@ -0,0 +1,179 @@
+from datetime import date, timedelta
+from itertools import chain
+
+import numpy as np
+from django.db import connection
+
+from habit.models import Habit, HabitCompletion
+
+EPOCH = date(1970, 1, 1)
+# 1 января 1970 года - четверг: день недели с понедельника = (день эпохи + 3) % 7
+EPOCH_WEEKDAY = 3
+ROLLING_WINDOWS = (7, 30)
+
+
+def to_epoch_day(value):
+    return (value - EPOCH).days
+
+
+def to_list(values):
+    """Список для JSON: NaN заменяется на None"""
+    return [None if value != value else value for value in values.tolist()]
+
+
+def get_rates(completed, expected):
+    """Доли выполнения (не больше 1) или NaN, где наступлений не было"""
+    rates = np.full(len(expected), np.nan)
+    np.divide(completed, expected, out=rates, where=expected > 0)
+    return np.round(np.minimum(rates, 1), 4)
+
+
+def load_completions(owner_id, start, end):
+    """
+    Отметки о выполнении привычек пользователя за дни [start, end] одним
+    запросом: массивы id привычек (int64, как BigAutoField) и дней эпохи int32.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT c.habit_id, c.occurred_on - %s "
+            f"FROM {HabitCompletion._meta.db_table} c "
+            f"JOIN {Habit._meta.db_table} h ON h.id = c.habit_id "
+            f"WHERE h.owner_id = %s AND c.occurred_on BETWEEN %s AND %s",
+            [EPOCH, owner_id, start, end],
+        )
+        rows = cursor.fetchall()
+    values = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 2)
+    values = values.reshape(-1, 2)
+    return values[:, 0], values[:, 1].astype(np.int32)
+
+
+def load_habits(owner_id):
+    """Привычки пользователя: массивы id, дней эпохи начала и периодичности"""
+    rows = list(
+        Habit.objects.filter(owner_id=owner_id)
+        .order_by("id")
+        .values_list("id", "date", "periodicity")
+    )
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([to_epoch_day(row[1]) for row in rows], dtype=np.int32),
+        np.array([row[2] for row in rows], dtype=np.int32),
+    )
+
+
+def get_first_occurrences(dates, periodicities, start):
+    """
+    Первое наступление каждой привычки не раньше дня start. Наступления
+    привычки - date + periodicity * k при k >= 1, как у напоминаний.
+    """
+    first = dates + periodicities
+    skipped = np.maximum(-((first - start) // periodicities), 0)
+    return first + skipped * periodicities
+
+
+def get_expected_daily(first, periodicities, length):
+    """
+    Число наступлений привычек по дням окна длины length. Для каждой
+    периодичности p отмечаются первые наступления, затем накопленная сумма
+    с шагом p размножает их на каждый p-й день.
+    """
+    expected = np.zeros(length, dtype=np.int64)
+    for periodicity in np.unique(periodicities):
+        offsets = first[(periodicities == periodicity) & (first < length)]
+        daily = np.bincount(offsets, minlength=length)
+        for residue in range(periodicity):
+            daily[residue::periodicity] = np.cumsum(daily[residue::periodicity])
+        expected += daily
+    return expected
+
+
+def get_rolling_sum(values, window):
+    """Сумма за window последних дней для каждого дня"""
+    cumulative = np.concatenate(
+        (np.zeros(window, dtype=values.dtype), np.cumsum(values))
+    )
+    return cumulative[window:] - cumulative[:-window]
+
+
+def build_user_statistics(owner_id, days, today):
+    """
+    Статистика выполнения привычек пользователя за days дней по today:
+    тепловая карта выполнений по дням, доли выполнения по дням недели,
+    скользящие доли за 7 и 30 дней и ожидаемые и фактические выполнения
+    по каждой привычке. Расчёт векторный по массивам NumPy.
+    """
+    end = to_epoch_day(today)
+    start = end - days + 1
+    # Скользящие окна в начале периода захватывают дни до него
+    history_start = start - max(ROLLING_WINDOWS) + 1
+    length = end - history_start + 1
+
+    habit_ids, dates, periodicities = load_habits(owner_id)
+    completion_habits, completion_days = load_completions(
+        owner_id,
+        EPOCH + timedelta(days=history_start),
+        today,
+    )
+
+    completed_daily = np.bincount(completion_days - history_start, minlength=length)
+    first = get_first_occurrences(dates, periodicities, history_start) - history_start
+    expected_daily = get_expected_daily(first, periodicities, length)
+
+    rolling = {
+        str(window): to_list(
+            get_rates(
+                get_rolling_sum(completed_daily, window),
+                get_rolling_sum(expected_daily, window),
+            )[-days:]
+        )
+        for window in ROLLING_WINDOWS
+    }
+    completed_daily = completed_daily[-days:]
+    expected_daily = expected_daily[-days:]
+
+    weekdays = (np.arange(start, end + 1) + EPOCH_WEEKDAY) % 7
+    weekday_completed = np.bincount(weekdays, weights=completed_daily, minlength=7)
+    weekday_expected = np.bincount(weekdays, weights=expected_daily, minlength=7)
+
+    first = get_first_occurrences(dates, periodicities, start)
+    habit_expected = np.where(
+        first <= end, (end - first) // np.maximum(periodicities, 1) + 1, 0
+    )
+    in_period = completion_days >= start
+    habit_completed = np.bincount(
+        np.searchsorted(habit_ids, completion_habits[in_period]),
+        minlength=len(habit_ids),
+    )
+    habit_rates = get_rates(habit_completed, habit_expected)
+
+    total_completed = int(completed_daily.sum())
+    total_expected = int(expected_daily.sum())
+    return {
+        "start": (EPOCH + timedelta(days=start)).isoformat(),
+        "end": today.isoformat(),
+        "days": days,
+        "totals": {
+            "expected": total_expected,
+            "completed": total_completed,
+            "rate": to_list(
+                get_rates(np.array([total_completed]), np.array([total_expected]))
+            )[0],
+        },
+        "heatmap": completed_daily.tolist(),
+        "expected": expected_daily.tolist(),
+        "rolling": rolling,
+        "weekdays": {
+            "expected": weekday_expected.astype(np.int64).tolist(),
+            "completed": weekday_completed.astype(np.int64).tolist(),
+            "rate": to_list(get_rates(weekday_completed, weekday_expected)),
+        },
+        "habits": [
+            {"id": habit_id, "expected": expected, "completed": completed, "rate": rate}
+            for habit_id, expected, completed, rate in zip(
+                habit_ids.tolist(),
+                habit_expected.tolist(),
+                habit_completed.tolist(),
+                to_list(habit_rates),
+            )
+        ],
+    }
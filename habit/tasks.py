@@ -1,25 +1,160 @@
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models.functions import Mod
 from django.utils import timezone
-from celery import shared_task
+from celery import chord, group, shared_task
+
+from config.metrics import REMINDER_DURATION, REMINDER_HABITS
+from config.settings import (
+    CELERY_RESULT_BACKEND,
+    REMINDER_SHARDS,
+    NOTIFICATION_BATCH_SIZE,
+)
+from habit.models import Habit, Notification, get_next_occurrence
+from habit.services import deliver_notifications
+
+REMINDER_FIELDS = (
+    "id",
+    "owner__chat_id",
+    "action",
+    "place",
+    "complete_time",
+    "periodicity",
+    "next_due_at",
+)
+REMINDER_CHUNK_SIZE = 2000
+
+
+def get_reminder_text(action, place, complete_time):
+    """Текст напоминания о привычке"""
+    return (
+        f"Привет, друг, наступило время для {action}"
+        f" в {place}."
+        f"Тебе потребуется на это всего {complete_time} минут."
+    )
 
-from habit.models import Habit
-from habit.services import send_tg_message
+
+def remind_chunk(rows, window_end):
+    """
+    Постановка напоминаний по пачке строк в outbox и сдвиг расписания этих
+    привычек в одной транзакции, затем отправка поставленных уведомлений.
+    Ключ (привычка, время наступления) уникален, поэтому повторный или
+    пересекающийся тик не создаст дубликатов.
+    """
+    notifications = []
+    due_habits = []
+    for pk, chat_id, action, place, complete_time, periodicity, next_due_at in rows:
+        if chat_id:
+            notifications.append(
+                Notification(
+                    habit_id=pk,
+                    due_at=next_due_at,
+                    chat_id=chat_id,
+                    text=get_reminder_text(action, place, complete_time),
+                )
+            )
+        due_habits.append(
+            Habit(
+                pk=pk,
+                next_due_at=get_next_occurrence(next_due_at, periodicity, window_end),
+            )
+        )
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+        Habit.objects.bulk_update(due_habits, ["next_due_at"])
+    counts = {"sent": 0, "failed": 0}
+    if notifications:
+        counts = deliver_notifications(
+            Notification.objects.filter(
+                habit_id__in=[notification.habit_id for notification in notifications]
+            ),
+            limit=len(notifications),
+        )
+    return {
+        "sent": counts["sent"],
+        "skipped": len(due_habits) - len(notifications),
+        "failed": counts["failed"],
+    }
 
 
 @shared_task
 def reminder():
-    """Отложенная задача Celery для напоминания о выполнении привычки"""
-
-    now = timezone.now().today()
-    habits = Habit.objects.filter(time__gte=now.time())
-    for habit in habits:
-        owner = habit.owner.chat_id
-        date = habit.date + timedelta(days=habit.periodicity)
-        if date == now.date():
-            if owner:
-                text = (
-                    f"Привет, друг, наступило время для {habit.action}"
-                    f" в {habit.place}."
-                    f"Тебе потребуется на это всего {habit.complete_time} минут."
-                )
-                send_tg_message(text, owner)
+    """
+    Отложенная задача Celery для напоминания о выполнении привычки.
+    Делит привычки, срок которых наступает до конца текущей минуты, на шарды
+    по id и рассылает их группой подзадач reminder_shard, чтобы тик
+    обрабатывался всеми воркерами. Итоги шардов собирает reminder_summary,
+    если настроен CELERY_RESULT_BACKEND: без него chord не работает, и итоги
+    остаются только в метриках reminder_habits, которые пишет каждый шард.
+    """
+
+    window_end = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    header = [
+        reminder_shard.s(shard, REMINDER_SHARDS, window_end.isoformat())
+        for shard in range(REMINDER_SHARDS)
+    ]
+    if CELERY_RESULT_BACKEND:
+        chord(header)(reminder_summary.s())
+    else:
+        group(header).apply_async()
+
+
+@shared_task
+def reminder_shard(shard, shards, window_end):
+    """
+    Напоминания по одному шарду (id % shards == shard).
+    Выбирает по индексу next_due_at привычки шарда, срок которых наступает
+    до window_end (включая пропущенные тики), и сдвигает их расписание на
+    следующий период. Строки читаются одним запросом с JOIN владельца через
+    серверный курсор и обрабатываются пачками, поэтому память не растёт
+    с числом привычек.
+    """
+
+    window_end = datetime.fromisoformat(window_end)
+    rows = (
+        Habit.objects.annotate(shard=Mod("id", shards))
+        .filter(next_due_at__lt=window_end, shard=shard)
+        .order_by()
+        .values_list(*REMINDER_FIELDS)
+        .iterator(chunk_size=REMINDER_CHUNK_SIZE)
+    )
+    started = time.perf_counter()
+    totals = {"sent": 0, "skipped": 0, "failed": 0}
+    scanned = 0
+    while chunk := list(islice(rows, REMINDER_CHUNK_SIZE)):
+        scanned += len(chunk)
+        for key, value in remind_chunk(chunk, window_end).items():
+            totals[key] += value
+    REMINDER_DURATION.observe(time.perf_counter() - started)
+    REMINDER_HABITS.inc(scanned, result="scanned")
+    for key, value in totals.items():
+        REMINDER_HABITS.inc(value, result=key)
+    return totals
+
+
+@shared_task
+def reminder_summary(results):
+    """Суммирует итоги шардов тика напоминаний"""
+    totals = {"sent": 0, "skipped": 0, "failed": 0}
+    for result in results:
+        for key, value in result.items():
+            totals[key] += value
+    return totals
+
+
+@shared_task
+def deliver_pending_notifications():
+    """
+    Отложенная задача Celery для досылки уведомлений из outbox: пачками
+    отправляет ожидающие уведомления, срок повторной попытки которых наступил.
+    """
+    totals = {"sent": 0, "failed": 0}
+    while True:
+        counts = deliver_notifications(Notification.objects.all())
+        totals["sent"] += counts["sent"]
+        totals["failed"] += counts["failed"]
+        if counts["claimed"] < NOTIFICATION_BATCH_SIZE:
+            return totals
@@ -0,0 +1,308 @@
+import asyncio
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError, connection
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from config.metrics import REQUEST_DURATION, TELEGRAM_UPDATES
+from config.settings import (
+    TELEGRAM_SNOOZE_MINUTES,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_TIMEOUT,
+    TELEGRAM_WEBHOOK_WORKERS,
+)
+from habit.models import Habit, Notification
+from habit.services import complete_habit
+from users.models import User
+
+SECRET_HEADER = "HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN"
+UPDATE_KEY = "telegram:update:{update_id}"
+# Телеграм повторяет обновление, пока не получит ответ 200, не дольше суток
+UPDATE_KEY_TIMEOUT = 24 * 60 * 60
+MAX_SNOOZE_MINUTES = 24 * 60
+# Предел тела обновления для ASGI-приложения вебхука, как у запросов Django
+MAX_BODY_SIZE = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+DONE_COMMANDS = {"/done", "done", "готово", "сделал", "сделала", "сделано", "✅"}
+SNOOZE_COMMANDS = {"/snooze", "snooze", "позже", "отложить", "⏰"}
+HELP_TEXT = (
+    "Ответьте на напоминание: /done - привычка выполнена, "
+    f"/snooze [минуты] - напомнить позже (по умолчанию через "
+    f"{TELEGRAM_SNOOZE_MINUTES} минут)."
+)
+NO_REMINDER_TEXT = "Не нашёл напоминаний для этого чата."
+
+# Пока обрабатываются, задачи должны жить и после ответа телеграму
+_pending = set()
+_executor = None
+
+
+def get_executor():
+    """
+    Потоки обработки обновлений. Каждый держит своё соединение с базой
+    между обновлениями, вместо нового соединения на каждый запрос.
+    При TELEGRAM_WEBHOOK_WORKERS=0 обновления обрабатываются в потоке
+    запроса Django через sync_to_async.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=TELEGRAM_WEBHOOK_WORKERS, thread_name_prefix="telegram"
+        )
+    return _executor
+
+
+def parse_update(update):
+    """Пара (chat_id, текст) из обновления с сообщением или None"""
+    if not isinstance(update, dict):
+        return None
+    message = update.get("message") or update.get("edited_message")
+    if not isinstance(message, dict):
+        return None
+    try:
+        chat_id = str(message["chat"]["id"])
+    except (KeyError, TypeError):
+        return None
+    text = message.get("text")
+    if not isinstance(text, str):
+        return None
+    return chat_id, text.strip()
+
+
+def parse_command(text):
+    """Команда в нижнем регистре без имени бота (/done@bot) и её аргументы"""
+    command, *args = text.split() or [""]
+    return command.split("@", 1)[0].lower(), args
+
+
+def get_snooze_minutes(args):
+    if args and args[0].isdigit():
+        return min(max(int(args[0]), 1), MAX_SNOOZE_MINUTES)
+    return TELEGRAM_SNOOZE_MINUTES
+
+
+LAST_REMINDER_FIELDS = (
+    "habit_id",
+    "due_at",
+    "text",
+    "owner_id",
+    "periodicity",
+    "action",
+)
+LAST_REMINDER_SQL = (
+    f"SELECT n.habit_id, n.due_at, n.text, h.owner_id, h.periodicity, h.action "
+    f"FROM {Notification._meta.db_table} n "
+    f"JOIN {Habit._meta.db_table} h ON h.id = n.habit_id "
+    f"JOIN {User._meta.db_table} u ON u.id = h.owner_id "
+    f"WHERE u.chat_id = %s AND n.status = %s "
+    f"ORDER BY n.due_at DESC LIMIT 1"
+)
+
+
+def get_last_reminder(chat_id):
+    """
+    Последнее отправленное в чат напоминание. Пользователь находится
+    по индексу users.chat_id, напоминания - по индексу (habit, due_at).
+    Запрос готовым SQL: построение запроса ORM дороже его выполнения.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(LAST_REMINDER_SQL, [chat_id, Notification.STATUS_SENT])
+        row = cursor.fetchone()
+    return dict(zip(LAST_REMINDER_FIELDS, row)) if row else None
+
+
+def run_handler(chat_id, text):
+    """
+    Обработка в потоке исполнителя. Соединение, разорванное между
+    обновлениями, закрывается, и обработка повторяется один раз.
+    """
+    try:
+        return handle_update(chat_id, text)
+    except (InterfaceError, OperationalError):
+        if connection.in_atomic_block or connection.is_usable():
+            raise
+        connection.close()
+        return handle_update(chat_id, text)
+
+
+def process_update(update):
+    """
+    Синхронная часть обработки обновления: отбрасывание повторов по
+    update_id и ответ пользователю. Возвращает тело ответа вебхука или None.
+    """
+    message = parse_update(update)
+    if message is None:
+        TELEGRAM_UPDATES.inc(result="ignored")
+        return None
+    update_key = UPDATE_KEY.format(update_id=update.get("update_id"))
+    if not cache.add(update_key, 1, UPDATE_KEY_TIMEOUT):
+        TELEGRAM_UPDATES.inc(result="duplicate")
+        return None
+    chat_id, text = message
+    try:
+        result, reply = run_handler(chat_id, text)
+    except Exception:
+        # Телеграм повторит обновление после ответа 500
+        cache.delete(update_key)
+        raise
+    TELEGRAM_UPDATES.inc(result=result)
+    return {"method": "sendMessage", "chat_id": chat_id, "text": reply}
+
+
+def handle_update(chat_id, text):
+    """
+    Обработка ответа пользователя на напоминание: отметка о выполнении
+    привычки последнего напоминания или его повтор через несколько минут.
+    Возвращает (результат, текст ответа).
+    """
+    command, args = parse_command(text)
+    if command not in DONE_COMMANDS and command not in SNOOZE_COMMANDS:
+        return "help", HELP_TEXT
+    reminder = get_last_reminder(chat_id)
+    if reminder is None:
+        return "unknown", NO_REMINDER_TEXT
+    action = reminder["action"]
+
+    if command in DONE_COMMANDS:
+        habit = Habit(
+            pk=reminder["habit_id"],
+            owner_id=reminder["owner_id"],
+            periodicity=reminder["periodicity"],
+        )
+        _, stats, created = complete_habit(
+            habit, timezone.localdate(reminder["due_at"])
+        )
+        if not created:
+            return "done", f"Выполнение «{action}» уже отмечено."
+        return "done", (
+            f"Отмечено выполнение «{action}». Серия: {stats.current_streak}."
+        )
+
+    minutes = get_snooze_minutes(args)
+    due_at = timezone.now() + timedelta(minutes=minutes)
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                habit_id=reminder["habit_id"],
+                due_at=due_at,
+                chat_id=chat_id,
+                text=reminder["text"],
+                next_retry_at=due_at,
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    return "snooze", f"Напомню про «{action}» через {minutes} мин."
+
+
+def check_secret(secret):
+    """Совпадает ли секрет из заголовка с TELEGRAM_WEBHOOK_SECRET"""
+    return bool(TELEGRAM_WEBHOOK_SECRET) and hmac.compare_digest(
+        secret, TELEGRAM_WEBHOOK_SECRET.encode()
+    )
+
+
+async def receive_update(secret, body):
+    """
+    Приём обновления: проверка секрета и обработка в пуле потоков.
+    Ответ с методом Bot API телеграм выполнит сам, отдельный запрос к API
+    не нужен. Если обработка не уложилась в TELEGRAM_WEBHOOK_TIMEOUT,
+    телеграму сразу отвечается 200, а обработка завершается в фоне.
+    Возвращает (код ответа, тело ответа или None).
+    """
+    if not check_secret(secret):
+        return 403, None
+    try:
+        update = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return 400, None
+
+    if TELEGRAM_WEBHOOK_WORKERS:
+        future = asyncio.get_running_loop().run_in_executor(
+            get_executor(), process_update, update
+        )
+    else:
+        future = asyncio.ensure_future(sync_to_async(process_update)(update))
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    try:
+        reply = await asyncio.wait_for(asyncio.shield(future), TELEGRAM_WEBHOOK_TIMEOUT)
+    except asyncio.TimeoutError:
+        TELEGRAM_UPDATES.inc(result="timeout")
+        return 200, None
+    return 200, reply
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TelegramWebhookView(View):
+    """Асинхронный приёмник обновлений бота в приложении Django"""
+
+    http_method_names = ["post"]
+
+    async def post(self, request, *args, **kwargs):
+        status, reply = await receive_update(
+            request.META.get(SECRET_HEADER, "").encode(), request.body
+        )
+        if reply is None:
+            return HttpResponse(status=status)
+        return JsonResponse(reply)
+
+
+async def read_body(scope, receive):
+    """Тело запроса или None, если оно больше MAX_BODY_SIZE"""
+    content_length = dict(scope["headers"]).get(b"content-length", b"0")
+    if not content_length.isdigit() or int(content_length) > MAX_BODY_SIZE:
+        return None
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_SIZE:
+            return None
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def webhook_application(scope, receive, send):
+    """
+    ASGI-приложение вебхука в обход обработчика и middleware Django:
+    обновления приходят тысячами в секунду, а каждое прохождение цепочки
+    Django переключает потоки несколько раз. Секрет проверяется до чтения
+    тела, тело больше MAX_BODY_SIZE отклоняется с кодом 413.
+    """
+    started = time.perf_counter()
+    secret = dict(scope["headers"]).get(b"x-telegram-bot-api-secret-token", b"")
+    reply = None
+    if not check_secret(secret):
+        status = 403
+    else:
+        body = await read_body(scope, receive)
+        if body is None:
+            status = 413
+        else:
+            status, reply = await receive_update(secret, body)
+
+    content = orjson.dumps(reply) if reply is not None else b""
+    headers = [(b"content-length", str(len(content)).encode())]
+    if reply is not None:
+        headers.append((b"content-type", b"application/json"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})
+    REQUEST_DURATION.observe(
+        time.perf_counter() - started,
+        view="habit:telegram_webhook",
+        method="POST",
+        status=status,
+    )
@@ -1,11 +1,123 @@
+import asyncio
+import gc
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import AsyncMock, Mock, patch
+
+from asgiref.sync import async_to_sync
+
+import brotli
+import eventlet
+import msgpack
+import numpy as np
+import psycopg2
+import redis
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    connection,
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import LiveServerTestCase, TransactionTestCase
 from django.urls import reverse
+from django.utils import timezone
+from psycopg2 import extensions
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
 
-from habit.models import Habit
+from config.middleware import install_query_counter
+from config.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    LocalBackend,
+    RedisBackend,
+    Registry,
+)
+from config.postgresql_pool.pool import (
+    ConnectionPool,
+    eventlet_wait_callback,
+    install_wait_callback,
+)
+from config.renderers import OrjsonRenderer
+from config.settings import HABIT_BULK_MAX_SIZE, NOTIFICATION_BATCH_SIZE
+from config.testing import QueryBudget
+from habit.cache import get_or_build, invalidate_public_list
+from habit.conditional import AsyncConditionalGetMixin, ConditionalGetMixin
+from habit.models import (
+    Habit,
+    HabitCompletion,
+    HabitStats,
+    Notification,
+    ReminderLateness,
+)
+from habit.ratelimit import TelegramRateLimiter
+from habit.serializers import HabitSerializer, HabitReadSerializer
+from habit.views import (
+    HabitListAPIView,
+    HabitListAsyncAPIView,
+    HabitPersonAPIView,
+    HabitPersonAsyncAPIView,
+    HabitRetrieveAPIView,
+    HabitRetrieveAsyncAPIView,
+)
+from habit.statistics import (
+    get_expected_daily,
+    get_first_occurrences,
+    get_rolling_sum,
+)
+from habit.services import (
+    DeliveryResult,
+    claim_notifications,
+    complete_habit,
+    record_lateness,
+    send_tg_message,
+    send_tg_messages,
+)
+from habit.tasks import (
+    REMINDER_CHUNK_SIZE,
+    reminder,
+    reminder_shard,
+    reminder_summary,
+    deliver_pending_notifications,
+)
+from config.asgi import application
+from config.celery import app as celery_app
 from users.models import User
 
 
+def deliver(messages):
+    """Имитация отправки в телеграм: чат fail отвечает ошибкой 400, чат down - 502"""
+    status_codes = {"fail": 400, "down": 502}
+    return [
+        DeliveryResult(
+            chat_id,
+            chat_id not in status_codes,
+            status_codes.get(chat_id, 200),
+            0,
+            None if chat_id not in status_codes else "error",
+            timezone.now(),
+        )
+        for chat_id, text in messages
+    ]
+
+
 class HabitTestCase(APITestCase):
     """Тесты для модели привычки"""
 
@@ -239,6 +351,14 @@ class HabitTestCase(APITestCase):
             ],
         )
 
+    def test_zero_periodicity(self):
+        """Тест запрета нулевой периодичности в обход сериализатора"""
+        habit = Habit(owner=self.user, time="07:00", action="test", periodicity=0)
+        with self.assertRaises(ValidationError):
+            habit.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            habit.save()
+
     def test_list_habit_public(self):
         """Тест вывода списка публичных привычек"""
         url = reverse("habit:list_public")
@@ -292,3 +412,2125 @@ class HabitTestCase(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Habit.objects.count(), 0)
+
+
+class HabitConditionalGetTestCase(APITestCase):
+    """Тесты для условных GET-запросов (ETag / Last-Modified)"""
+
+    def setUp(self):
+        """Создание пользователя и привычки"""
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(owner=self.user, time="21:00", action="test")
+
+    def test_list_person_not_modified(self):
+        """Тест ответа 304 для неизменённого списка привычек пользователя"""
+        url = reverse("habit:list_person")
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+        self.assertNotIn("Last-Modified", response.headers)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(url, {"page_size": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.patch(
+            reverse("habit:habit_update", args=(self.habit.pk,)),
+            {"place": "test2", "periodicity": 1},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_person_deleted(self):
+        """Тест смены ETag списка после удаления привычки"""
+        Habit.objects.create(owner=self.user, time="21:00", action="test2")
+        Habit.objects.filter(pk=self.habit.pk).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        url = reverse("habit:list_person")
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Удаление не самой новой привычки не меняет max(updated_at)
+        self.habit.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_retrieve_not_modified(self):
+        """Тест ответа 304 для неизменённой привычки"""
+        url = reverse("habit:habit_retrieve", args=(self.habit.pk,))
+        etag = self.client.get(url).headers["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(user=User.objects.create(email="test2@test.ru"))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_related_habit_deleted(self):
+        """Тест смены ETag привычек, ссылавшихся на удалённую привычку"""
+        related = Habit.objects.create(
+            owner=User.objects.create(email="test2@test.ru"),
+            time="21:00",
+            action="related",
+            is_pleasant=True,
+        )
+        Habit.objects.filter(pk=self.habit.pk).update(
+            related_habit=related, updated_at=timezone.now() - timedelta(days=1)
+        )
+        urls = (
+            reverse("habit:habit_retrieve", args=(self.habit.pk,)),
+            reverse("habit:list_person"),
+        )
+        etags = [self.client.get(url).headers["ETag"] for url in urls]
+
+        related.delete()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.json()["results"][0]["related_habit"])
+
+    def test_default_validators(self):
+        """Тест ответа без условной обработки, если валидаторов нет"""
+
+        class View:
+            def get(self, request):
+                return "response"
+
+        class AsyncView:
+            async def get(self, request):
+                return "response"
+
+        class ConditionalView(ConditionalGetMixin, View):
+            pass
+
+        class AsyncConditionalView(AsyncConditionalGetMixin, AsyncView):
+            pass
+
+        self.assertEqual(ConditionalView().get(None), "response")
+        self.assertEqual(async_to_sync(AsyncConditionalView().get)(None), "response")
+
+
+class HabitReadSerializerTestCase(APITestCase):
+    """Тесты для сериализатора списков привычек по строкам .values()"""
+
+    def test_output_identical(self):
+        """Тест совпадения вывода с HabitSerializer байт в байт"""
+        user = User.objects.create(email="test1@test.ru")
+        pleasant = Habit.objects.create(
+            owner=user, time="07:00:00.123456", action="приятная", is_pleasant=True
+        )
+        Habit.objects.create(
+            owner=user,
+            place="Дом",
+            time="21:00",
+            date="2024-02-29",
+            action="test",
+            related_habit=pleasant,
+            complete_time="00:01:30",
+            is_published=True,
+        )
+        Habit.objects.create(time="06:00", action="без владельца")
+
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(
+                HabitReadSerializer(
+                    Habit.objects.values(*HabitReadSerializer.fields), many=True
+                ).data
+            ),
+            renderer.render(HabitSerializer(Habit.objects.all(), many=True).data),
+        )
+
+
+class HabitSparseFieldsTestCase(APITestCase):
+    """Тесты для выбора полей ответа параметрами fields и exclude"""
+
+    def setUp(self):
+        """Создание пользователя и привычки"""
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(
+            owner=self.user, place="Дом", time="21:00", action="test", is_published=True
+        )
+
+    def test_list_fields(self):
+        """Тест выбора полей в списках и выборки только этих столбцов"""
+        for name in ("habit:list_person", "habit:list_public"):
+            url = reverse(name)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"fields": "action,place"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                response.json()["results"], [{"place": "Дом", "action": "test"}]
+            )
+            select = queries.captured_queries[-1]["sql"]
+            self.assertIn('"place"', select)
+            self.assertNotIn('"award"', select)
+
+            response = self.client.get(url, {"exclude": "owner,related_habit"})
+            self.assertNotIn("owner", response.json()["results"][0])
+            self.assertIn("periodicity", response.json()["results"][0])
+
+    def test_cursor_fields(self):
+        """Тест курсорной пагинации при выборе полей без ключа курсора"""
+        Habit.objects.create(owner=self.user, time="21:00", action="test2")
+        url = reverse("habit:list_person")
+        response = self.client.get(
+            url, {"fields": "place", "cursor": "", "page_size": 1}
+        )
+        self.assertEqual(response.json()["results"], [{"place": "Дом"}])
+        response = self.client.get(response.json()["next"])
+        self.assertEqual(response.json()["results"], [{"place": None}])
+
+    def test_retrieve_fields(self):
+        """Тест выбора полей при просмотре привычки"""
+        url = reverse("habit:habit_retrieve", args=(self.habit.pk,))
+        response = self.client.get(url, {"fields": "id,action"})
+        self.assertEqual(response.json(), {"id": self.habit.pk, "action": "test"})
+        etag = response.headers["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_fields(self):
+        """Тест ошибки при неизвестных полях или пустом выборе"""
+        url = reverse("habit:list_person")
+        response = self.client.get(url, {"fields": "action,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.json())
+        response = self.client.get(
+            url, {"exclude": ",".join(HabitReadSerializer.fields)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitRenderTestCase(APITestCase):
+    """Тесты для рендереров orjson и MessagePack и сжатия ответов"""
+
+    def setUp(self):
+        """Создание пользователя и привычек"""
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        for i in range(10):
+            Habit.objects.create(owner=self.user, time="21:00", action=f"Привычка {i}")
+
+    def test_orjson_output_identical(self):
+        """Тест совпадения вывода orjson с JSONRenderer DRF"""
+        data = HabitReadSerializer(
+            Habit.objects.values(*HabitReadSerializer.fields), many=True
+        ).data
+        self.assertEqual(OrjsonRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            OrjsonRenderer().render({"text": "\u2028", "delay": timedelta(seconds=90)}),
+            JSONRenderer().render({"text": "\u2028", "delay": timedelta(seconds=90)}),
+        )
+
+    def test_msgpack(self):
+        """Тест ответа и запроса в формате MessagePack"""
+        url = reverse("habit:list_person")
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            msgpack.unpackb(response.content),
+            self.client.get(url).json(),
+        )
+
+        response = self.client.post(
+            reverse("habit:habit_create"),
+            {"time": "07:00", "action": "msgpack", "periodicity": 1},
+            format="msgpack",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_json_parse_error(self):
+        """Тест ошибки разбора некорректного JSON"""
+        response = self.client.post(
+            reverse("habit:habit_create"), "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compression(self):
+        """Тест сжатия больших ответов brotli и gzip"""
+        url = reverse("habit:list_person")
+        plain = self.client.get(url, {"page_size": 10})
+        etag = plain["ETag"]
+
+        response = self.client.get(
+            url, {"page_size": 10}, HTTP_ACCEPT_ENCODING="gzip, deflate, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(response["ETag"], "W/" + etag)
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+        response = self.client.get(url, {"page_size": 10}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        response = self.client.get(
+            url, {"page_size": 1}, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class HabitBulkTestCase(APITestCase):
+    """Тесты для пакетных операций с привычками"""
+
+    def setUp(self):
+        """Создание пользователя и его приятной привычки"""
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(
+            owner=self.user, time="21:00", action="pleasant", is_pleasant=True
+        )
+
+    def get_items(self, count):
+        return [
+            {
+                "time": "22:00",
+                "action": f"test{i}",
+                "periodicity": 1,
+                "related_habit": self.pleasant.pk,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Тест пакетного создания привычек"""
+        url = reverse("habit:habit_bulk_create")
+        response = self.client.post(url, self.get_items(3), format="json")
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Habit.objects.filter(owner=self.user).count(), 4)
+        self.assertEqual(data[0]["data"]["related_habit"], self.pleasant.pk)
+        self.assertEqual(data[0]["data"]["owner"], self.user.pk)
+        habit = Habit.objects.get(pk=data[0]["data"]["id"])
+        self.assertEqual(habit.next_due_at, habit.get_next_due_at())
+
+        with CaptureQueriesContext(connection) as small_batch:
+            self.client.post(url, self.get_items(2), format="json")
+        with self.assertNumQueries(len(small_batch)):
+            self.client.post(url, self.get_items(20), format="json")
+
+    def test_bulk_create_errors(self):
+        """Тест результатов по элементам при ошибках валидации"""
+        items = self.get_items(2)
+        items[1]["award"] = "award"
+        response = self.client.post(
+            reverse("habit:habit_bulk_create"), items, format="json"
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(data[0]["status"], status.HTTP_201_CREATED)
+        self.assertEqual(
+            data[1]["errors"]["non_field_errors"],
+            ["У привычки может быть либо вознаграждение, либо приятная привычка"],
+        )
+        self.assertEqual(Habit.objects.count(), 2)
+
+        response = self.client.post(
+            reverse("habit:habit_bulk_create"), {"action": "test"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Тест пакетного редактирования привычек"""
+        other = User.objects.create(email="test2@test.ru")
+        foreign = Habit.objects.create(owner=other, time="21:00", action="foreign")
+        habit = Habit.objects.create(owner=self.user, time="21:00", action="test")
+        items = [
+            {"id": habit.pk, "time": "10:00", "action": "updated", "periodicity": 2},
+            {"id": foreign.pk, "time": "10:00", "action": "updated", "periodicity": 2},
+        ]
+        response = self.client.put(
+            reverse("habit:habit_bulk_update"), items, format="json"
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(data[0]["data"]["action"], "updated")
+        self.assertEqual(data[1], {"status": 404, "id": foreign.pk})
+        habit.refresh_from_db()
+        self.assertEqual(habit.periodicity, 2)
+        self.assertEqual(habit.next_due_at, habit.get_next_due_at())
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.action, "foreign")
+
+    def test_bulk_delete(self):
+        """Тест пакетного удаления привычек"""
+        habit = Habit.objects.create(owner=self.user, time="21:00", action="test")
+        url = reverse("habit:habit_bulk_delete")
+        response = self.client.delete(url, [habit.pk, self.pleasant.pk], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Habit.objects.count(), 0)
+
+        response = self.client.delete(url, [habit.pk], format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HabitListCacheTestCase(APITestCase):
+    """Тесты для кэша списка публичных привычек"""
+
+    def setUp(self):
+        """Создание пользователя и публичной привычки"""
+        # Кэш тестов LocMemCache общий: тесты идут в одном процессе
+        patcher = patch("habit.cache.HABIT_CACHE", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(
+            owner=self.user, time="21:00", action="test", is_published=True
+        )
+        self.url = reverse("habit:list_public")
+
+    def test_list_cached(self):
+        """Тест ответа из кэша без запросов к базе"""
+        self.assertEqual(self.client.get(self.url).json()["count"], 1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()["count"], 1)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"page_size": 1})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_list_invalidation(self):
+        """Тест сброса кэша при сохранении и удалении привычки"""
+        self.client.get(self.url)
+        Habit.objects.create(
+            owner=self.user, time="22:00", action="test2", is_published=True
+        )
+        self.assertEqual(self.client.get(self.url).json()["count"], 2)
+
+        self.habit.delete()
+        self.assertEqual(self.client.get(self.url).json()["count"], 1)
+
+    def test_stale_while_revalidate(self):
+        """Тест выдачи устаревших данных, пока страница перестраивается"""
+        self.assertEqual(get_or_build("key", lambda: "old"), "old")
+        invalidate_public_list()
+        cache.add("key:lock", 1)
+        self.assertEqual(get_or_build("key", lambda: "new"), "old")
+        cache.delete("key:lock")
+        self.assertEqual(get_or_build("key", lambda: "new"), "new")
+
+    def test_list_without_shared_cache(self):
+        """Тест списка без кэша в процессе, если общего кэша нет"""
+        with patch("habit.cache.HABIT_CACHE", False):
+            self.client.get(self.url)
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url)
+        self.assertEqual(response.json()["count"], 1)
+
+
+class HabitCursorPaginationTestCase(APITestCase):
+    """Тесты для курсорной пагинации списков привычек"""
+
+    def setUp(self):
+        """Создание привычек с повторяющимися действиями"""
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.habits = [
+            Habit.objects.create(
+                owner=self.user, time="21:00", action=f"test{i % 3}", is_published=True
+            )
+            for i in range(12)
+        ]
+        self.expected = [
+            habit.pk for habit in sorted(self.habits, key=lambda h: (h.action, h.pk))
+        ]
+
+    def test_cursor_pages(self):
+        """Тест обхода списка по курсору вперёд и назад"""
+        for url_name in ("habit:list_public", "habit:list_person"):
+            response = self.client.get(reverse(url_name), {"cursor": ""})
+            data = response.json()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", data)
+            self.assertIsNone(data["previous"])
+
+            ids = [habit["id"] for habit in data["results"]]
+            pages = [data]
+            while data["next"]:
+                data = self.client.get(data["next"]).json()
+                ids += [habit["id"] for habit in data["results"]]
+                pages.append(data)
+            self.assertEqual(ids, self.expected)
+
+            previous = self.client.get(pages[-1]["previous"]).json()
+            self.assertEqual(previous["results"], pages[-2]["results"])
+
+    def test_page_number_default(self):
+        """Тест постраничной пагинации без параметра cursor"""
+        data = self.client.get(reverse("habit:list_person")).json()
+        self.assertEqual(data["count"], 12)
+
+    def test_invalid_cursor(self):
+        """Тест некорректного курсора"""
+        response = self.client.get(reverse("habit:list_person"), {"cursor": "cD14"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HabitIndexTestCase(APITestCase):
+    """
+    Тесты планов запросов: на заполненной таблице запросы представлений
+    и задач должны выполняться по индексам, а не последовательным чтением.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Заполнение базы пользователями, привычками и уведомлениями"""
+        now = timezone.now()
+        cls.users = User.objects.bulk_create(
+            User(email=f"user{i}@test.ru", chat_id=str(i)) for i in range(50)
+        )
+        habits = Habit.objects.bulk_create(
+            Habit(
+                owner=cls.users[i % 50],
+                time="21:00",
+                action=f"action{i % 700}",
+                is_published=i % 10 == 0,
+                next_due_at=now + timedelta(minutes=i),
+            )
+            for i in range(20000)
+        )
+        Notification.objects.bulk_create(
+            Notification(
+                habit=habit,
+                due_at=habit.next_due_at,
+                chat_id="1",
+                text="test",
+                status=Notification.STATUS_SENT if i % 50 else "pending",
+            )
+            for i, habit in enumerate(habits[:5000])
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE habit_habit")
+            cursor.execute("ANALYZE habit_notification")
+
+    def get_queries(self, run, marker):
+        """SQL запросов с marker, выполненных функцией run"""
+        with CaptureQueriesContext(connection) as context:
+            run()
+        queries = [
+            query["sql"] for query in context.captured_queries if marker in query["sql"]
+        ]
+        self.assertEqual(len(queries), 1)
+        return queries[0]
+
+    def get_page_query(self, url, params=None):
+        """Ответ и SQL выборки страницы, выполненный представлением"""
+        responses = []
+        sql = self.get_queries(
+            lambda: responses.append(self.client.get(url, params)), " LIMIT "
+        )
+        self.assertEqual(responses[0].status_code, status.HTTP_200_OK)
+        return responses[0], sql
+
+    def assertIndexScan(self, sql, index=None):
+        """
+        Проверка, что запрос sql читает таблицу по индексу index
+        (без index - по любому индексу)
+        """
+        # Серверный курсор iterator(): план самого SELECT
+        start = sql.find("SELECT")
+        sql = sql[start:]
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        if index is not None:
+            self.assertIn(index, plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def assertListIndexes(self, url, index):
+        """Проверка страниц списка: первой, дальней и курсорных"""
+        self.assertIndexScan(self.get_page_query(url)[1], index)
+        # Дальнюю страницу небольшого списка планировщик может сортировать
+        self.assertIndexScan(self.get_page_query(url, {"page": 50})[1])
+        response, sql = self.get_page_query(url, {"cursor": ""})
+        self.assertIndexScan(sql, index)
+        response, sql = self.get_page_query(response.json()["next"])
+        self.assertIn("ORDER BY", sql)
+        self.assertIndexScan(sql, index)
+
+    def test_list_public_index(self):
+        """Тест плана запроса списка публичных привычек"""
+        self.client.force_authenticate(user=self.users[0])
+        self.assertListIndexes(
+            reverse("habit:list_public"), "habit_published_action_idx"
+        )
+
+    def test_list_person_index(self):
+        """Тест плана запроса списка привычек пользователя"""
+        self.client.force_authenticate(user=self.users[0])
+        self.assertListIndexes(reverse("habit:list_person"), "habit_owner_action_idx")
+
+    def test_reminder_index(self):
+        """Тест плана запроса тика напоминаний"""
+        window_end = (timezone.now() + timedelta(minutes=1)).isoformat()
+        with patch("habit.tasks.remind_chunk", return_value={}):
+            sql = self.get_queries(
+                lambda: reminder_shard(0, 4, window_end), "next_due_at"
+            )
+        self.assertIndexScan(sql, "habit_habit_next_due_at")
+
+    def test_notification_index(self):
+        """Тест плана запроса досылки уведомлений"""
+        sql = self.get_queries(
+            lambda: claim_notifications(Notification.objects.all()), "SKIP LOCKED"
+        )
+        self.assertIndexScan(sql, "notification_pending_idx")
+
+
+class ReminderTestCase(APITestCase):
+    """Тесты для задачи напоминания о привычках"""
+
+    def setUp(self):
+        """Создание пользователя с чатом Telegram и привычки"""
+        self.user = User.objects.create(email="test1@test.ru", chat_id="100")
+        self.now = timezone.now().replace(second=0, microsecond=0)
+        self.window_end = (self.now + timedelta(minutes=1)).isoformat()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            place="test",
+            time=self.now.time(),
+            date=self.now.date() - timedelta(days=2),
+            action="test",
+            periodicity=2,
+        )
+
+    def test_next_due_at(self):
+        """Тест вычисления времени следующего напоминания"""
+        self.assertEqual(self.habit.next_due_at, self.now)
+
+        self.habit.periodicity = 3
+        self.habit.save()
+        self.assertEqual(self.habit.next_due_at, self.now + timedelta(days=1))
+
+        self.habit.date = self.now.date() - timedelta(days=10)
+        self.habit.save(update_fields=["date"])
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.next_due_at, self.now + timedelta(days=2))
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder(self, send_tg_messages):
+        """Тест отправки напоминания и сдвига расписания"""
+        Habit.objects.create(
+            owner=self.user,
+            time=self.now.time(),
+            date=self.now.date(),
+            action="test2",
+            periodicity=1,
+        )
+        reminder()
+
+        messages = send_tg_messages.call_args.args[0]
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0][0], "100")
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.next_due_at, self.now + timedelta(days=2))
+
+        reminder()
+        send_tg_messages.assert_called_once()
+
+    @patch("habit.tasks.chord")
+    @patch("habit.tasks.CELERY_RESULT_BACKEND", None)
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder_without_result_backend(self, send_tg_messages, chord):
+        """Тест тика напоминаний группой шардов без бэкенда результатов"""
+        with patch("habit.tasks.REMINDER_HABITS") as reminder_habits:
+            reminder()
+        chord.assert_not_called()
+        self.assertEqual(len(send_tg_messages.call_args.args[0]), 1)
+        reminder_habits.inc.assert_any_call(1, result="sent")
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder_missed_tick(self, send_tg_messages):
+        """Тест напоминания о привычке, пропущенной предыдущими тиками"""
+        Habit.objects.filter(pk=self.habit.pk).update(
+            next_due_at=self.now - timedelta(days=5, minutes=3)
+        )
+        reminder()
+
+        self.assertEqual(len(send_tg_messages.call_args.args[0]), 1)
+        self.habit.refresh_from_db()
+        self.assertEqual(
+            self.habit.next_due_at,
+            self.now + timedelta(days=1, minutes=-3),
+        )
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder_num_queries(self, send_tg_messages):
+        """Тест постоянного числа запросов к базе за тик напоминаний"""
+        # Выборка, постановка в outbox, захват пачки, запись результатов
+        # и гистограммы опоздания
+        with self.assertNumQueries(11):
+            reminder_shard(0, 1, self.window_end)
+
+        for i in range(5):
+            user = User.objects.create(email=f"user{i}@test.ru", chat_id=str(i))
+            Habit.objects.create(
+                owner=user,
+                time=self.now.time(),
+                date=self.now.date() - timedelta(days=1),
+                action=f"test{i}",
+            )
+        Habit.objects.create(
+            time=self.now.time(),
+            date=self.now.date() - timedelta(days=1),
+            action="no owner",
+        )
+        with self.assertNumQueries(11):
+            result = reminder_shard(0, 1, self.window_end)
+        self.assertEqual(len(send_tg_messages.call_args.args[0]), 5)
+        self.assertEqual(result["skipped"], 1)
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder_shards(self, send_tg_messages):
+        """Тест разбиения тика напоминаний на шарды"""
+        fail_user = User.objects.create(email="fail@test.ru", chat_id="fail")
+        habits = [self.habit] + [
+            Habit.objects.create(
+                owner=fail_user if i == 0 else self.user,
+                time=self.now.time(),
+                date=self.now.date() - timedelta(days=1),
+                action=f"test{i}",
+            )
+            for i in range(3)
+        ]
+        results = [reminder_shard(shard, 2, self.window_end) for shard in range(2)]
+
+        for shard, result in enumerate(results):
+            shard_habits = [habit for habit in habits if habit.pk % 2 == shard]
+            self.assertEqual(
+                result["sent"] + result["failed"] + result["skipped"],
+                len(shard_habits),
+            )
+        self.assertEqual(
+            reminder_summary(results), {"sent": 3, "failed": 1, "skipped": 0}
+        )
+        self.assertFalse(Habit.objects.filter(next_due_at__lt=self.window_end).exists())
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_reminder_overlapping_ticks(self, send_tg_messages):
+        """Тест отсутствия дубликатов уведомлений при пересекающихся тиках"""
+        due_at = self.habit.next_due_at
+        reminder_shard(0, 1, self.window_end)
+        Habit.objects.filter(pk=self.habit.pk).update(next_due_at=due_at)
+        reminder_shard(0, 1, self.window_end)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.due_at, due_at)
+        self.assertEqual(notification.status, Notification.STATUS_SENT)
+        self.assertEqual(notification.attempts, 1)
+        send_tg_messages.assert_called_once()
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_notification_retry(self, send_tg_messages):
+        """Тест повторной отправки уведомлений с экспоненциальной задержкой"""
+        self.user.chat_id = "down"
+        self.user.save()
+        fail_user = User.objects.create(email="fail@test.ru", chat_id="fail")
+        Habit.objects.create(
+            owner=fail_user,
+            time=self.now.time(),
+            date=self.now.date() - timedelta(days=1),
+            action="test2",
+        )
+        result = reminder_shard(0, 1, self.window_end)
+        self.assertEqual(result["failed"], 2)
+
+        failed = Notification.objects.get(chat_id="fail")
+        self.assertEqual(failed.status, Notification.STATUS_FAILED)
+        pending = Notification.objects.get(chat_id="down")
+        self.assertEqual(pending.status, Notification.STATUS_PENDING)
+        self.assertEqual(pending.attempts, 1)
+        self.assertGreater(pending.next_retry_at, timezone.now())
+
+        self.assertEqual(deliver_pending_notifications(), {"sent": 0, "failed": 0})
+
+        Notification.objects.filter(pk=pending.pk).update(
+            next_retry_at=timezone.now(), chat_id="100"
+        )
+        self.assertEqual(deliver_pending_notifications(), {"sent": 1, "failed": 0})
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, Notification.STATUS_SENT)
+        self.assertEqual(pending.attempts, 2)
+
+
+class TelegramDeliveryTestCase(APITestCase):
+    """Тесты для отправки сообщений в телеграм"""
+
+    @patch("habit.services.get_rate_limiter", return_value=None)
+    @patch("habit.services.requests.Session.get")
+    def test_send_tg_messages(self, session_get, get_rate_limiter):
+        """Тест параллельной отправки пачки сообщений"""
+        session_get.side_effect = lambda url, params, timeout: (
+            Mock(ok=False, status_code=400, text="Bad Request")
+            if params["chat_id"] == "2"
+            else Mock(ok=True, status_code=200)
+        )
+        results = send_tg_messages([("1", "a"), ("2", "b"), ("3", "c")])
+
+        self.assertEqual([result.chat_id for result in results], ["1", "2", "3"])
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertEqual(results[1].status_code, 400)
+        self.assertEqual(results[1].error, "Bad Request")
+        self.assertTrue(all(result.latency >= 0 for result in results))
+
+    @patch("habit.services.get_rate_limiter")
+    @patch("habit.services.requests.Session.get")
+    def test_send_tg_message_retry_after(self, session_get, get_rate_limiter):
+        """Тест повторной отправки после ответа 429"""
+        too_many_requests = Mock(ok=False, status_code=429)
+        too_many_requests.json.return_value = {"parameters": {"retry_after": 3}}
+        session_get.side_effect = [too_many_requests, Mock(ok=True, status_code=200)]
+        result = send_tg_message("text", "1")
+
+        self.assertTrue(result.ok)
+        self.assertEqual(session_get.call_count, 2)
+        rate_limiter = get_rate_limiter.return_value
+        self.assertEqual(rate_limiter.acquire.call_count, 2)
+        rate_limiter.pause.assert_called_once_with(3.0)
+
+    @patch("habit.ratelimit.time.sleep")
+    def test_rate_limiter_acquire(self, sleep):
+        """Тест ожидания токенов лимитера"""
+        client = Mock()
+        client.register_script.return_value = Mock(side_effect=[250, 0])
+        rate_limiter = TelegramRateLimiter(client, global_rate=30, chat_rate=1)
+
+        self.assertTrue(rate_limiter.acquire("1"))
+        sleep.assert_called_once_with(0.25)
+        keys = client.register_script.return_value.call_args.kwargs["keys"]
+        self.assertIn("telegram:ratelimit:chat:1", keys)
+
+        client.register_script.return_value.side_effect = [5000]
+        self.assertFalse(rate_limiter.acquire("1", timeout=1))
+
+
+class SeedHabitsTestCase(APITestCase):
+    """Тесты для команды генерации данных seed_habits"""
+
+    def seed(self, method):
+        """Генерация данных и выборка сгенерированных привычек без идентификаторов"""
+        call_command(
+            "seed_habits",
+            users=20,
+            habits=500,
+            seed=3,
+            batch_size=128,
+            method=method,
+            stdout=io.StringIO(),
+        )
+        return list(
+            Habit.objects.order_by("id").values_list(
+                "owner__email", "time", "date", "action", "periodicity", "award"
+            )
+        )
+
+    def test_seed(self):
+        """Тест корректности и детерминированности сгенерированных данных"""
+        habits = self.seed("copy")
+        self.assertEqual(len(habits), 500)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertFalse(Habit.objects.filter(next_due_at__isnull=True).exists())
+        self.assertFalse(
+            Habit.objects.filter(is_pleasant=True, award__isnull=False).exists()
+        )
+        related = Habit.objects.filter(related_habit__isnull=False)
+        self.assertTrue(related.exists())
+        self.assertFalse(related.filter(related_habit__is_pleasant=False).exists())
+        self.assertFalse(related.filter(award__isnull=False).exists())
+        self.assertFalse(related.exclude(related_habit__owner=F("owner")).exists())
+        habit = Habit.objects.first()
+        self.assertEqual(habit.next_due_at, habit.get_next_due_at())
+
+        User.objects.all().delete()
+        self.assertEqual(self.seed("bulk"), habits)
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    """Тесты для команды нагрузочного тестирования load_test"""
+
+    def test_load_test(self):
+        """Тест отчёта нагрузочного теста и сравнения с базовым отчётом"""
+        call_command("seed_habits", users=2, habits=50, stdout=io.StringIO())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, "report.json")
+        options = {
+            "url": self.live_server_url,
+            "duration": 1,
+            "concurrency": 2,
+            "users": 2,
+            "output": output,
+            "stdout": io.StringIO(),
+        }
+        call_command("load_test", **options)
+        with open(output) as file:
+            report = json.load(file)
+        self.assertEqual(report["total"]["errors"], 0)
+        self.assertEqual(report["endpoints"]["token_obtain"]["requests"], 2)
+        self.assertIn("p99_ms", report["endpoints"]["token_obtain"])
+        self.assertEqual(Habit.objects.count(), 50)
+
+        baseline = os.path.join(directory.name, "baseline.json")
+        report["endpoints"]["token_obtain"]["p95_ms"] = 0.01
+        with open(baseline, "w") as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, "token_obtain"):
+            call_command("load_test", baseline=baseline, **options)
+
+
+# Бюджеты запросов к базе: (число запросов, суммарное время SQL в секундах).
+# Для задач бюджет указан на одну пачку строк.
+QUERY_BUDGETS = {
+    "habit:list_public": (2, 0.5),
+    "habit:list_person": (3, 0.5),
+    "habit:list_person cursor": (2, 0.5),
+    "habit:habit_retrieve": (2, 0.2),
+    "habit:habit_create": (2, 0.2),
+    "habit:habit_update": (2, 0.2),
+    # Удаление обновляет updated_at ссылавшихся привычек отдельным UPDATE
+    "habit:habit_delete": (7, 0.2),
+    "habit:habit_bulk_create": (4, 0.5),
+    "habit:habit_bulk_update": (4, 0.5),
+    "habit:habit_bulk_delete": (10, 0.5),
+    "habit:habit_complete": (7, 0.2),
+    "habit:habit_stats": (1, 0.2),
+    "habit:person_statistics": (2, 0.5),
+    "users:register": (7, 0.2),
+    "users:login": (1, 0.2),
+    "habit.tasks.reminder_shard": (11, 1),
+    "habit.tasks.deliver_pending_notifications": (6, 1),
+}
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Тесты бюджетов запросов представлений и задач Celery на сгенерированных
+    данных: число запросов не должно зависеть от числа строк.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Генерация пользователей и привычек"""
+        call_command(
+            "seed_habits", users=10, habits=3000, batch_size=1000, stdout=io.StringIO()
+        )
+        cls.user = User.objects.get(email="seed0.user0@example.com")
+        cls.habit = Habit.objects.filter(owner=cls.user, is_pleasant=True).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def budget(self, name, batches=1):
+        max_queries, max_time = QUERY_BUDGETS[name]
+        return QueryBudget(
+            max_queries * batches, max_time=max_time * batches, name=name
+        )
+
+    def test_list_budgets(self):
+        """Тест бюджетов списков привычек"""
+        published = Habit.objects.filter(is_published=True)
+        owned = Habit.objects.filter(owner=self.user)
+        with self.budget("habit:list_public"):
+            response = self.client.get(reverse("habit:list_public"), {"page": 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], published.count())
+        self.assertEqual(len(response.json()["results"]), 5)
+
+        with self.budget("habit:list_person"):
+            response = self.client.get(reverse("habit:list_person"), {"page": 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], owned.count())
+        self.assertEqual(len(response.json()["results"]), 5)
+
+        with self.budget("habit:list_person cursor"):
+            response = self.client.get(reverse("habit:list_person"), {"cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [habit["id"] for habit in response.json()["results"]],
+            list(owned.order_by("action", "id").values_list("id", flat=True)[:5]),
+        )
+
+    def test_habit_budgets(self):
+        """Тест бюджетов просмотра, создания, изменения и удаления привычки"""
+        with self.budget("habit:habit_retrieve"):
+            response = self.client.get(
+                reverse("habit:habit_retrieve", args=(self.habit.pk,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.budget("habit:habit_create"):
+            response = self.client.post(
+                reverse("habit:habit_create"),
+                {
+                    "time": "07:00",
+                    "action": "test",
+                    "periodicity": 1,
+                    "related_habit": self.habit.pk,
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with self.budget("habit:habit_update"):
+            response = self.client.patch(
+                reverse("habit:habit_update", args=(self.habit.pk,)),
+                {"place": "test", "periodicity": 2},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.budget("habit:habit_delete"):
+            response = self.client.delete(
+                reverse("habit:habit_delete", args=(self.habit.pk,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_completion_budgets(self):
+        """Тест бюджетов отметки о выполнении и статистики привычки"""
+        complete_habit(self.habit, timezone.localdate() - timedelta(days=1))
+        with self.budget("habit:habit_complete"):
+            response = self.client.post(
+                reverse("habit:habit_complete", args=(self.habit.pk,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.budget("habit:habit_stats"):
+            response = self.client.get(
+                reverse("habit:habit_stats", args=(self.habit.pk,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_statistics_budget(self):
+        """Тест бюджета статистики пользователя без кэша"""
+        with self.budget("habit:person_statistics"):
+            response = self.client.get(
+                reverse("habit:person_statistics"), {"days": 3660}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_budgets(self):
+        """Тест бюджетов пакетных операций на максимальном пакете"""
+        habits = list(
+            Habit.objects.filter(owner=self.user, is_pleasant=False).values_list(
+                "pk", flat=True
+            )[:HABIT_BULK_MAX_SIZE]
+        )
+        with self.budget("habit:habit_bulk_create"):
+            response = self.client.post(
+                reverse("habit:habit_bulk_create"),
+                [
+                    {
+                        "time": "07:00",
+                        "action": f"test{i}",
+                        "periodicity": 1,
+                        "related_habit": self.habit.pk,
+                    }
+                    for i in range(HABIT_BULK_MAX_SIZE)
+                ],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with self.budget("habit:habit_bulk_update"):
+            response = self.client.put(
+                reverse("habit:habit_bulk_update"),
+                [
+                    {
+                        "id": pk,
+                        "time": "08:00",
+                        "action": "test",
+                        "place": "test",
+                        "periodicity": 2,
+                    }
+                    for pk in habits
+                ],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.budget("habit:habit_bulk_delete"):
+            response = self.client.delete(
+                reverse("habit:habit_bulk_delete"), habits, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_users_budgets(self):
+        """Тест бюджетов регистрации и получения токена"""
+        self.client.force_authenticate(user=None)
+        with self.budget("users:register"):
+            self.client.post(
+                reverse("users:register"),
+                {"email": "test@test.ru", "password": "12345678"},
+            )
+        with self.budget("users:login"):
+            response = self.client.post(
+                reverse("users:login"),
+                {"email": self.user.email, "password": "12345678"},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_task_budgets(self, send_tg_messages):
+        """Тест бюджетов задач напоминаний на тысячах наступивших привычек"""
+        now = timezone.now().replace(second=0, microsecond=0)
+        Habit.objects.update(next_due_at=now)
+        window_end = (now + timedelta(minutes=1)).isoformat()
+        batches = math.ceil(Habit.objects.count() / REMINDER_CHUNK_SIZE)
+        with self.budget("habit.tasks.reminder_shard", batches):
+            result = reminder_shard(0, 1, window_end)
+        self.assertGreater(result["sent"], 1000)
+
+        Notification.objects.update(
+            status=Notification.STATUS_PENDING, next_retry_at=now
+        )
+        # Последняя пачка неполная; если все пачки полные, нужна ещё одна пустая
+        batches = Notification.objects.count() // NOTIFICATION_BATCH_SIZE + 1
+        with self.budget("habit.tasks.deliver_pending_notifications", batches):
+            deliver_pending_notifications()
+        self.assertFalse(
+            Notification.objects.filter(status=Notification.STATUS_PENDING).exists()
+        )
+
+
+class MetricsTestCase(APITestCase):
+    """Тесты для метрик в формате Prometheus"""
+
+    def get_registry(self, backend):
+        registry = Registry(backend, flush_interval=60)
+        self.addCleanup(registry.close)
+        counter = Counter("test_messages", "Сообщения", ("status",), registry=registry)
+        histogram = Histogram(
+            "test_duration_seconds", "Время", buckets=(0.1, 1), registry=registry
+        )
+        return registry, counter, histogram
+
+    def test_render(self):
+        """Тест текстового формата счётчиков и гистограмм"""
+        registry, counter, histogram = self.get_registry(LocalBackend())
+        counter.inc(status=200)
+        counter.inc(2, status='"x"')
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual(
+            registry.render(),
+            "# HELP test_messages Сообщения\n"
+            "# TYPE test_messages counter\n"
+            'test_messages_total{status="\\"x\\""} 2\n'
+            'test_messages_total{status="200"} 1\n'
+            "# HELP test_duration_seconds Время\n"
+            "# TYPE test_duration_seconds histogram\n"
+            'test_duration_seconds_bucket{le="0.1"} 1\n'
+            'test_duration_seconds_bucket{le="1"} 2\n'
+            'test_duration_seconds_bucket{le="+Inf"} 3\n'
+            "test_duration_seconds_sum 5.55\n"
+            "test_duration_seconds_count 3\n",
+        )
+
+    def test_redis_aggregation(self):
+        """Тест суммирования метрик нескольких процессов в Redis"""
+        client = redis.Redis()
+        try:
+            client.ping()
+        except redis.ConnectionError:
+            self.skipTest("Redis недоступен")
+        keys = ("metrics:test_messages", "metrics:test_duration_seconds")
+        client.delete(*keys)
+        self.addCleanup(client.delete, *keys)
+        backend = RedisBackend(client)
+        workers = [self.get_registry(backend) for _ in range(2)]
+        for registry, counter, histogram in workers:
+            counter.inc(status=200)
+            histogram.observe(0.5)
+            registry.flush()
+
+        output = workers[0][0].render()
+        self.assertIn('test_messages_total{status="200"} 2\n', output)
+        self.assertIn("test_duration_seconds_count 2\n", output)
+
+    def test_gauge(self):
+        """Тест значений gauge процесса"""
+        registry = Registry(LocalBackend(), flush_interval=60)
+        self.addCleanup(registry.close)
+        gauge = Gauge("test_connections", "Соединения", ("state",), registry=registry)
+        gauge.inc(2, state="idle")
+        gauge.dec(state="idle")
+        gauge.set(5, state="used")
+        self.assertEqual(
+            registry.render(),
+            "# HELP test_connections Соединения\n"
+            "# TYPE test_connections gauge\n"
+            'test_connections{state="idle"} 1\n'
+            'test_connections{state="used"} 5\n',
+        )
+
+    def test_background_flush(self):
+        """Тест сброса буфера фоновым потоком, а не в вызове inc"""
+        backend = LocalBackend()
+        registry, counter, histogram = self.get_registry(backend)
+        registry.flush_interval = 0.05
+        with patch.object(backend, "add", wraps=backend.add) as add:
+            counter.inc(status=200)
+            add.assert_not_called()
+            deadline = time.monotonic() + 5
+            while not add.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(
+            backend.read(["test_messages"])["test_messages"], {'["200", "total"]': 1}
+        )
+
+    def test_redis_gauge(self):
+        """Тест сложения gauge живых процессов и удаления значений завершённого"""
+        client = redis.Redis()
+        try:
+            client.ping()
+        except redis.ConnectionError:
+            self.skipTest("Redis недоступен")
+        keys = [f"metrics:test_waiters:process:{process}" for process in "ab"]
+        client.delete(*keys)
+        self.addCleanup(client.delete, *keys)
+        backend = RedisBackend(client)
+        workers = []
+        for process in ("a", "b"):
+            registry = Registry(backend, flush_interval=60, process=process)
+            gauge = Gauge("test_waiters", "Ожидающие", registry=registry)
+            gauge.inc(3)
+            registry.flush()
+            self.addCleanup(registry.close)
+            workers.append(registry)
+
+        self.assertIn("test_waiters 6\n", workers[0].render())
+        self.assertTrue(0 < client.ttl(keys[0]) <= 30)
+        # Упавший процесс: ключ истёк и больше не продлевается
+        client.delete(keys[0])
+        self.assertIn("test_waiters 3\n", workers[1].render())
+        workers[1].close()
+        self.assertEqual(backend.read_gauges(["test_waiters"]), {"test_waiters": {}})
+
+    @patch("habit.services.get_rate_limiter", return_value=None)
+    @patch("habit.services.get_session")
+    def test_metrics_endpoint(self, get_session, get_rate_limiter):
+        """Тест метрик запросов и отправки в телеграм на /metrics"""
+        get_session.return_value.get.return_value = Mock(status_code=403, ok=False)
+        send_tg_message("text", "1")
+        self.client.force_authenticate(user=User.objects.create(email="test@test.ru"))
+        self.client.get(reverse("habit:list_public"))
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        output = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="habit:list_public",'
+            'method="GET",status="200"}',
+            output,
+        )
+        self.assertIn('http_request_db_queries_count{view="habit:list_public"}', output)
+        self.assertIn('telegram_messages_total{status="403"}', output)
+
+    @patch("config.views.METRICS_TOKEN", "secret")
+    def test_metrics_access(self):
+        """Тест доступа к /metrics по адресу клиента и токену"""
+        self.assertEqual(
+            self.client.get("/metrics", REMOTE_ADDR="10.0.0.1").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ReminderLatenessTestCase(APITestCase):
+    """Тесты для гистограммы опоздания напоминаний и отчёта по ней"""
+
+    def test_record_lateness(self):
+        """Тест накопления опозданий по часам и корзинам"""
+        due_at = timezone.now().replace(hour=7, minute=30, second=0, microsecond=0)
+        period = due_at.replace(minute=0)
+        record_lateness([(due_at, due_at + timedelta(seconds=3))] * 2)
+        record_lateness(
+            [
+                (due_at, due_at + timedelta(seconds=3)),
+                (due_at, due_at + timedelta(seconds=100)),
+                (due_at, due_at + timedelta(hours=2)),
+            ]
+        )
+        self.assertEqual(
+            list(
+                ReminderLateness.objects.order_by("bucket").values_list(
+                    "period", "bucket", "count"
+                )
+            ),
+            [(period, 1, 3), (period, 8, 1), (period, 15, 1)],
+        )
+
+    @patch("habit.services.send_tg_messages", side_effect=deliver)
+    def test_report(self, send_tg_messages):
+        """Тест записи опоздания при отправке и отчёта по часам суток"""
+        user = User.objects.create(email="test1@test.ru", chat_id="100")
+        # Отправка примерно через 100 секунд после срока: корзина до 120 секунд
+        due_at = timezone.localtime() - timedelta(seconds=100)
+        habit = Habit.objects.create(
+            owner=user,
+            time=due_at.time(),
+            date=due_at.date() - timedelta(days=1),
+            action="test",
+        )
+        Notification.objects.create(
+            habit=habit, due_at=due_at, chat_id="100", text="test"
+        )
+        deliver_pending_notifications()
+        self.assertEqual(ReminderLateness.objects.get().count, 1)
+
+        stdout = io.StringIO()
+        call_command("lateness_report", json=True, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(
+            report[str(due_at.hour)], {"count": 1, "p50": 120, "p90": 120, "p99": 120}
+        )
+
+    @patch("habit.services.send_tg_messages")
+    def test_sent_at_per_message(self, send_tg_messages):
+        """Тест времени отправки каждого сообщения пачки из его результата"""
+        due_at = timezone.now()
+        send_tg_messages.side_effect = lambda messages: [
+            DeliveryResult(
+                chat_id, True, 200, 0.1, None, due_at + timedelta(seconds=int(chat_id))
+            )
+            for chat_id, text in messages
+        ]
+        user = User.objects.create(email="test1@test.ru")
+        for number, chat_id in enumerate(("1", "200")):
+            habit = Habit.objects.create(owner=user, time="07:00", action=str(number))
+            Notification.objects.create(
+                habit=habit, due_at=due_at, chat_id=chat_id, text="test"
+            )
+        deliver_pending_notifications()
+
+        for notification in Notification.objects.all():
+            self.assertEqual(
+                notification.sent_at,
+                due_at + timedelta(seconds=int(notification.chat_id)),
+            )
+        self.assertEqual(
+            list(
+                ReminderLateness.objects.order_by("bucket").values_list(
+                    "bucket", "count"
+                )
+            ),
+            [(1, 1), (10, 1)],
+        )
+
+    @patch("habit.services.get_rate_limiter", return_value=None)
+    @patch("habit.services.get_session")
+    def test_sent_at_queued(self, get_session, get_rate_limiter):
+        """Тест учёта ожидания свободного потока во времени отправки"""
+
+        def get(*args, **kwargs):
+            time.sleep(0.2)
+            return Mock(status_code=200, ok=True)
+
+        get_session.return_value.get.side_effect = get
+        started = timezone.now()
+        results = send_tg_messages([("1", "test"), ("2", "test")], max_workers=1)
+        self.assertLess(results[1].latency, 0.4)
+        self.assertGreaterEqual(results[1].sent_at - started, timedelta(seconds=0.4))
+
+
+class HabitCompletionTestCase(APITestCase):
+    """Тесты для отметок о выполнении привычки и её статистики"""
+
+    def setUp(self):
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.habit = Habit.objects.create(
+            owner=self.user, time="07:00", action="test", periodicity=2
+        )
+
+    def complete(self, days_ago=None):
+        data = {}
+        if days_ago is not None:
+            data["occurred_on"] = (self.today - timedelta(days=days_ago)).isoformat()
+        return self.client.post(
+            reverse("habit:habit_complete", args=(self.habit.pk,)), data
+        )
+
+    def get_stats(self):
+        response = self.client.get(reverse("habit:habit_stats", args=(self.habit.pk,)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_complete(self):
+        """Тест серий: выполнение не позже чем через periodicity дней продолжает серию"""
+        for days_ago in (11, 6, 4, 2):
+            self.assertEqual(
+                self.complete(days_ago).status_code, status.HTTP_201_CREATED
+            )
+        response = self.complete()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["occurred_on"], self.today.isoformat())
+        self.assertEqual(
+            response.json()["stats"],
+            {
+                "habit": self.habit.pk,
+                "completions": 5,
+                "current_streak": 4,
+                "longest_streak": 4,
+                "completion_rate": 0.8333,
+                "first_occurred_on": (self.today - timedelta(days=11)).isoformat(),
+                "last_occurred_on": self.today.isoformat(),
+            },
+        )
+
+    def test_backfill(self):
+        """Тест выполнения задним числом: серия пересчитывается по истории"""
+        self.complete(4)
+        self.complete(0)
+        self.assertEqual(self.get_stats()["longest_streak"], 1)
+        response = self.complete(2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["stats"]["current_streak"], 3)
+        self.assertEqual(response.json()["stats"]["longest_streak"], 3)
+        self.assertEqual(response.json()["stats"]["completions"], 3)
+
+    def test_repeat(self):
+        """Тест повторной отметки дня: агрегаты не меняются"""
+        self.complete()
+        response = self.complete()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["stats"]["completions"], 1)
+        self.assertEqual(HabitCompletion.objects.count(), 1)
+
+    def test_broken_streak(self):
+        """Тест текущей серии после пропуска очередного выполнения"""
+        self.complete(5)
+        self.complete(3)
+        stats = self.get_stats()
+        self.assertEqual(stats["current_streak"], 0)
+        self.assertEqual(stats["longest_streak"], 2)
+
+    def test_stats(self):
+        """Тест статистики без выполнений и постоянного числа запросов"""
+        self.assertEqual(self.get_stats()["completions"], 0)
+        self.assertFalse(HabitStats.objects.exists())
+        for days_ago in range(60, -1, -2):
+            self.complete(days_ago)
+        with self.assertNumQueries(1):
+            self.get_stats()
+
+    def test_validation(self):
+        """Тест отметки в будущем и отметки чужой привычки"""
+        response = self.complete(-1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(), {"occurred_on": ["Нельзя отметить выполнение в будущем"]}
+        )
+        self.client.force_authenticate(User.objects.create(email="test2@test.ru"))
+        self.assertEqual(self.complete().status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("habit:habit_stats", args=(self.habit.pk,)))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class HabitStatisticsTestCase(APITestCase):
+    """Тесты для статистики выполнения привычек пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            time="07:00",
+            action="test",
+            date=self.today - timedelta(days=10),
+            periodicity=2,
+        )
+        self.daily_habit = Habit.objects.create(
+            owner=self.user,
+            time="08:00",
+            action="test2",
+            date=self.today - timedelta(days=3),
+            periodicity=1,
+        )
+        for days_ago in (8, 4, 0):
+            complete_habit(self.habit, self.today - timedelta(days=days_ago))
+
+    def get_statistics(self, **params):
+        return self.client.get(reverse("habit:person_statistics"), params)
+
+    def test_statistics(self):
+        """Тест тепловой карты, скользящих долей и выполнений по привычкам"""
+        response = self.get_statistics(days=7)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["start"], (self.today - timedelta(days=6)).isoformat())
+        self.assertEqual(
+            data["totals"], {"expected": 7, "completed": 2, "rate": 0.2857}
+        )
+        self.assertEqual(data["heatmap"], [0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual(data["expected"], [1, 0, 1, 0, 2, 1, 2])
+        self.assertEqual(data["rolling"]["7"][-1], 0.2857)
+        # Окно 30 дней учитывает выполнение до начала периода
+        self.assertEqual(data["rolling"]["30"][-1], 0.375)
+        self.assertEqual(sum(data["weekdays"]["expected"]), 7)
+        self.assertEqual(
+            data["habits"],
+            [
+                {"id": self.habit.pk, "expected": 4, "completed": 2, "rate": 0.5},
+                {"id": self.daily_habit.pk, "expected": 3, "completed": 0, "rate": 0.0},
+            ],
+        )
+
+    @patch("habit.cache.HABIT_CACHE", True)
+    def test_cache(self):
+        """Тест кэша статистики до следующей отметки о выполнении"""
+        self.get_statistics()
+        with self.assertNumQueries(0):
+            self.get_statistics()
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_habit(self.daily_habit, self.today)
+        with self.assertNumQueries(2):
+            data = self.get_statistics().json()
+        self.assertEqual(data["totals"]["completed"], 4)
+
+    def test_big_ids(self):
+        """Тест id привычек за пределами int32"""
+        habit = Habit.objects.create(
+            id=2**31 + 1,
+            owner=self.user,
+            time="09:00",
+            action="test3",
+            date=self.today - timedelta(days=1),
+            periodicity=1,
+        )
+        complete_habit(habit, self.today)
+        data = self.get_statistics(days=7).json()
+        self.assertEqual(
+            data["habits"][-1],
+            {"id": habit.pk, "expected": 1, "completed": 1, "rate": 1.0},
+        )
+
+    def test_days(self):
+        """Тест проверки длины периода"""
+        for days in (0, "abc", 100000):
+            response = self.get_statistics(days=days)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expected_daily(self):
+        """Тест векторного расчёта наступлений против перебора по дням"""
+        rng = np.random.default_rng(0)
+        dates = rng.integers(-100, 50, 200)
+        periodicities = rng.integers(1, 8, 200)
+        first = get_first_occurrences(dates, periodicities, 0)
+        expected = get_expected_daily(first, periodicities, 60)
+        brute_force = [
+            sum(
+                day > date and (day - date) % periodicity == 0
+                for date, periodicity in zip(dates, periodicities)
+            )
+            for day in range(60)
+        ]
+        self.assertEqual(expected.tolist(), brute_force)
+        self.assertEqual(
+            get_rolling_sum(np.array([1, 2, 3, 4]), 2).tolist(), [1, 3, 5, 7]
+        )
+
+
+@patch("habit.telegram.TELEGRAM_WEBHOOK_SECRET", "secret")
+@patch("habit.telegram.TELEGRAM_WEBHOOK_WORKERS", 0)
+class TelegramWebhookTestCase(APITestCase):
+    """Тесты для вебхука телеграма: ответы пользователей на напоминания"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru", chat_id="100")
+        self.habit = Habit.objects.create(
+            owner=self.user, time="07:00", action="test", periodicity=1
+        )
+        self.due_at = timezone.now() - timedelta(minutes=5)
+        Notification.objects.create(
+            habit=self.habit,
+            due_at=self.due_at,
+            chat_id="100",
+            text="Напоминание",
+            status=Notification.STATUS_SENT,
+            sent_at=self.due_at,
+        )
+        self.update_id = 0
+
+    def get_update(self, text, chat_id=100):
+        self.update_id += 1
+        return {
+            "update_id": self.update_id,
+            "message": {"chat": {"id": chat_id}, "text": text},
+        }
+
+    def post(self, update, secret="secret"):
+        return self.client.post(
+            reverse("habit:telegram_webhook"),
+            update,
+            format="json",
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret,
+        )
+
+    def test_done(self):
+        """Тест отметки о выполнении привычки последнего напоминания"""
+        response = self.post(self.get_update("/done"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "method": "sendMessage",
+                "chat_id": "100",
+                "text": "Отмечено выполнение «test». Серия: 1.",
+            },
+        )
+        self.assertTrue(
+            HabitCompletion.objects.filter(
+                habit=self.habit, occurred_on=timezone.localdate(self.due_at)
+            ).exists()
+        )
+        response = self.post(self.get_update("Готово"))
+        self.assertEqual(response.json()["text"], "Выполнение «test» уже отмечено.")
+
+    def test_snooze(self):
+        """Тест повтора напоминания через указанное и стандартное время"""
+        started = timezone.now()
+        response = self.post(self.get_update("/snooze@habit_bot 30"))
+        self.assertEqual(response.json()["text"], "Напомню про «test» через 30 мин.")
+        self.post(self.get_update("позже"))
+        snoozed = Notification.objects.filter(
+            status=Notification.STATUS_PENDING
+        ).order_by("due_at")
+        self.assertEqual(
+            [(n.chat_id, n.text) for n in snoozed], [("100", "Напоминание")] * 2
+        )
+        for notification, minutes in zip(snoozed, (15, 30)):
+            self.assertEqual(notification.next_retry_at, notification.due_at)
+            self.assertAlmostEqual(
+                notification.due_at,
+                started + timedelta(minutes=minutes),
+                delta=timedelta(seconds=10),
+            )
+
+    def test_duplicate(self):
+        """Тест повторной доставки обновления телеграмом"""
+        update = self.get_update("/snooze")
+        self.assertEqual(self.post(update).status_code, status.HTTP_200_OK)
+        response = self.post(update)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            Notification.objects.filter(status=Notification.STATUS_PENDING).count(), 1
+        )
+
+    def test_other_messages(self):
+        """Тест подсказки, неизвестного чата и обновлений без текста"""
+        response = self.post(self.get_update("Привет"))
+        self.assertTrue(response.json()["text"].startswith("Ответьте на напоминание"))
+        response = self.post(self.get_update("/done", chat_id=200))
+        self.assertEqual(
+            response.json()["text"], "Не нашёл напоминаний для этого чата."
+        )
+        response = self.post({"update_id": 1000, "callback_query": {}})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(HabitCompletion.objects.exists())
+
+    def test_secret(self):
+        """Тест проверки секрета вебхука"""
+        response = self.post(self.get_update("/done"), secret="wrong")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        with patch("habit.telegram.TELEGRAM_WEBHOOK_SECRET", None):
+            response = self.post(self.get_update("/done"), secret="")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(HabitCompletion.objects.exists())
+
+    def test_asgi(self):
+        """Тест вебхука в ASGI-приложении в обход обработчика Django"""
+        body = json.dumps(self.get_update("/done")).encode()
+
+        async def call(method, path, headers):
+            messages = [{"type": "http.request", "body": body}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": method,
+                "path": path,
+                "headers": headers,
+                "query_string": b"",
+            }
+            await application(scope, receive, send)
+            return sent
+
+        with patch(
+            "config.asgi.django_application", new_callable=AsyncMock
+        ) as django_application:
+            sent = async_to_sync(call)(
+                "POST",
+                reverse("habit:telegram_webhook"),
+                [(b"x-telegram-bot-api-secret-token", b"secret")],
+            )
+            django_application.assert_not_called()
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(
+            json.loads(sent[1]["body"])["text"], "Отмечено выполнение «test». Серия: 1."
+        )
+
+        with patch(
+            "config.asgi.django_application", new_callable=AsyncMock
+        ) as django_application:
+            async_to_sync(call)("GET", reverse("habit:list_public"), [])
+            django_application.assert_called_once()
+
+    @patch("habit.telegram.MAX_BODY_SIZE", 100)
+    def test_asgi_limits(self):
+        """Тест отказа без секрета до чтения тела и отказа большому телу"""
+        received = []
+
+        async def call(headers, chunks):
+            sent = []
+
+            async def receive():
+                received.append(chunks[0])
+                return {
+                    "type": "http.request",
+                    "body": chunks.pop(0),
+                    "more_body": bool(chunks),
+                }
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": "POST",
+                "path": reverse("habit:telegram_webhook"),
+                "headers": headers,
+                "query_string": b"",
+            }
+            await application(scope, receive, send)
+            return sent[0]["status"]
+
+        secret = (b"x-telegram-bot-api-secret-token", b"secret")
+        status_code = async_to_sync(call)([], [b"x" * 1000])
+        self.assertEqual(status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(received, [])
+
+        status_code = async_to_sync(call)(
+            [secret, (b"content-length", b"1000")], [b"x" * 1000]
+        )
+        self.assertEqual(status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(received, [])
+
+        # Без Content-Length тело читается частями до превышения предела
+        status_code = async_to_sync(call)([secret], [b"x" * 60] * 10)
+        self.assertEqual(status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(len(received), 2)
+        self.assertFalse(HabitCompletion.objects.exists())
+
+
+@patch("habit.telegram.TELEGRAM_WEBHOOK_SECRET", "secret")
+@patch("habit.telegram.TELEGRAM_WEBHOOK_WORKERS", 0)
+class FakeTelegramUpdatesTestCase(LiveServerTestCase):
+    """Тесты для генератора поддельных обновлений телеграма"""
+
+    def test_fake_updates(self):
+        """Тест отправки обновлений вебхуку запущенного сервера"""
+        user = User.objects.create(email="test1@test.ru", chat_id="100")
+        habit = Habit.objects.create(owner=user, time="07:00", action="test")
+        Notification.objects.create(
+            habit=habit,
+            due_at=timezone.now(),
+            chat_id="100",
+            text="test",
+            status=Notification.STATUS_SENT,
+        )
+        stdout = io.StringIO()
+        call_command(
+            "fake_telegram_updates",
+            url=self.live_server_url,
+            count=50,
+            concurrency=4,
+            secret="secret",
+            stdout=stdout,
+        )
+        self.assertIn("коды ответа {200: 50}", stdout.getvalue())
+        self.assertEqual(HabitCompletion.objects.filter(habit=habit).count(), 1)
+
+
+class HabitAsyncViewsTestCase(APITestCase):
+    """Тесты для асинхронных представлений чтения привычек"""
+
+    def setUp(self):
+        """Создание пользователя и привычек"""
+        cache.clear()
+        self.user = User.objects.create(email="test1@test.ru")
+        self.habits = [
+            Habit.objects.create(
+                owner=self.user,
+                time="07:00",
+                action=f"test{i}",
+                is_published=bool(i % 2),
+            )
+            for i in range(7)
+        ]
+        self.factory = APIRequestFactory()
+
+    def get(self, view_class, params=None, **kwargs):
+        """Ответ представления на GET-запрос пользователя"""
+        request = self.factory.get("/", params)
+        force_authenticate(request, user=self.user)
+        view = view_class.as_view()
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        return view(request, **kwargs)
+
+    def test_views_async(self):
+        """Тест асинхронности представлений"""
+        for view_class in (
+            HabitListAsyncAPIView,
+            HabitPersonAsyncAPIView,
+            HabitRetrieveAsyncAPIView,
+        ):
+            self.assertTrue(asyncio.iscoroutinefunction(view_class.as_view()))
+        self.assertFalse(asyncio.iscoroutinefunction(HabitListAPIView.as_view()))
+
+    def test_output_identical(self):
+        """Тест совпадения ответов асинхронных и синхронных представлений"""
+        cases = [
+            (HabitListAPIView, HabitListAsyncAPIView, None, {}),
+            (HabitListAPIView, HabitListAsyncAPIView, {"page": 2}, {}),
+            (HabitPersonAPIView, HabitPersonAsyncAPIView, {"page_size": 3}, {}),
+            (HabitPersonAPIView, HabitPersonAsyncAPIView, {"cursor": ""}, {}),
+            (
+                HabitPersonAPIView,
+                HabitPersonAsyncAPIView,
+                {"fields": "id,action", "page": "last"},
+                {},
+            ),
+            (HabitRetrieveAPIView, HabitRetrieveAsyncAPIView, None, {"pk": 0}),
+            (
+                HabitRetrieveAPIView,
+                HabitRetrieveAsyncAPIView,
+                {"fields": "id,time"},
+                {"pk": self.habits[0].pk},
+            ),
+        ]
+        for sync_view, async_view, params, kwargs in cases:
+            with self.subTest(view=async_view.__name__, params=params, **kwargs):
+                cache.clear()
+                expected = self.get(sync_view, params, **kwargs)
+                cache.clear()
+                response = self.get(async_view, params, **kwargs)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.data, expected.data)
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_errors(self):
+        """Тест ошибок пагинации и прав в асинхронных представлениях"""
+        response = self.get(HabitPersonAsyncAPIView, {"page": 100})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.get(HabitPersonAsyncAPIView, {"cursor": "bad"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        habit = Habit.objects.create(
+            owner=User.objects.create(email="test2@test.ru"), time="07:00"
+        )
+        response = self.get(HabitRetrieveAsyncAPIView, pk=habit.pk)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        request = self.factory.post("/")
+        force_authenticate(request, user=self.user)
+        response = async_to_sync(HabitListAsyncAPIView.as_view())(request)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @patch("users.authentication.AUTH_USER_CACHE", True)
+    async def test_async_client(self):
+        """Тест запроса через асинхронный обработчик Django с метриками"""
+        install_query_counter(None, connection)
+        token = AccessToken.for_user(self.user)
+        with patch("config.middleware.REQUEST_QUERIES") as request_queries:
+            # Первый запрос загружает пользователя в кэш аутентификации
+            for _ in range(2):
+                response = await self.async_client.get(
+                    reverse("habit:list_person"),
+                    headers={"authorization": f"Bearer {token}"},
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 7)
+        request_queries.observe.assert_called_with(3, view="habit:list_person")
+
+    def test_asgi_concurrency_limit(self):
+        """Тест ограничения одновременных запросов Django в ASGI-приложении"""
+        active = peak = 0
+
+        async def django_application(scope, receive, send):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        async def call():
+            scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+            await asyncio.gather(*(application(scope, None, None) for _ in range(5)))
+
+        with patch("config.asgi.django_application", django_application), patch(
+            "config.asgi.django_requests", asyncio.Semaphore(2)
+        ):
+            async_to_sync(call)()
+        self.assertEqual(peak, 2)
+
+
+class BenchmarkServersTestCase(TransactionTestCase):
+    """Тесты для сравнения WSGI- и ASGI-серверов benchmark_servers"""
+
+    def test_benchmark(self):
+        """Тест отчёта по обоим серверам на тестовой базе"""
+        call_command("seed_habits", users=2, habits=20, stdout=io.StringIO())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, "report.json")
+        env = {"POSTGRES_DB": connection.settings_dict["NAME"], "DEBUG": "True"}
+        with patch.dict(os.environ, env):
+            call_command(
+                "benchmark_servers",
+                concurrency=4,
+                duration=1,
+                users=2,
+                port=8199,
+                output=output,
+                stdout=io.StringIO(),
+            )
+        with open(output) as file:
+            report = json.load(file)
+        self.assertEqual(set(report["servers"]), {"wsgi", "asgi"})
+        for result in report["servers"].values():
+            self.assertGreater(result["ok"], 0)
+            self.assertEqual(result["ok"], result["requests"])
+            self.assertEqual(result["served_clients"], 4)
+            self.assertGreater(result["peak_rss_mb"], 0)
+
+
+class DatabasePoolTestCase(APITestCase):
+    """Тесты для пула соединений PostgreSQL"""
+
+    def setUp(self):
+        self.params = connection.get_connection_params()
+        self.metrics = {}
+        for name in ("DB_POOL_CHECKOUTS", "DB_POOL_DISCARDED", "DB_POOL_WAITERS"):
+            patcher = patch(f"config.postgresql_pool.pool.{name}")
+            self.metrics[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def connect(self):
+        return psycopg2.connect(**self.params)
+
+    def get_pool(self, **kwargs):
+        pool = ConnectionPool(**kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def assert_metric(self, name, *values):
+        calls = self.metrics[name].inc.call_args_list
+        self.assertEqual(
+            [list(call.kwargs.values())[0] for call in calls], list(values)
+        )
+
+    def test_reuse(self):
+        """Тест повторной выдачи возвращённого соединения"""
+        pool = self.get_pool(max_size=2)
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(self.connect), conn)
+        self.assertEqual(pool.size, 1)
+        self.assert_metric("DB_POOL_CHECKOUTS", "new", "reused")
+
+    def test_wait_and_timeout(self):
+        """Тест ожидания возврата соединения и ошибки по таймауту"""
+        pool = self.get_pool(max_size=1, timeout=2)
+        conn = pool.getconn(self.connect)
+        timer = threading.Timer(0.1, pool.putconn, (conn,))
+        timer.start()
+        self.assertIs(pool.getconn(self.connect), conn)
+        timer.join()
+        self.metrics["DB_POOL_WAITERS"].inc.assert_called()
+
+        pool.timeout = 0.1
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn(self.connect)
+        self.assertEqual(pool.size, 1)
+        self.assert_metric("DB_POOL_CHECKOUTS", "new", "reused", "timeout")
+
+    def test_health_check(self):
+        """Тест замены закрытого и разорванного сервером соединения"""
+        pool = self.get_pool(max_size=1, check_interval=0)
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+        conn.close()
+        conn = pool.getconn(self.connect)
+        self.assertFalse(conn.closed)
+
+        pool.putconn(conn)
+        with self.connect() as other, other.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [conn.get_backend_pid()])
+        other.close()
+        new_conn = pool.getconn(self.connect)
+        self.assertIsNot(new_conn, conn)
+        self.assertEqual(pool.size, 1)
+        self.assert_metric("DB_POOL_DISCARDED", "broken", "unhealthy")
+        self.assert_metric("DB_POOL_CHECKOUTS", "new", "new", "new")
+
+    def test_reset(self):
+        """Тест отката транзакции при возврате и закрытия старых соединений"""
+        pool = self.get_pool()
+        conn = pool.getconn(self.connect)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        pool.putconn(conn)
+        self.assertEqual(
+            conn.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE
+        )
+
+        conn = pool.getconn(self.connect)
+        with self.assertRaises(psycopg2.Error), conn.cursor() as cursor:
+            cursor.execute("SELECT 1 / 0")
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(self.connect), conn)
+
+        pool.max_lifetime = 0
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        pool.putconn(pool.getconn(self.connect), discard=True)
+        self.assertEqual(pool.size, 0)
+        self.assert_metric("DB_POOL_DISCARDED", "expired", "closed")
+
+    def test_lost_connection(self):
+        """Тест освобождения места соединения, потерянного без возврата"""
+        pool = self.get_pool(max_size=1, timeout=0.1)
+        conn = pool.getconn(self.connect)
+        conn.close()
+        del conn
+        gc.collect()
+        pool.putconn(pool.getconn(self.connect))
+        self.assertEqual(pool.size, 1)
+        self.assert_metric("DB_POOL_DISCARDED", "lost")
+
+    def test_metrics_outside_lock(self):
+        """Тест обновления метрик без удержания блокировки пула"""
+        pool = self.get_pool(max_size=1, timeout=0.5, max_idle=0)
+
+        def check_unlocked(*args, **kwargs):
+            self.assertTrue(pool.condition.acquire(blocking=False))
+            pool.condition.release()
+
+        metric = Mock(
+            **{
+                f"{name}.side_effect": check_unlocked
+                for name in ("inc", "dec", "observe")
+            }
+        )
+        names = (
+            "DB_POOL_CHECKOUTS",
+            "DB_POOL_CONNECTIONS",
+            "DB_POOL_DISCARDED",
+            "DB_POOL_WAIT_DURATION",
+            "DB_POOL_WAITERS",
+        )
+        with patch.multiple(
+            "config.postgresql_pool.pool", **dict.fromkeys(names, metric)
+        ):
+            conn = pool.getconn(self.connect)
+            timer = threading.Timer(0.1, pool.putconn, (conn,))
+            timer.start()
+            conn = pool.getconn(self.connect)
+            timer.join()
+            conn.close()
+            del conn
+            gc.collect()
+            pool.putconn(pool.getconn(self.connect))
+            conn = pool.getconn(self.connect)
+            with self.assertRaises(psycopg2.OperationalError):
+                pool.getconn(self.connect)
+            pool.putconn(conn)
+        reasons = [call.kwargs.get("reason") for call in metric.inc.call_args_list]
+        self.assertIn("lost", reasons)
+        self.assertIn("idle", reasons)
+        metric.dec.assert_any_call(state="idle")
+
+    def test_wait_callback(self):
+        """Тест переключения гринлетов eventlet во время запроса к базе"""
+        self.addCleanup(extensions.set_wait_callback, None)
+        install_wait_callback()
+        self.assertIsNone(extensions.get_wait_callback())
+        with patch("eventlet.patcher.is_monkey_patched", return_value=True):
+            install_wait_callback()
+        self.assertIs(extensions.get_wait_callback(), eventlet_wait_callback)
+
+        ticks = []
+
+        def ticker():
+            while True:
+                ticks.append(1)
+                eventlet.sleep(0.01)
+
+        def query():
+            with self.connect() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT pg_sleep(0.2)")
+            conn.close()
+
+        thread = eventlet.spawn(ticker)
+        eventlet.spawn(query).wait()
+        thread.kill()
+        self.assertGreater(len(ticks), 5)
+
+    @skipUnless(
+        connection.vendor == "postgresql" and hasattr(connection, "close_pool"),
+        "Пул отключён (DB_POOL_MAX_SIZE=0)",
+    )
+    def test_backend(self):
+        """Тест возврата соединения Django в пул при закрытии"""
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        wrapper.ensure_connection()
+        conn = wrapper.connection
+        wrapper.close()
+        self.assertFalse(conn.closed)
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, conn)
+        wrapper.close()
+
+        wrapper.close_pool()
+        self.assertTrue(conn.closed)
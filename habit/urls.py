@@ -1,26 +1,67 @@
 from django.urls import path
 
+from config.settings import HABIT_ASYNC_VIEWS
 from habit.apps import HabitConfig
+from habit.telegram import TelegramWebhookView
 from habit.views import (
     HabitListAPIView,
+    HabitListAsyncAPIView,
     HabitPersonAPIView,
+    HabitPersonAsyncAPIView,
+    HabitStatisticsAPIView,
     HabitCreateAPIView,
     HabitUpdateAPIView,
     HabitDeleteAPIView,
     HabitRetrieveAPIView,
+    HabitRetrieveAsyncAPIView,
+    HabitBulkCreateAPIView,
+    HabitBulkUpdateAPIView,
+    HabitBulkDeleteAPIView,
+    HabitCompleteAPIView,
+    HabitStatsAPIView,
 )
 
 app_name = HabitConfig.name
 
+if HABIT_ASYNC_VIEWS:
+    list_view = HabitListAsyncAPIView
+    person_view = HabitPersonAsyncAPIView
+    retrieve_view = HabitRetrieveAsyncAPIView
+else:
+    list_view = HabitListAPIView
+    person_view = HabitPersonAPIView
+    retrieve_view = HabitRetrieveAPIView
+
 urlpatterns = [
-    path("", HabitListAPIView.as_view(), name="list_public"),
-    path("habit/list_person/", HabitPersonAPIView.as_view(), name="list_person"),
+    path("", list_view.as_view(), name="list_public"),
+    path("habit/list_person/", person_view.as_view(), name="list_person"),
+    path(
+        "habit/statistics/",
+        HabitStatisticsAPIView.as_view(),
+        name="person_statistics",
+    ),
     path("habit/create/", HabitCreateAPIView.as_view(), name="habit_create"),
     path(
         "habit/retrieve/<int:pk>/",
-        HabitRetrieveAPIView.as_view(),
+        retrieve_view.as_view(),
         name="habit_retrieve",
     ),
     path("habit/update/<int:pk>/", HabitUpdateAPIView.as_view(), name="habit_update"),
     path("habit/delete/<int:pk>/", HabitDeleteAPIView.as_view(), name="habit_delete"),
+    path(
+        "habit/bulk/create/", HabitBulkCreateAPIView.as_view(), name="habit_bulk_create"
+    ),
+    path(
+        "habit/bulk/update/", HabitBulkUpdateAPIView.as_view(), name="habit_bulk_update"
+    ),
+    path(
+        "habit/bulk/delete/", HabitBulkDeleteAPIView.as_view(), name="habit_bulk_delete"
+    ),
+    path(
+        "habit/complete/<int:pk>/",
+        HabitCompleteAPIView.as_view(),
+        name="habit_complete",
+    ),
+    path("habit/stats/<int:pk>/", HabitStatsAPIView.as_view(), name="habit_stats"),
+    path("telegram/webhook/", TelegramWebhookView.as_view(), name="telegram_webhook"),
 ]
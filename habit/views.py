@@ -1,53 +1,265 @@
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import (
+    GenericAPIView,
     ListAPIView,
     CreateAPIView,
     UpdateAPIView,
     DestroyAPIView,
     RetrieveAPIView,
 )
-from habit.models import Habit
-from habit.paginators import HabitPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.async_views import AsyncListAPIViewMixin, AsyncRetrieveAPIViewMixin
+from config.settings import HABIT_BULK_MAX_SIZE, HABIT_STATS_MAX_DAYS
+from habit.cache import (
+    aget_or_build,
+    get_or_build,
+    get_or_build_user_stats,
+    get_public_list_key,
+    invalidate_public_list,
+    invalidate_user_stats,
+)
+from habit.conditional import (
+    AsyncConditionalGetMixin,
+    ConditionalGetMixin,
+    make_etag,
+)
+from habit.models import Habit, HabitStats
+from habit.paginators import HabitPaginationMixin
+from habit.services import complete_habit
+from habit.statistics import build_user_statistics
 from users.permissions import IsOwner
-from habit.serializers import HabitSerializer
+from habit.serializers import (
+    HabitSerializer,
+    HabitBulkSerializer,
+    HabitReadSerializer,
+    HabitCompletionSerializer,
+    HabitStatsSerializer,
+)
 
 
-class HabitListAPIView(ListAPIView):
-    """Generic-класс для вывода списка опубликованных привычек"""
+class SparseFieldsMixin:
+    """
+    Выбор полей ответа параметрами ?fields=a,b и ?exclude=c.
+    Выбранные поля передаются сериализатору через контекст и используются
+    представлением, чтобы читать из базы только нужные столбцы.
+    """
 
-    serializer_class = HabitSerializer
-    queryset = Habit.objects.filter(is_published=True)
-    pagination_class = HabitPagination
+    available_fields = HabitReadSerializer.fields
+
+    def get_requested_fields(self):
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = self.parse_requested_fields()
+        return self._requested_fields
+
+    def parse_requested_fields(self):
+        fields = self.available_fields
+        errors = {}
+        for param in ("fields", "exclude"):
+            value = self.request.query_params.get(param, "")
+            names = [name.strip() for name in value.split(",") if name.strip()]
+            unknown = [name for name in names if name not in self.available_fields]
+            if unknown:
+                errors[param] = [f"Неизвестные поля: {', '.join(unknown)}"]
+            elif names:
+                fields = tuple(
+                    field for field in fields if (field in names) == (param == "fields")
+                )
+        if not errors and not fields:
+            errors["fields"] = ["Не выбрано ни одного поля"]
+        if errors:
+            raise ValidationError(errors)
+        return fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not getattr(self, "swagger_fake_view", False):
+            context["fields"] = self.get_requested_fields()
+        return context
+
+
+class HabitReadMixin(SparseFieldsMixin):
+    """
+    Списки привычек строятся из строк .values() быстрым HabitReadSerializer.
+    Для схемы API (drf-yasg) отдаётся HabitSerializer с описанием полей.
+    """
 
+    serializer_class = HabitReadSerializer
 
-class HabitRetrieveAPIView(RetrieveAPIView):
+    def get_serializer_class(self):
+        if getattr(self, "swagger_fake_view", False):
+            return HabitSerializer
+        return super().get_serializer_class()
+
+    def get_values_fields(self):
+        """Столбцы для .values(): выбранные поля и ключ курсора пагинации"""
+        fields = self.get_requested_fields()
+        if self.paginator.__class__ is self.cursor_pagination_class:
+            fields = (*fields, *(key for key in ("id", "action") if key not in fields))
+        return fields
+
+
+class HabitListAPIView(HabitReadMixin, HabitPaginationMixin, ListAPIView):
+    """
+    Generic-класс для вывода списка опубликованных привычек.
+    Страницы кэшируются и сбрасываются сигналами при изменении привычек.
+    """
+
+    def get_queryset(self):
+        return Habit.objects.filter(is_published=True).values(*self.get_values_fields())
+
+    def list(self, request, *args, **kwargs):
+        data = get_or_build(
+            get_public_list_key(request),
+            lambda: super(HabitListAPIView, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+
+class HabitRetrieveAPIView(ConditionalGetMixin, SparseFieldsMixin, RetrieveAPIView):
     """Generic-класс для просмотра привычки"""
 
     serializer_class = HabitSerializer
-    queryset = Habit.objects.all()
     permission_classes = (IsOwner,)
 
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Habit.objects.all()
+        return Habit.objects.only("owner", *self.get_requested_fields())
+
+    def get_validators_queryset(self, pk):
+        return Habit.objects.filter(pk=pk).values_list("owner_id", "updated_at")
+
+    def get_validators(self, request, *args, **kwargs):
+        row = self.get_validators_queryset(kwargs["pk"]).first()
+        return self.make_validators(request, kwargs["pk"], row)
+
+    def make_validators(self, request, pk, row):
+        if row is None or row[0] != request.user.pk:
+            return None
+        etag = make_etag(pk, row[1].isoformat(), request.get_full_path())
+        return etag, row[1]
+
 
-class HabitPersonAPIView(ListAPIView):
+class HabitPersonAPIView(
+    ConditionalGetMixin, HabitReadMixin, HabitPaginationMixin, ListAPIView
+):
     """Generic-класс для вывода списка привычек, принадлежащих пользователю"""
 
-    serializer_class = HabitSerializer
-    pagination_class = HabitPagination
     permission_classes = (IsOwner,)
 
+    def get_state_queryset(self):
+        return Habit.objects.filter(owner=self.request.user)
+
+    def get_validators(self, request, *args, **kwargs):
+        state = self.get_state_queryset().aggregate(
+            last_modified=Max("updated_at"), count=Count("id")
+        )
+        return self.make_validators(request, state)
+
+    def make_validators(self, request, state):
+        """
+        Только ETag из max(updated_at) и числа привычек: удаление меняет
+        число, создание и изменение - max(updated_at). Last-Modified не
+        отдаётся: после удаления привычки max(updated_at) не растёт.
+        """
+        last_modified = state["last_modified"]
+        etag = make_etag(
+            request.user.pk,
+            state["count"],
+            last_modified.isoformat() if last_modified else "",
+            request.get_full_path(),
+        )
+        return etag, None
+
     def get_queryset(self):
-        queryset = Habit.objects.filter(owner=self.request.user)
+        queryset = Habit.objects.filter(owner=self.request.user).values(
+            *self.get_values_fields()
+        )
         return queryset
 
 
+class HabitListAsyncAPIView(AsyncListAPIViewMixin, HabitListAPIView):
+    """Асинхронный вариант HabitListAPIView для ASGI"""
+
+    async def alist(self, request, *args, **kwargs):
+        async def build():
+            response = await super(HabitListAsyncAPIView, self).alist(
+                request, *args, **kwargs
+            )
+            return response.data
+
+        data = await aget_or_build(get_public_list_key(request), build)
+        return Response(data)
+
+
+class HabitRetrieveAsyncAPIView(
+    AsyncConditionalGetMixin, AsyncRetrieveAPIViewMixin, HabitRetrieveAPIView
+):
+    """Асинхронный вариант HabitRetrieveAPIView для ASGI"""
+
+    async def aget_validators(self, request, *args, **kwargs):
+        row = await self.get_validators_queryset(kwargs["pk"]).afirst()
+        return self.make_validators(request, kwargs["pk"], row)
+
+
+class HabitPersonAsyncAPIView(
+    AsyncConditionalGetMixin, AsyncListAPIViewMixin, HabitPersonAPIView
+):
+    """Асинхронный вариант HabitPersonAPIView для ASGI"""
+
+    async def aget_validators(self, request, *args, **kwargs):
+        state = await self.get_state_queryset().aaggregate(
+            last_modified=Max("updated_at"), count=Count("id")
+        )
+        return self.make_validators(request, state)
+
+
+class HabitStatisticsAPIView(APIView):
+    """
+    Статистика выполнения привычек пользователя за ?days= дней (по умолчанию
+    365): тепловая карта, скользящие доли выполнения и ожидаемые и фактические
+    выполнения по привычкам. Кэшируется до следующей отметки или изменения
+    привычек пользователя.
+    """
+
+    default_days = 365
+
+    def get_days(self):
+        value = self.request.query_params.get("days", self.default_days)
+        try:
+            days = int(value)
+        except (TypeError, ValueError):
+            days = 0
+        if not 0 < days <= HABIT_STATS_MAX_DAYS:
+            raise ValidationError(
+                {"days": [f"Ожидается целое число от 1 до {HABIT_STATS_MAX_DAYS}"]}
+            )
+        return days
+
+    def get(self, request, *args, **kwargs):
+        days = self.get_days()
+        today = timezone.localdate()
+        data = get_or_build_user_stats(
+            request.user.pk,
+            (today, days),
+            lambda: build_user_statistics(request.user.pk, days, today),
+        )
+        return Response(data)
+
+
 class HabitCreateAPIView(CreateAPIView):
     """Generic-класс для создания привычки, принадлежащей пользователю"""
 
     serializer_class = HabitSerializer
 
     def perform_create(self, serializer):
-        new_habit = serializer.save()
-        new_habit.owner = self.request.user
-        new_habit.save()
+        serializer.save(owner=self.request.user)
 
 
 class HabitUpdateAPIView(UpdateAPIView):
@@ -63,3 +275,205 @@ class HabitDeleteAPIView(DestroyAPIView):
 
     queryset = Habit.objects.all()
     permission_classes = (IsOwner,)
+
+
+def get_item_id(item):
+    """Идентификатор привычки из элемента пакета или None"""
+    if isinstance(item, dict):
+        item = item.get("id")
+    if isinstance(item, int) and not isinstance(item, bool):
+        return item
+    return None
+
+
+class HabitBulkAPIView(GenericAPIView):
+    """
+    Базовый класс пакетных операций с привычками. Принимает список объектов,
+    проверяет каждый отдельно и возвращает результат по каждому элементу.
+    """
+
+    serializer_class = HabitBulkSerializer
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Ожидается список привычек"]})
+        if len(items) > HABIT_BULK_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"Можно передать не более {HABIT_BULK_MAX_SIZE} привычек"
+                    ]
+                }
+            )
+        return items
+
+    def get_related_habits(self, items):
+        """Связанные привычки всех элементов пакета одним запросом"""
+        ids = set()
+        for item in items:
+            related_habit = (
+                item.get("related_habit") if isinstance(item, dict) else None
+            )
+            if isinstance(related_habit, (int, str)) and str(related_habit).isdigit():
+                ids.add(int(related_habit))
+        return Habit.objects.in_bulk(ids) if ids else {}
+
+    def get_bulk_context(self, items):
+        """Контекст сериализатора с заранее загруженными связанными привычками"""
+        context = self.get_serializer_context()
+        context["related_habits"] = self.get_related_habits(items)
+        return context
+
+    def get_bulk_response(self, results):
+        """Ответ с результатами по элементам: общий статус или 207"""
+        statuses = {result["status"] for result in results}
+        if statuses == {status.HTTP_204_NO_CONTENT}:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if len(statuses) == 1:
+            return Response(results, status=statuses.pop())
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+
+class HabitBulkCreateAPIView(HabitBulkAPIView):
+    """Класс для пакетного создания привычек, принадлежащих пользователю"""
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        context = self.get_bulk_context(items)
+        results = []
+        habits = []
+        for item in items:
+            serializer = self.serializer_class(data=item, context=context)
+            if not serializer.is_valid():
+                results.append(
+                    {"status": status.HTTP_400_BAD_REQUEST, "errors": serializer.errors}
+                )
+                continue
+            habit = Habit(**serializer.validated_data, owner=request.user)
+            habit.next_due_at = habit.get_next_due_at()
+            habits.append(habit)
+            results.append({"status": status.HTTP_201_CREATED, "habit": habit})
+
+        with transaction.atomic():
+            Habit.objects.bulk_create(habits)
+        if habits:
+            invalidate_public_list()
+            invalidate_user_stats(request.user.pk)
+        for result in results:
+            if "habit" in result:
+                result["data"] = HabitSerializer(result.pop("habit")).data
+        return self.get_bulk_response(results)
+
+
+class HabitBulkUpdateAPIView(HabitBulkAPIView):
+    """Класс для пакетного редактирования привычек пользователя"""
+
+    def put(self, request, *args, **kwargs):
+        items = self.get_items()
+        context = self.get_bulk_context(items)
+        instances = Habit.objects.filter(
+            owner=request.user, pk__in=[get_item_id(item) for item in items]
+        ).in_bulk()
+        results = []
+        habits = []
+        fields = {"next_due_at", "updated_at"}
+        for item in items:
+            pk = get_item_id(item)
+            instance = instances.get(pk)
+            if instance is None:
+                results.append({"status": status.HTTP_404_NOT_FOUND, "id": pk})
+                continue
+            serializer = self.serializer_class(instance, data=item, context=context)
+            if not serializer.is_valid():
+                results.append(
+                    {
+                        "status": status.HTTP_400_BAD_REQUEST,
+                        "id": pk,
+                        "errors": serializer.errors,
+                    }
+                )
+                continue
+            for attr, value in serializer.validated_data.items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+            instance.next_due_at = instance.get_next_due_at()
+            instance.updated_at = timezone.now()
+            habits.append(instance)
+            results.append({"status": status.HTTP_200_OK, "id": pk, "habit": instance})
+
+        with transaction.atomic():
+            Habit.objects.bulk_update(habits, sorted(fields))
+        if habits:
+            invalidate_public_list()
+            invalidate_user_stats(request.user.pk)
+        for result in results:
+            if "habit" in result:
+                result["data"] = HabitSerializer(result.pop("habit")).data
+        return self.get_bulk_response(results)
+
+
+class HabitBulkDeleteAPIView(HabitBulkAPIView):
+    """Класс для пакетного удаления привычек пользователя"""
+
+    def delete(self, request, *args, **kwargs):
+        ids = [get_item_id(item) for item in self.get_items()]
+        queryset = Habit.objects.filter(owner=request.user, pk__in=ids)
+        with transaction.atomic():
+            existing = set(queryset.values_list("pk", flat=True))
+            queryset.delete()
+        results = [
+            {
+                "status": (
+                    status.HTTP_204_NO_CONTENT
+                    if pk in existing
+                    else status.HTTP_404_NOT_FOUND
+                ),
+                "id": pk,
+            }
+            for pk in ids
+        ]
+        return self.get_bulk_response(results)
+
+
+class HabitCompleteAPIView(GenericAPIView):
+    """
+    Класс для отметки о выполнении привычки за день (по умолчанию сегодня).
+    В ответе отметка и обновлённая статистика привычки.
+    """
+
+    serializer_class = HabitCompletionSerializer
+    queryset = Habit.objects.only("owner", "periodicity")
+    permission_classes = (IsOwner,)
+
+    def post(self, request, *args, **kwargs):
+        habit = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        completion, stats, created = complete_habit(
+            habit, serializer.validated_data.get("occurred_on")
+        )
+        return Response(
+            {
+                **self.get_serializer(completion).data,
+                "stats": HabitStatsSerializer(stats).data,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class HabitStatsAPIView(RetrieveAPIView):
+    """Generic-класс для просмотра статистики выполнения привычки"""
+
+    serializer_class = HabitStatsSerializer
+    queryset = Habit.objects.select_related("stats").only(
+        "owner", "periodicity", "stats"
+    )
+    permission_classes = (IsOwner,)
+
+    def get_object(self):
+        habit = super().get_object()
+        try:
+            return habit.stats
+        except HabitStats.DoesNotExist:
+            return HabitStats(habit=habit)
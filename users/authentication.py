@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config.settings import (
+    AUTH_USER_CACHE,
+    AUTH_USER_CACHE_TIMEOUT,
+    AUTH_USER_LRU_SIZE,
+    AUTH_USER_LRU_TTL,
+)
+
+USER_VERSION_KEY = "users:auth_version:{user_id}"
+USER_KEY = "users:auth:{user_id}:{version}"
+# Поля пользователя в кэше; остальные загрузятся из базы при обращении
+USER_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+
+def get_user_version(user_id):
+    """Текущая версия данных пользователя для кэша аутентификации"""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def invalidate_user(user_id):
+    """Инвалидация закэшированного пользователя во всех процессах"""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def dump_user(user):
+    """
+    Данные пользователя для кэша: поля USER_FIELDS и отпечаток пароля для
+    проверки отзыва токена, но не хеш пароля.
+    """
+    return (
+        tuple(getattr(user, name) for name in USER_FIELDS),
+        get_md5_hash_password(user.password),
+    )
+
+
+def load_user(values):
+    """Пользователь из данных кэша с отложенной загрузкой остальных полей"""
+    User = get_user_model()
+    # from_db() ждёт значения в порядке полей модели
+    fields = dict(zip(USER_FIELDS, values))
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+    return User.from_db(User.objects.db, names, [fields[name] for name in names])
+
+
+class UserLRUCache:
+    """Потокобезопасный LRU-кэш пользователей в памяти процесса с TTL записей"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires_at, user = item
+            if expires_at < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, user)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+user_lru = UserLRUCache(AUTH_USER_LRU_SIZE, AUTH_USER_LRU_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса пользователя к базе на каждый запрос.
+    Пользователь ищется в LRU процесса, затем в Redis по ключу (id, версия);
+    версия увеличивается сигналами при сохранении или удалении пользователя,
+    поэтому изменения пароля и is_active действуют сразу во всех процессах.
+    Изменения через QuerySet.update() сигналов не вызывают и требуют
+    явного invalidate_user(). Без общего кэша (AUTH_USER_CACHE=False)
+    пользователь читается из базы на каждый запрос.
+    """
+
+    def get_user(self, validated_token):
+        if not AUTH_USER_CACHE:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = USER_KEY.format(user_id=user_id, version=get_user_version(user_id))
+        data = user_lru.get(key)
+        if data is None:
+            data = cache.get(key)
+            if data is None:
+                data = dump_user(super().get_user(validated_token))
+                cache.set(key, data, AUTH_USER_CACHE_TIMEOUT)
+            user_lru.set(key, data)
+        values, password_hash = data
+
+        # Кэш общий для всех токенов пользователя, поэтому отзыв токена
+        # по смене пароля проверяется и для закэшированного пользователя
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        # Новый объект на каждый запрос: атрибуты одного запроса не попадают в другие
+        return load_user(values)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_user_chat_id"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="chat_id",
+            field=models.CharField(
+                blank=True, db_index=True, null=True, verbose_name="ID чата Telegram"
+            ),
+        ),
+    ]
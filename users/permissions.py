@@ -5,6 +5,5 @@ class IsOwner(BasePermission):
     """Проверяет, что пользователь является обладателем привычки"""
 
     def has_object_permission(self, request, view, obj):
-        if obj.owner == request.user:
-            return True
-        return False
+        # Сравнение по owner_id не загружает владельца отдельным запросом
+        return obj.owner_id == request.user.pk
@@ -1,7 +1,12 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from users.authentication import USER_KEY, get_user_version, invalidate_user, user_lru
 from users.models import User
 
 
@@ -24,3 +29,88 @@ class UserTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(User.objects.all().count(), 1)
         self.assertEqual(data.get("email"), "test@test.ru")
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """Тесты для JWT-аутентификации с кэшем пользователей"""
+
+    def setUp(self):
+        """Создание пользователя и токена"""
+        # Кэш тестов LocMemCache общий: тесты идут в одном процессе
+        patcher = patch("users.authentication.AUTH_USER_CACHE", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        user_lru.clear()
+        self.user = User.objects.create(email="test@test.ru")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.url = reverse("habit:list_person")
+
+    def test_user_cached(self):
+        """Тест аутентификации без запроса пользователя к базе"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user_lru.clear()
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_user_changed(self):
+        """Тест сброса кэша при деактивации пользователя"""
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_updated_queryset(self):
+        """Тест явного сброса кэша после изменения через QuerySet.update()"""
+        self.client.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        invalidate_user(self.user.pk)
+        self.assertEqual(
+            self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_user_deleted(self):
+        """Тест отказа в доступе удалённому пользователю"""
+        self.client.get(self.url)
+        self.user.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_fields(self):
+        """Тест кэширования полей пользователя без хеша пароля"""
+        self.user.set_password("12345678")
+        self.user.chat_id = "100"
+        self.user.save()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.client.get(self.url)
+        key = USER_KEY.format(
+            user_id=self.user.pk, version=get_user_version(self.user.pk)
+        )
+        self.assertNotIn(self.user.password, str(cache.get(key)))
+
+        response = self.client.get(self.url)
+        user = response.wsgi_request.user
+        self.assertEqual((user.pk, user.email), (self.user.pk, "test@test.ru"))
+        # Поля вне кэша загружаются из базы при обращении
+        with self.assertNumQueries(1):
+            self.assertEqual(user.chat_id, "100")
+
+    def test_cache_disabled(self):
+        """Тест чтения пользователя из базы без общего кэша"""
+        with patch("users.authentication.AUTH_USER_CACHE", False):
+            self.client.get(self.url)
+            with self.assertNumQueries(3):
+                self.client.get(self.url)
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)